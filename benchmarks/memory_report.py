@@ -0,0 +1,49 @@
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pandas as pd
+import script_generation_func
+from benchmarks.run_benchmarks import dataset
+
+
+def mb(n: float) -> str:
+    return f"{n / 1e6:8.2f} MB"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Memory use of parsed event frames, default vs compact dtypes.")
+    ap.add_argument("events_txt", nargs="*", help="Event files (default: the synthetic 100k benchmark night)")
+    ap.add_argument("--columns", action="store_true", help="Print the per-column report for each file")
+    args = ap.parse_args()
+
+    paths = [Path(p) for p in args.events_txt] or [dataset("100k")]
+    f = script_generation_func
+    frames = []
+    raw_total = 0
+    for p in paths:
+        raw, _ = f.load_events(str(p), compact=False)
+        df = f.compact_events(raw)
+        raw_bytes = int(raw.memory_usage(deep=True).sum())
+        compact_bytes = int(df.memory_usage(deep=True).sum())
+        raw_total += raw_bytes
+        print(f"{p.name}: {len(df)} events  {mb(raw_bytes)} -> {mb(compact_bytes)}  (x{raw_bytes / max(compact_bytes, 1):.1f})")
+        if args.columns:
+            print(f.memory_report(df).to_string(float_format=lambda x: f"{x:.1f}"))
+            print()
+        frames.append(raw)
+
+    if len(frames) > 1:
+        combined = f.compact_events(pd.concat(frames, ignore_index=True))
+        total = int(combined.memory_usage(deep=True).sum())
+        print(f"all {len(frames)} files: {len(combined)} events  {mb(raw_total)} -> {mb(total)}")
+        if args.columns:
+            print(f.memory_report(combined).to_string(float_format=lambda x: f"{x:.1f}"))
+
+
+if __name__ == "__main__":
+    main()
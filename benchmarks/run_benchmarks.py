@@ -0,0 +1,162 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import script_generation_func
+from benchmarks.synth_events import write_events_file
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+NIGHT = "20241017"
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+TELESCOPES = ["c11", "c14", "hubble24"]
+NEEDED = ["date","ut","durn","star_mag","mag_drop","star_no",
+          "asteroid","alt","az","probability","ra_deg","dec_deg"]
+
+
+def dataset(size_key: str, dense: bool = False) -> Path:
+    n = SIZES[size_key] if not dense else 5_000
+    name = f"{NIGHT}_events_{'dense' if dense else size_key}.txt"
+    path = DATA_DIR / name
+    if not path.exists():
+        write_events_file(path, n, seed=17, dense=dense)
+    return path
+
+
+def timed(fn, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, times
+
+
+def night_events(df, telescope: str):
+    day = script_generation_func.infer_day_from_filename(f"{NIGHT}_events.txt")
+    night = df[script_generation_func.night_window_filter(df, day)]
+    return night[script_generation_func.telescope_accept_mask(night, telescope)]
+
+
+def run_pipeline(label: str, path: Path, repeat: int, tmpdir: Path, results: dict) -> None:
+    f = script_generation_func
+    day = f.infer_day_from_filename(path.name)
+
+    def record(stage, times, rows, **extra):
+        results[f"{label}/{stage}"] = {
+            "rows": rows,
+            "best_s": min(times),
+            "median_s": statistics.median(times),
+            "repeat": len(times),
+            **extra,
+        }
+        print(f"  {label + '/' + stage:<32s} rows={rows:<9d} best={min(times):9.4f}s")
+
+    f.reset_parse_stats()
+    df, times = timed(lambda: f.events_to_dataframe(str(path)), repeat)
+    record("load", times, len(df), fast_path_hit_rate=f.fast_path_hit_rate())
+
+    def filter_all():
+        night = df[f.night_window_filter(df, day)]
+        return {tel: f.telescope_accept_mask(night, tel) for tel in TELESCOPES}
+    _, times = timed(filter_all, repeat)
+    record("filter", times, len(df))
+
+    for tel in TELESCOPES:
+        accepted = night_events(df, tel)[NEEDED]
+        events, times = timed(lambda: f.events_from_frame(accepted), repeat)
+        record(f"extract_{tel}", times, len(accepted))
+
+        events.sort(key=lambda e: e.date_object)
+        _, times = timed(lambda: f.get_flagged_events(events) if events else [], repeat)
+        record(f"schedule_{tel}", times, len(events))
+
+        out = tmpdir / f"{label}_{tel}.scs"
+        _, times = timed(lambda: f.generate_scs(list(events), str(out),
+                                                str(ROOT / "pre174.txt"), str(ROOT / "post571.txt")), repeat)
+        record(f"emit_{tel}", times, len(events))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def compare(current: dict, baseline_path: Path, tolerance: float) -> int:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    regressions = 0
+    print(f"\nComparison against {baseline_path.name} (tolerance x{tolerance:g})")
+    for name, cur in current.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"  {name:<32s} new")
+            continue
+        ratio = cur["best_s"] / old["best_s"] if old["best_s"] > 0 else float("inf")
+        flag = ""
+        if ratio > tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"  {name:<32s} {old['best_s']:9.4f}s -> {cur['best_s']:9.4f}s  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Timed benchmark scenarios on synthetic Occult event files.")
+    ap.add_argument("--sizes", default="1k,100k,1m", help="Comma separated subset of 1k,100k,1m")
+    ap.add_argument("--no-dense", action="store_true", help="Skip the dense conflict-night scenario")
+    ap.add_argument("--repeat", type=int, default=3, help="Repetitions per stage (1m always runs once)")
+    ap.add_argument("--save", default=None, help="Save results as benchmarks/results/<name>.json")
+    ap.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmpdir = Path(tmp)
+        for size_key in [s.strip().lower() for s in args.sizes.split(",") if s.strip()]:
+            if size_key not in SIZES:
+                ap.error(f"Unknown size: {size_key}")
+            print(f"[{size_key}]")
+            repeat = 1 if SIZES[size_key] >= 1_000_000 else args.repeat
+            run_pipeline(size_key, dataset(size_key), repeat, tmpdir, results)
+        if not args.no_dense:
+            print("[dense]")
+            run_pipeline("dense", dataset("1k", dense=True), args.repeat, tmpdir, results)
+
+    payload = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        out = RESULTS_DIR / f"{args.save}.json"
+        out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"\nSaved {out}")
+
+    if args.compare:
+        if compare(results, Path(args.compare), args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.synth_events import write_events_file
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SMALL_NIGHT = DATA_DIR / "20241017_events_startup.txt"
+# Wall-clock budgets (best of --repeat) for a field laptop; --scale loosens them on slow machines.
+BUDGET_S = {
+    "import_cli": 0.10,
+    "cli_help": 0.15,
+    "cli_small_night": 0.40,
+    "import_gui": 0.20,
+}
+# None of these may be imported before they are needed.
+HEAVY_MODULES = ("pandas", "numpy")
+
+
+def scenarios(tmpdir: Path) -> dict:
+    out = tmpdir / "startup.scs"
+    return {
+        "import_cli": ([sys.executable, "-c", "import script_generation_CLI"], None),
+        "cli_help": ([sys.executable, "script_generation_CLI.py", "--help"], None),
+        "cli_small_night": ([sys.executable, "script_generation_CLI.py", str(SMALL_NIGHT), "c14", "-o", str(out)], "0\n"),
+        "import_gui": ([sys.executable, "-c", "import script_generation_GUI"], None),
+    }
+
+
+def run(cmd, stdin, importtime: bool = False):
+    if importtime:
+        cmd = [cmd[0], "-X", "importtime"] + cmd[1:]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, input=stdin, capture_output=True, text=True)
+    elapsed = time.perf_counter() - t0
+    return proc, elapsed
+
+
+def parse_importtime(stderr: str):
+    # "import time: self [us] | cumulative | imported package" lines ->
+    # {module: cumulative_s} for every import, plus the same for top-level imports only
+    cumulative, top = {}, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip()) - 1
+        cumulative[name.strip()] = int(cum) / 1e6
+        if depth == 0:
+            top[name.strip()] = int(cum) / 1e6
+    return cumulative, top
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Cold start times of the CLI and GUI against a budget.")
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per scenario; the best is compared")
+    ap.add_argument("--scale", type=float, default=1.0, help="Multiply every budget by this factor")
+    ap.add_argument("--top", type=int, default=8, help="Slowest top-level imports to list per scenario")
+    ap.add_argument("--save", default=None, help="Save results as benchmarks/results/<name>.json")
+    args = ap.parse_args()
+
+    if not SMALL_NIGHT.exists():
+        write_events_file(SMALL_NIGHT, 1000, seed=17)
+
+    results = {}
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (cmd, stdin) in scenarios(Path(tmp)).items():
+            proc, _ = run(cmd, stdin, importtime=True)
+            if proc.returncode != 0:
+                if name == "import_gui" and "tkinter" in proc.stderr:
+                    print(f"{name:<18s} skipped (no tkinter)")
+                    continue
+                print(f"{name:<18s} FAILED\n{proc.stderr[-2000:]}")
+                failures += 1
+                continue
+            imports, top_level = parse_importtime(proc.stderr)
+            heavy = [m for m in HEAVY_MODULES if m in imports]
+            times = [run(cmd, stdin)[1] for _ in range(args.repeat)]
+            budget = BUDGET_S[name] * args.scale
+            over = min(times) > budget
+            results[name] = {"best_s": min(times), "budget_s": budget, "heavy_imports": heavy}
+
+            flag = "  OVER BUDGET" if over else ""
+            if heavy:
+                flag += f"  imports {', '.join(heavy)}"
+            print(f"{name:<18s} best={min(times):7.3f}s budget={budget:6.3f}s{flag}")
+            top = sorted(((s, m) for m, s in top_level.items()), reverse=True)[:args.top]
+            for s, m in top:
+                print(f"    {s * 1000:8.1f} ms  {m}")
+            failures += over or bool(heavy)
+
+    if args.save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        out = RESULTS_DIR / f"{args.save}.json"
+        payload = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }
+        out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"\nSaved {out}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+MONTH_ABBR = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
+
+# numbered/named, multi-word and provisional designations
+ASTEROIDS = [
+    "16 Psyche", "52 Europa", "87 Sylvia", "433 Eros", "1036 Ganymed", "2060 Chiron",
+    "3200 Phaethon", "4179 Toutatis", "3552 Don Quixote", "9007 James Bond",
+    "2309 Mr. Spock", "4769 Castalia", "6042 Cheshirecat", "1172 Aneas",
+    "2001 QR322", "1999 JM8", "2002 AA29", "2005 YU55", "20000 Varuna", "90482 Orcus",
+    "136199 Eris", "50000 Quaoar", "2340 Hathor", "3753 Cruithne",
+]
+CATALOG_STARS = ["UCAC4", "TYC", "HIP", "Gaia", "2MASS", "GSC", "PPMXL", "UCAC5"]
+HEADER = [
+    "  Asteroidal occultations - summary list",
+    "",
+    "   Date    U.T.     Path   Diam   Dur  Unc   Star  Drop  Star No.        Elong  Asteroid       Alt  Az   Dist  Sun  Prob   RA (J2000)   Dec",
+    "  y   m  d  h  m     km     km    sec   \"     mag   mag",
+    "",
+]
+
+
+def _star_id(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.15:
+        # J-style designation: JHHMMSS.ss+DDMMSS.s
+        sign = rng.choice("+-")
+        return (f"J{rng.randrange(24):02d}{rng.randrange(60):02d}{rng.uniform(0, 60):05.2f}"
+                f"{sign}{rng.randrange(90):02d}{rng.randrange(60):02d}{rng.uniform(0, 60):04.1f}")
+    prefix = rng.choice(CATALOG_STARS)
+    if prefix in ("UCAC4", "UCAC5"):
+        num = f"{rng.randrange(1, 900):03d}-{rng.randrange(1, 200000):06d}"
+    elif prefix == "TYC":
+        num = f"{rng.randrange(1, 9999)}-{rng.randrange(1, 2000):05d}-{rng.randrange(1, 4)}"
+    elif prefix == "HIP":
+        num = str(rng.randrange(1, 120000))
+    elif prefix == "Gaia":
+        num = str(rng.randrange(10**17, 10**19))
+    elif prefix == "2MASS":
+        num = f"{rng.randrange(24):02d}{rng.randrange(60):02d}{rng.randrange(10000):04d}+{rng.randrange(90):02d}{rng.randrange(100000):05d}"
+    else:
+        num = f"{rng.randrange(1, 9999)}-{rng.randrange(1, 2000)}"
+    return f"{prefix} {num}"
+
+
+def _dec_tokens(rng: random.Random, dec_deg: float) -> str:
+    sign = "-" if dec_deg < 0 else "+"
+    d = abs(dec_deg)
+    dd = int(d)
+    mm = int((d - dd) * 60)
+    ss = min((d - dd - mm / 60.0) * 3600, 59.9)
+    form = rng.random()
+    if form < 0.2:
+        # split sign, as Occult prints for small declinations: "- 3 12 45.6"
+        head = f"{sign} {dd}"
+    elif form < 0.3 and sign == "+":
+        head = f"{dd}"
+    else:
+        head = f"{sign}{dd:02d}"
+    return f"{head} {mm:02d} {ss:04.1f}"
+
+
+def synthetic_events(n: int, night: str = "20241017", seed: int = 0, dense: bool = False):
+    rng = random.Random(seed)
+    day = datetime.strptime(night, "%Y%m%d")
+    start = day - timedelta(hours=7)          # 17:00 UTC the evening before
+    span = 23 * 3600
+    if dense:
+        # a handful of clusters, several events inside each 4 minute conflict window
+        centres = sorted(rng.uniform(0, span) for _ in range(max(1, n // 6)))
+        offsets = [rng.choice(centres) + rng.uniform(0, 240) for _ in range(n)]
+    else:
+        offsets = [rng.uniform(-6 * 3600, span + 6 * 3600) for _ in range(n)]
+    offsets.sort()
+
+    for off in offsets:
+        dt = start + timedelta(seconds=off)
+        minute = min(dt.minute + dt.second / 60.0, 59.9)
+        dec_deg = rng.uniform(-40, 60)
+        if rng.random() < 0.03:
+            dec_deg = -rng.uniform(0, 0.9)        # exercises the "-0" case
+        yield {
+            "utc_dt": dt,
+            "year": dt.year,
+            "month": MONTH_ABBR[dt.month - 1],
+            "day": dt.day,
+            "hour": dt.hour,
+            "minute": round(minute, 1),
+            "path": rng.uniform(5, 400),
+            "diam": rng.uniform(2, 300),
+            "durn": round(rng.choice([rng.uniform(0.1, 1.0), rng.uniform(1.0, 30.0)]), 1),
+            "unc": rng.uniform(0.01, 2.0),
+            "star_mag": round(rng.uniform(8.0, 17.0), 1),
+            "mag_drop": round(rng.uniform(0.1, 6.0), 1),
+            "star_no": _star_id(rng),
+            "flag": rng.choice(["", "", "", "A", "D"]),
+            "elong": rng.randrange(20, 180),
+            "asteroid": rng.choice(ASTEROIDS),
+            "alt": rng.randrange(5, 89),
+            "az": rng.randrange(0, 360),
+            "dist": rng.uniform(0.5, 40.0),
+            "sun_alt": rng.randrange(-60, -12),
+            "probability": rng.randrange(1, 100),
+            "ra_h": rng.randrange(24),
+            "ra_m": rng.randrange(60),
+            "ra_s": round(rng.uniform(0, 59.99), 2),
+            "dec": _dec_tokens(rng, dec_deg),
+            "trailer": str(rng.randrange(1, 9)) if rng.random() < 0.25 else "",
+        }
+
+
+def format_event_line(ev: dict) -> str:
+    star = ev["star_no"] + (f" {ev['flag']}" if ev["flag"] else "")
+    line = (
+        f" {ev['year']} {ev['month']} {ev['day']:2d} {ev['hour']:2d} {ev['minute']:4.1f}"
+        f" {ev['path']:6.1f} {ev['diam']:5.1f} {ev['durn']:4.1f}s {ev['unc']:4.2f}"
+        f" {ev['star_mag']:5.1f} {ev['mag_drop']:4.1f}  {star:<26s} {ev['elong']:3d}"
+        f"  {ev['asteroid']:<18s} {ev['alt']:3d} {ev['az']:3d} {ev['dist']:6.2f} {ev['sun_alt']:4d}"
+        f" {ev['probability']:3d}%  {ev['ra_h']:2d} {ev['ra_m']:02d} {ev['ra_s']:05.2f}  {ev['dec']}"
+    )
+    if ev["trailer"]:
+        line += f"  {ev['trailer']}"
+    return line
+
+
+def write_events_file(path, n: int, seed: int = 0, dense: bool = False, malformed_rate: float = 0.0) -> Path:
+    path = Path(path)
+    night = path.name[:8]
+    rng = random.Random(seed + 1)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("\n".join(HEADER) + "\n")
+        for ev in synthetic_events(n, night=night, seed=seed, dense=dense):
+            line = format_event_line(ev)
+            if malformed_rate and rng.random() < malformed_rate:
+                line = line[: rng.randrange(20, 60)]
+            f.write(line + "\n")
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Write a synthetic YYYYMMDD_events.txt file.")
+    ap.add_argument("out", help="Output path, named YYYYMMDD_events.txt")
+    ap.add_argument("-n", "--rows", type=int, default=1000, help="Number of event rows")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--dense", action="store_true", help="Cluster events into conflict windows")
+    ap.add_argument("--malformed", type=float, default=0.0, help="Fraction of truncated rows")
+    args = ap.parse_args()
+    write_events_file(args.out, args.rows, seed=args.seed, dense=args.dense, malformed_rate=args.malformed)
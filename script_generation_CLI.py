@@ -1,448 +1,289 @@
 # %%
-import re
-from dataclasses import dataclass
-from datetime import datetime
+from collections import Counter
 from pathlib import Path
-import pandas as pd
 import argparse
-
-MONTH_NUM = {"Jan":1,"Feb":2,"Mar":3,"Apr":4,"May":5,"Jun":6,
-             "Jul":7,"Aug":8,"Sep":9,"Oct":10,"Nov":11,"Dec":12}
-STAR_PREFIXES = {"UCAC4", "UCAC5", "TYC", "Gaia", "2MASS", "HIP", "GSC", "PPMXL"}
-EVENT_ROW = re.compile(r"^\s*\d{4}\s+[A-Za-z]{3}\s+\d{1,2}\b")
-PROB_TOK  = re.compile(r"^\d+%$")
-INT_TOK   = re.compile(r"^-?\d+$")
-
-def float_prefix(s: str) -> float:
-    m = re.match(r"\s*([0-9]*\.?[0-9]+)", s)
-    return float(m.group(1)) if m else float("nan")
+from script_generation_func import (
+    Event, EventParseError, read_event_rows, load_events, diagnostics_summary, count_diagnostics,
+    write_diagnostics, extract_event, events_from_frame, conflict_rows, infer_day_from_filename,
+    night_window_filter, read_header_footer, render_scs, telescope_accepts,
+)
+from script_generation_lazy import lazy_import
+
+script_generation_store = lazy_import("script_generation_store")
+script_generation_merge = lazy_import("script_generation_merge")
+script_generation_sky = lazy_import("script_generation_sky")
+script_generation_service = lazy_import("script_generation_service")
+script_generation_allocate = lazy_import("script_generation_allocate")
+script_generation_validate = lazy_import("script_generation_validate")
+script_generation_stream = lazy_import("script_generation_stream")
+script_generation_search = lazy_import("script_generation_search")
+script_generation_catalog = lazy_import("script_generation_catalog")
+script_generation_availability = lazy_import("script_generation_availability")
+
+# Plain single-file nights up to this size (a few thousand rows) are parsed
+# straight into Events; importing pandas takes longer than parsing them.
+FAST_PATH_MAX_BYTES = 1_000_000
 
 def filter_events_for_telescope(events, telescope_key: str, day_of_observation: int):
-    filtered = []
-    for ev in events:
-        if not night_window(ev, day_of_observation):
-            continue
-        if telescope_key == "c11":
-            # ADD MAG CONDITIONS HERE 
-            if not ((ev.mag >= 15.0) and (ev.dur < 1.0)):
-                if not ((ev.mag >= 14.5) and (ev.dur < 0.3)):
-                    filtered.append(ev)
-        elif telescope_key == "c14":
-            # ADD MAG CONDITIONS HERE
-            if not ((ev.mag >= 15.5) and (ev.dur < 1.0)):
-                filtered.append(ev)
-        elif telescope_key == "hubble24":
-            # ADD MAG CONDITIONS HERE
-            if not ((ev.mag >= 15.5) and (ev.dur < 1.0)):
-                filtered.append(ev)
-    return filtered
-
-def exposure_for_mag(mag: float) -> float:
-    inttime = 0.0067
-    if mag > 9.0:  inttime = 0.015
-    if mag > 9.5:  inttime = 0.020
-    if mag > 10.0: inttime = 0.025
-    if mag > 11.4: inttime = 0.030
-    if mag > 11.9: inttime = 0.040
-    if mag > 12.4: inttime = 0.050
-    if mag > 12.9: inttime = 0.075
-    if mag > 13.2: inttime = 0.100
-    if mag > 13.5: inttime = 0.150
-    if mag > 14.0: inttime = 0.200
-    if mag > 14.2: inttime = 0.225
-    if mag > 14.4: inttime = 0.275
-    if mag > 14.6: inttime = 0.300
-    if mag > 14.8: inttime = 0.325
-    if mag > 15.0: inttime = 0.375
-    if mag > 15.2: inttime = 0.425
-    if mag > 15.4: inttime = 0.500
-    return inttime
-
-@dataclass
-class Event:
-    asteroid_id: str
-    year: int
-    month: str
-    day: int
-    date_str: str
-    hour: int
-    minute_float: float
-    min_int: int
-    sec: int
-    time: str
-    date_object: datetime
-    dur: float
-    dur_token: str
-    mag: float
-    mag_token: str
-    mag_drop: float
-    radec: str
-    altaz: str
-    target: str
-    occulted_star: str
-    prob: float
-    maxint: float
-    inttime: float
-    nsamp: int
-    sttime: str
-    mttime: str
-    lstime: str
-    stime: float
-    lshour: int
-    lsmin: int
-
-def parse_radec_from_end(tokens):
-    t = tokens[:]
-    if t and t[-1].isdigit():
-        t = t[:-1]
-    if len(t) >= 7 and t[-4] in ("-", "+"):
-        ra_h, ra_m, ra_s = t[-7], t[-6], t[-5]
-        dec_d = t[-4] + t[-3]      # "-3" or "+12"
-        dec_m, dec_s = t[-2], t[-1]
-        core = t[:-7]
-    else:
-        ra_h, ra_m, ra_s, dec_d, dec_m, dec_s = t[-6:]
-        core = t[:-6]
-
-    ra  = f"{ra_h} {ra_m} {ra_s}"
-    dec = f"{dec_d} {dec_m} {dec_s}"
-    return core, ra, dec
-
-def find_altaz_index(tokens):
-    for i in range(len(tokens) - 3, -1, -1):
-        if INT_TOK.match(tokens[i]) and INT_TOK.match(tokens[i+1]):
-            alt = int(tokens[i]); az = int(tokens[i+1])
-            if -90 <= alt <= 90 and 0 <= az <= 360:
-                try:
-                    float(tokens[i+2])  # dist
-                    return i
-                except:
-                    pass
-    return None
-
-def find_probability(tokens):
-    for i in range(len(tokens) - 1, -1, -1):
-        if PROB_TOK.match(tokens[i]):
-            return float(tokens[i].rstrip("%"))
-    return float("nan")
-
-def find_star_anchor(tokens):
-    for i, tok in enumerate(tokens):
-        if tok in STAR_PREFIXES and i + 1 < len(tokens):
-            return f"{tok} {tokens[i+1]}", i + 2
-
-    for i, tok in enumerate(tokens):
-        if tok.startswith("J") and ("+" in tok or "-" in tok):
-            return tok, i + 1
-
-    return "", None
-
-def find_asteroid(tokens):
-    alt_i = find_altaz_index(tokens)
-    if alt_i is None:
-        return ""
-
-    star_no, j = find_star_anchor(tokens)
-    if j is None:
-        return ""
-    while j < len(tokens) and len(tokens[j]) == 1 and tokens[j].isalpha():
-        j += 1
-
-    if j + 1 >= alt_i:
-        return ""
-
-    start = j + 1
-    return " ".join(tokens[start:alt_i]).strip()
-
-def parse_event_line(line: str):
-    if not EVENT_ROW.match(line):
-        return None
-
-    tokens = line.split()
-    core, ra, dec = parse_radec_from_end(tokens)
-    year  = int(core[0]); month = core[1]; day = int(core[2])
-    hour  = int(core[3]); minute_float = float(core[4])
-
-    date = f"{year} {month} {day:02d}"
-    ut = f"{hour} {minute_float:g}"
-
-    durn_token = core[7]
-    durn = float_prefix(durn_token)   # seconds
-    star_mag = float(core[9])
-    mag_drop = float_prefix(core[10])
-
-    star_no, _ = find_star_anchor(core)
-    asteroid = find_asteroid(core)
-
-    alt_i = find_altaz_index(core)
-    alt = int(core[alt_i]) if alt_i is not None else None
-    az  = int(core[alt_i + 1]) if alt_i is not None else None
-
-    probability = find_probability(core)
-
-    return {
-        "date": date,
-        "ut": ut,
-        "durn": durn,
-        "star_mag": star_mag,
-        "mag_drop": mag_drop,
-        "star_no": star_no,
-        "asteroid": asteroid,
-        "alt": alt,
-        "az": az,
-        "probability": probability,
-        "ra": ra,
-        "dec": dec,
-    }
-
-def events_to_dataframe(path: str) -> pd.DataFrame:
-    rows = []
-    bad = []
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
-        for ln_no, line in enumerate(f, 1):
-            line = line.strip("\n")
-            if not line.strip():
-                continue
-            try:
-                d = parse_event_line(line)
-                if d:
-                    rows.append(d)
-            except Exception as e:
-                if len(bad) < 10:
-                    bad.append((ln_no, str(e), line))
-
-    df = pd.DataFrame(rows)
-    cols = ["date","ut","durn","star_mag","mag_drop","star_no",
-            "asteroid","alt","az","probability","ra","dec"]
-    return df[cols]
-
-def parse_date_str(date_str: str):
-    y_str, mon, d_str = date_str.split()
-    return int(y_str), mon, int(d_str)
-
-def parse_ut_str(ut_str: str):
-    h_str, m_str = ut_str.split()
-    return int(h_str), float(m_str)
-
-def extract_event(row) -> Event | None:
-    year, month, day = parse_date_str(row["date"])
-    date_str = f"{year} {month} {day:02d}"
-    hour, minute_float = parse_ut_str(row["ut"])
-    min_int = int(minute_float)
-    sec = int((minute_float - min_int) * 60)
-    time = f"{hour:02d}:{min_int:02d}:{sec:02d}"
-    durn_val = row["durn"]
-    if isinstance(durn_val, str):
-        dur_token = durn_val
-        dur = float_prefix(durn_val)
-    else:
-        dur = float(durn_val)
-        dur_token = f"{dur:g}s"
-
-    mag = float(row["star_mag"])
-    mag_token = f"{mag:g}"
-    mag_drop = float(row["mag_drop"])
-    radec = f'{row["ra"]} {row["dec"]}'
-    alt = int(row["alt"]) if pd.notna(row["alt"]) else 0
-    az  = int(row["az"])  if pd.notna(row["az"]) else 0
-    altaz = f"{alt:>3} {az:>3}"
-    target = str(row["asteroid"]) if pd.notna(row["asteroid"]) else ""
-    asteroid_id = target.split()[0] if target else ""
-    occulted_star = str(row["star_no"])
-    prob = float(row["probability"])
-    date_object = datetime(year, MONTH_NUM[month], day, hour, min_int, sec)
-
-    maxint = dur / 4.0
-    lsmin = min_int - 1
-    stmin = min_int - 8
-    mtmin = min_int - 2
-    mthour = hour
-    sthour = hour
-    lshour = hour
-    mtsec = sec + 30
-    lssec = sec + 30
-    if lssec >= 60:
-        lssec -= 60
-        lsmin += 1
-    if lsmin < 0:
-        lsmin += 60
-        lshour -= 1
-    if lshour < 0:
-        lshour += 24
-    lstime = f"{lshour:02d}:{lsmin:02d}:{lssec:02d}"
-    if mtsec >= 60:
-        mtsec -= 60
-        mtmin += 1
-    if mtmin < 0:
-        mtmin += 60
-        mthour -= 1
-    if mthour < 0:
-        mthour += 24
-    mttime = f"{mthour:02d}:{mtmin:02d}:{mtsec:02d}"
-    if stmin < 0:
-        stmin += 60
-        sthour -= 1
-    if sthour < 0:
-        sthour += 24
-    stime = sthour + stmin / 60.0
-    sttime = f"{sthour:02d}:{stmin:02d}:{sec:02d}"
-    inttime = exposure_for_mag(mag)
-    if inttime > maxint:
-        inttime = maxint
-
-    nsamp = int(60 / inttime) if inttime > 0 else 0
-
-    return Event(
-        asteroid_id=asteroid_id, year=year, month=month, day=day, date_str=date_str,
-        hour=hour, minute_float=minute_float, min_int=min_int, sec=sec, time=time, date_object=date_object,
-        dur=dur, mag=mag, dur_token=dur_token, mag_token=mag_token, mag_drop=mag_drop,
-        radec=radec, altaz=altaz, target=target,
-        occulted_star=occulted_star, prob=prob,
-        maxint=maxint, inttime=inttime, nsamp=nsamp,
-        sttime=sttime, mttime=mttime, lstime=lstime, stime=stime,
-        lshour=lshour, lsmin=lsmin
-    )
+    # the rules are TELESCOPE_REJECT in script_generation_func, shared with the DataFrame paths
+    return [ev for ev in events
+            if night_window(ev, day_of_observation) and telescope_accepts(ev.mag, ev.dur, telescope_key)]
 
 def night_window(ev: Event, day_filter: int) -> bool:
     return (ev.day == day_filter and ev.hour < 16) or (ev.day == day_filter - 1 and ev.hour > 16)
 
-def handle_num(x) -> str:
-    if isinstance(x, int):
-        return str(x)
-    if isinstance(x, float):
-        return format(x, ".6g")
-    return str(x)
-
-def handle_print(*args) -> str:
-    return " ".join(a if isinstance(a, str) else handle_num(a) for a in args) + "\n"
-
-def get_flagged_events(events_list):
-    flagged = []
-    current = [events_list[0]]
-    for i in range(1, len(events_list)):
-        time_difference = (events_list[i].date_object - events_list[i-1].date_object).total_seconds()
-        if time_difference <= 240:
-            current.append(events_list[i])
-        else:
-            if len(current) >= 2:
-                flagged.append(current)
-            current = [events_list[i]]
-    if len(current) >= 2:
-        flagged.append(current)
-    return flagged
-
-def infer_day_from_filename(path: str) -> int | None:
-    m = re.search(r"(\d{4})(\d{2})(\d{2})", Path(path).name)
-    return int(m.group(3)) if m else None
-
-def get_astrometry_string(radec: str) -> str:
-    parts = radec.split()
-    ra_h, ra_m, ra_s, dec_d, dec_m, dec_s = parts[:6]
-    sign = "-" if dec_d.startswith("-") else "+"
-    dec_d_abs = dec_d.lstrip("+-")
-    return f"#Astrometry coordinates: {ra_h}h{ra_m}m{ra_s}s {sign}{dec_d_abs}d{dec_m}m{dec_s}s\n"
-
-def generate_scs(events_txt_path: str, day_of_observation: int, output_path: str, pre_path: str, post_path: str, telescope: str) -> None:
-    with open(pre_path, "r", encoding="utf-8", errors="replace", newline="") as f:
-        header = f.read()
-    if not header.endswith("\n"):
-        header += "\n"
-    with open(post_path, "r", encoding="utf-8", errors="replace", newline="") as f:
-        footer = f.read()
+def report_diagnostics(summary: dict, errors) -> None:
+    # errors: (line_no, error_class, message) for each line that failed to parse
+    print(f"Parsed {summary['events']} events from {summary['lines']} lines "
+          f"({summary['skipped']} skipped, {summary['blank']} blank, {summary['error']} errors)")
+    for line_no, error_class, message in errors[:5]:
+        print(f"  line {line_no}: {error_class}: {message}")
+    if len(errors) > 5:
+        print(f"  ... {len(errors) - 5} more")
+
+def use_fast_path(events_txt_path: str, *frame_options) -> bool:
+    # --diagnostics, --store, --merge and --site all work on the DataFrame
+    if any(frame_options):
+        return False
+    try:
+        return Path(events_txt_path).stat().st_size <= FAST_PATH_MAX_BYTES
+    except OSError:
+        return False
+
+def load_events_fast(events_txt_path: str, strict: bool = False) -> list[Event]:
+    rows, diag = read_event_rows(events_txt_path, strict=strict)
+    summary = count_diagnostics(len(rows), Counter(d[1] for d in diag))
+    report_diagnostics(summary, [(d[0], d[2], d[3]) for d in diag if d[1] == "error"])
+    return [extract_event(r) for r in rows]
+
+def load_night_frame(events_txt_path: str, day_of_observation: int, strict: bool = False,
+                     diagnostics_path: str | None = None, store_path: str | None = None,
+                     merge_paths: list[str] | None = None, site_path: str | None = None,
+                     catalog_path: str | None = None, availability_path: str | None = None,
+                     min_usable: float | None = None):
+    if merge_paths:
+        df, changes = script_generation_merge.load_and_merge(list(merge_paths) + [events_txt_path])
+        print(f"Merged {len(merge_paths) + 1} prediction files into {len(df)} events "
+              f"({script_generation_merge.summarize_changes(changes)})")
+        moved = changes[(changes["status"] == "updated") & (changes["shift_s"].abs() >= 1)]
+        for r in moved.head(10).itertuples():
+            print(f"  {r.asteroid}: {r.utc_dt_old:%H:%M:%S} -> {r.utc_dt_new:%H:%M:%S}  prob {r.probability_old:g} -> {r.probability_new:g}")
+        if len(moved) > 10:
+            print(f"  ... {len(moved) - 10} more updated times")
+    elif store_path:
+        df = script_generation_store.load_night_from_store(store_path, events_txt_path)
+        print(f"Loaded {len(df)} events for {Path(events_txt_path).name[:8]} from {store_path}")
+    else:
+        df, diagnostics = load_events(events_txt_path, strict=strict)
+        errors = diagnostics[diagnostics["status"] == "error"]
+        report_diagnostics(diagnostics_summary(df, diagnostics),
+                           list(errors[["line_no", "error_class", "message"]].itertuples(index=False, name=None)))
+        if diagnostics_path:
+            write_diagnostics(diagnostics, diagnostics_path)
+            print(f"Diagnostics written to {diagnostics_path}")
+
+    df = df[night_window_filter(df, day_of_observation)]
+    if site_path:
+        site = script_generation_sky.load_site(site_path)
+        df = script_generation_sky.apply_visibility(df, site)
+        hidden = int((~df["visible"]).sum())
+        df = df[df["visible"]]
+        print(f"Dropped {hidden} events below the {site.name} horizon during their observing window")
+    if availability_path:
+        availability = script_generation_availability.load_availability(availability_path)
+        before = len(df)
+        df = script_generation_availability.apply_availability(df, availability, min_usable)
+        print(f"Dropped {before - len(df)} events that are not usable enough in {availability.name}; "
+              f"{int((df['usable'] < 1).sum())} more have their probability scaled down")
+    if catalog_path:
+        df = script_generation_catalog.enrich_events(df, script_generation_catalog.StarCatalog(catalog_path))
+        print(f"Catalog magnitudes for {int(df['cat_mag'].notna().sum())} of {len(df)} events")
+    return df
+
+def selection_mask(asteroids, stars, select=None, exclude=None):
+    # --select / --exclude: see script_generation_search
+    keep = script_generation_search.select_mask(asteroids, stars, select, exclude)
+    print(f"Kept {int(keep.sum())} of {len(keep)} events after --select/--exclude")
+    return keep
+
+def load_events_frame(events_txt_path: str, day_of_observation: int, *args, **kwargs) -> list[Event]:
+    return events_from_frame(load_night_frame(events_txt_path, day_of_observation, *args, **kwargs))
+
+def generate_scs(events_txt_path: str, day_of_observation: int, output_path: str, pre_path: str, post_path: str, telescope: str,
+                 strict: bool = False, diagnostics_path: str | None = None, store_path: str | None = None,
+                 merge_paths: list[str] | None = None, site_path: str | None = None,
+                 select: list[str] | None = None, exclude: list[str] | None = None,
+                 catalog_path: str | None = None, availability_path: str | None = None,
+                 min_usable: float | None = None) -> None:
+    header, footer = read_header_footer(pre_path, post_path)
 
     telescope_key = telescope.strip().lower()
-    df = events_to_dataframe(events_txt_path)
-
-    events_unfiltered = [extract_event(r) for _, r in df.iterrows()]
+    if use_fast_path(events_txt_path, diagnostics_path, store_path, merge_paths, site_path, catalog_path,
+                     availability_path):
+        events_unfiltered = load_events_fast(events_txt_path, strict=strict)
+    else:
+        events_unfiltered = load_events_frame(events_txt_path, day_of_observation, strict, diagnostics_path,
+                                              store_path, merge_paths, site_path, catalog_path,
+                                              availability_path, min_usable)
     events = filter_events_for_telescope(events_unfiltered, telescope_key, day_of_observation)
+    if select or exclude:
+        keep = selection_mask([ev.target for ev in events], [ev.occulted_star for ev in events], select, exclude)
+        events = [ev for ev, k in zip(events, keep) if k]
     events.sort(key=lambda e: e.date_object)
 
-    flagged_events = get_flagged_events(events)
+    slew_s = script_generation_sky.consecutive_slew_seconds(events, telescope_key)
+    print_conflicts(conflict_rows(events, slew_s))
+
+    remove_ids = ask_removals()
+    if remove_ids:
+        prev_len = len(events)
+        events = [ev for ev in events if ev.asteroid_id not in remove_ids]
+        new_len = len(events)
+        print(f"Removed {prev_len - new_len} events.")
+    else:
+        print("No events removed.")
+    out = render_scs(events, header, footer, script_generation_sky.consecutive_slew_seconds(events, telescope_key))
+
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        f.write(out)
+    print("Script Generated!")
+    check_script(out)
+
+def check_script(out: str) -> None:
+    for line in script_generation_validate.check_summary(out):
+        print(line)
+
+def print_conflicts(groups) -> None:
     print('\033[1m' + 'POTENTIAL CONFLICTS' + '\033[0m')
-    for i in flagged_events:
-        for j in i:
-            print("Asteroid:", j.target,"  Event time:", j.time, "  Mag:", j.mag_token, "  Dur:", j.dur_token, "  Prob:", j.prob, " AltAz:", j.altaz)
+    for group in groups:
+        for j in group:
+            print("Asteroid:", j["target"],"  Event time:", j["time"], "  Mag:", j["mag"], "  Dur:", j["dur"], "  Prob:", j["prob"], " AltAz:", j["altaz"], f"  Slew: {j['slew']:.0f}s")
         print()
 
+def ask_removals() -> set:
     events_to_remove = input("Enter the asteriod number of the events to remove, separated by a comma. If none to remove, enter 0: ").strip()
 
     remove_ids = set()
     if events_to_remove != "0" and events_to_remove != "":
         parts = [p.strip() for p in events_to_remove.replace(" ", ",").split(",") if p.strip()]
         remove_ids = set(parts)
+    return remove_ids
+
+def generate_scs_via_service(address: str, events_txt_path: str, day_of_observation: int, output_path: str,
+                             pre_path: str, post_path: str, telescope: str, merge_paths: list[str] | None = None,
+                             site_path: str | None = None) -> bool:
+    # Thin client: the service parses, filters and schedules. Returns False when no
+    # service is listening so the caller can work locally instead.
+    params = script_generation_service.night_params(events_txt_path, merge_paths, site_path, day_of_observation)
+    params["telescope"] = telescope.strip().lower()
+    try:
+        reply = script_generation_service.call("conflicts", address, **params)
+    except OSError as e:
+        print(f"Planning service at {address} not reachable ({e}); working locally")
+        return False
+    print(reply["message"])
+    print_conflicts(reply["groups"])
+
+    remove_ids = ask_removals()
+    out = script_generation_service.call("generate", address, remove=sorted(remove_ids),
+                                         pre=str(Path(pre_path).resolve()), post=str(Path(post_path).resolve()), **params)
     if remove_ids:
-        prev_len = len(events)
-        events = [ev for ev in events if ev.asteroid_id not in remove_ids]
-        new_len = len(events)
-        print(f"Removed {prev_len - new_len} events.")
+        print(f"Removed {reply['events'] - out['events']} events.")
     else:
         print("No events removed.")
-    out = header
-    star = 1
-    laststime = -10.0
-    for ev in events:
-        out += handle_print("#Start hours ", ev.stime, " previous: ", laststime)
-        out += handle_print("# *************** Occultation", star, "************")
-        out += handle_print("#")
-        out += handle_print(
-            "#UT= ", ev.time,
-            "Dur", ev.dur_token,
-            "Mv=", ev.mag_token,
-            "AltAz=", ev.altaz,
-            "LocalStart=", ev.lstime,
-            "prob=", ev.prob,
-            "Target=", ev.target,
-            "RA/DEC", ev.radec,
-            "star=", ev.occulted_star,
-            "MagDrop=", ev.mag_drop
-        )
-        out += get_astrometry_string(ev.radec)
-        out += handle_print("TARGETNAME \"", ev.target, "\"")
-        out += handle_print("UNLOCK CONTROLS")
-        out += handle_print("MOUNT TRACKING None")
-        if ev.hour > 16:
-            out += handle_print('WAIT UNTIL LATER THAN LOCALTIME "', ev.sttime, '"') #midnight change to be handled here
-        else:
-            out += handle_print('WAIT UNTIL LATER THAN LOCALTIME "', ev.sttime, '"')
-        out += handle_print("IGNORE ERRORS FROM ONERROR RUN \"\"")
-        out += handle_print("MOUNT TRACKING Sidereal")
-        out += handle_print("  MOUNT GOTO \"", ev.radec, "\"")
-        out += handle_print("END IGNORE ERRORS")
-        out += handle_print("DELAY 2")
-        out += handle_print("#")
-        if (ev.stime - laststime) * 60 > 20:
-            out += handle_print("GOSUB AFOCUS")
-        out += handle_print("GOSUB PLATESOLV")
-        out += handle_print("WAIT UNTIL LATER THAN LOCALTIME \"", ev.mttime, "\"")
-        out += handle_print("GOSUB PLATESOLV")
-        out += handle_print("SET RESOLUTION TO 800x600")
-        out += handle_print("SET EXPOSURE TO", ev.inttime)
-        out += handle_print("DELAY 3")
-        out += handle_print("DISPLAY STRETCH AUTO")
-        out += handle_print("WAIT UNTIL LATER THAN LOCALTIME \"", ev.lstime, "\"")
-        out += handle_print("  CAPTURE 60 SECONDS LIVE FRAMES")
-        out += handle_print("SET RESOLUTION TO 1920x1200")
-        out += handle_print("SET EXPOSURE TO 0.5")
-        out += handle_print("DELAY 3")
-        out += handle_print("DISPLAY STRETCH AUTO")
-        out += handle_print("END UNLOCK")
-
-        star += 1
-        laststime = ev.lshour + (ev.lsmin + 5) / 60.0
-    out += footer
-
     with open(output_path, "w", encoding="utf-8", newline="") as f:
-        f.write(out)
+        f.write(out["scs"])
+    print("Script Generated!")
+    check_script(out["scs"])
+    return True
+
+def generate_scs_streaming(events_txt_path: str, day_of_observation: int, output_path: str, pre_path: str,
+                           post_path: str, telescope: str, strict: bool = False, site_path: str | None = None,
+                           select: list[str] | None = None, exclude: list[str] | None = None,
+                           catalog_path: str | None = None, availability_path: str | None = None,
+                           min_usable: float | None = None) -> None:
+    # For prediction files too large to hold in memory: no conflict listing or removal
+    # prompt, the script is written batch by batch (script_generation_stream).
+    site = script_generation_sky.load_site(site_path) if site_path else None
+    catalog = script_generation_catalog.StarCatalog(catalog_path) if catalog_path else None
+    availability = script_generation_availability.load_availability(availability_path) if availability_path else None
+    counts = Counter()
+    n = script_generation_stream.stream_scs(events_txt_path, output_path, pre_path, post_path, telescope,
+                                            day=day_of_observation, site=site, strict=strict, counts=counts,
+                                            select=select, exclude=exclude, catalog=catalog,
+                                            availability=availability, min_usable=min_usable)
+    report_diagnostics(count_diagnostics(counts["event"], counts), [])
+    print(f"Wrote {n} events to {output_path}")
     print("Script Generated!")
 
+def scope_output_path(out_path: str, telescope: str) -> str:
+    # YYYYMMDD_174_script.scs -> YYYYMMDD_174_script_c14.scs
+    p = Path(out_path)
+    return str(p.with_name(f"{p.stem}_{telescope}{p.suffix}"))
+
+def allocate_scs(events_txt_path: str, day_of_observation: int, output_path: str, pre_path: str, post_path: str,
+                 telescopes: list[str], strict: bool = False, diagnostics_path: str | None = None,
+                 store_path: str | None = None, merge_paths: list[str] | None = None,
+                 site_path: str | None = None, select: list[str] | None = None,
+                 exclude: list[str] | None = None, catalog_path: str | None = None,
+                 availability_path: str | None = None, min_usable: float | None = None) -> None:
+    # One pass for several scopes: every event goes to at most one of them (see
+    # script_generation_allocate), so no conflicts are left to remove by hand.
+    header, footer = read_header_footer(pre_path, post_path)
+    telescopes = [t.strip().lower() for t in telescopes]
+    df = load_night_frame(events_txt_path, day_of_observation, strict, diagnostics_path,
+                          store_path, merge_paths, site_path, catalog_path, availability_path, min_usable)
+    if select or exclude:
+        df = df[selection_mask(df["asteroid"].to_numpy(), df["star_no"].to_numpy(), select, exclude)]
+    df = df.sort_values("utc_dt", kind="mergesort")
+    accept = script_generation_allocate.acceptance_matrix(df, telescopes)
+    keep = accept.any(axis=1)
+    events = events_from_frame(df[keep])
+    result = script_generation_allocate.allocate(events, accept[keep], telescopes)
+
+    print(f"Allocated {sum(s >= 0 for s in result.scope)} of {len(events)} accepted events across "
+          f"{', '.join(telescopes)} (expected {result.value:.2f} successful occultations)")
+    for tel in telescopes:
+        scheduled = result.schedules[tel]
+        path = scope_output_path(output_path, tel)
+        out = render_scs(scheduled, header, footer, script_generation_sky.consecutive_slew_seconds(scheduled, tel))
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(out)
+        print(f"  {tel}: {len(scheduled)} events, expected {sum(ev.prob for ev in scheduled) / 100:.2f} -> {path}")
+        for line in script_generation_validate.check_summary(out):
+            print("  " + line)
+    print("Scripts Generated!")
+
 def main() -> None:
     ap = argparse.ArgumentParser(description="Generate .scs script from event summary.")
     ap.add_argument("events_txt", help="Input events text file, YYYYMMDD_events.txt")
-    ap.add_argument("telescope", choices=["c11", "c14", "hubble24"], help="Input telescope type")
+    ap.add_argument("telescope", nargs="+", choices=["c11", "c14", "hubble24"],
+                    help="Input telescope type; with several, events are shared out between them and one script is written per telescope")
     ap.add_argument("--day", type=int, default=None, help="Day-of-month (e.g. 17). If omitted, inferred from filename.")
     ap.add_argument("--pre", default="pre174.txt", help="Header file (pre174)")
     ap.add_argument("--post", default="post571.txt", help="Footer file (post571)")
     ap.add_argument("-o", "--out", default=None, help="Output .scs path (default: YYYYMMDD_174_script.scs)")
+    ap.add_argument("--strict", action="store_true", help="Stop at the first line that fails to parse")
+    ap.add_argument("--diagnostics", default=None, help="Write unparsed lines to this CSV file")
+    ap.add_argument("--site", default=None, help="Site config (JSON with lat, lon, min_alt and an optional horizon file); drops events not above the horizon")
+    source = ap.add_mutually_exclusive_group()
+    source.add_argument("--store", default=None, help="Event store (SQLite) to load the night from; the events file is ingested if the store is out of date")
+    source.add_argument("--merge", nargs="+", default=None, metavar="OLDER_EVENTS_TXT",
+                        help="Earlier prediction files (oldest first) to merge with events_txt; the newest prediction of each event is kept")
+    ap.add_argument("--catalog", default=None,
+                    help="Star catalog file (script_generation_catalog.py build); exposures use its magnitudes where it has the star")
+    ap.add_argument("--availability", default=None,
+                    help="Availability file (UTC start, end, usable fraction per line); drops events whose window is not usable enough and scales the probability of the rest")
+    ap.add_argument("--min-usable", type=float, default=None, metavar="FRACTION",
+                    help="Lowest usable fraction of an event's window with --availability (default 0.5)")
+    ap.add_argument("--select", action="append", default=None, metavar="PATTERN",
+                    help="Only keep events whose asteroid or star contains PATTERN (case-insensitive; ^ anchors it at the start, repeatable)")
+    ap.add_argument("--exclude", action="append", default=None, metavar="PATTERN",
+                    help="Drop events whose asteroid or star contains PATTERN (same matching as --select, repeatable)")
+    ap.add_argument("--stream", action="store_true",
+                    help="Parse, filter and write in bounded batches for very large files; no conflict listing or removal prompt")
+    ap.add_argument("--service", nargs="?", const="127.0.0.1:8765", default=None, metavar="HOST:PORT",
+                    help="Ask a running script_generation_service.py for the plan instead of parsing here (default 127.0.0.1:8765)")
 
     args = ap.parse_args()
     day_of_observation = args.day if args.day is not None else infer_day_from_filename(args.events_txt)
@@ -453,7 +294,46 @@ def main() -> None:
     else:
         out_path = args.out
 
-    generate_scs(args.events_txt, day_of_observation, out_path, args.pre, args.post, args.telescope)
+    if args.service and (args.store or args.strict or args.diagnostics or args.select or args.exclude or args.catalog
+                         or args.availability):
+        ap.error("--service cannot be combined with --store, --strict, --diagnostics, --select, --exclude, --catalog "
+                 "or --availability")
+    if args.min_usable is not None and not args.availability:
+        ap.error("--min-usable needs --availability")
+    if len(set(args.telescope)) != len(args.telescope):
+        ap.error("each telescope may only be given once")
+    if len(args.telescope) > 1 and args.service:
+        ap.error("--service plans one telescope at a time")
+    if args.stream and (args.store or args.merge or args.service or args.diagnostics or len(args.telescope) > 1):
+        ap.error("--stream works on one events file and one telescope, without --store, --merge, --service or --diagnostics")
+
+    try:
+        if len(args.telescope) > 1:
+            allocate_scs(args.events_txt, day_of_observation, out_path, args.pre, args.post, args.telescope,
+                         strict=args.strict, diagnostics_path=args.diagnostics, store_path=args.store,
+                         merge_paths=args.merge, site_path=args.site, select=args.select, exclude=args.exclude,
+                         catalog_path=args.catalog, availability_path=args.availability, min_usable=args.min_usable)
+            return
+        telescope = args.telescope[0]
+        if args.stream:
+            generate_scs_streaming(args.events_txt, day_of_observation, out_path, args.pre, args.post, telescope,
+                                   strict=args.strict, site_path=args.site, select=args.select, exclude=args.exclude,
+                                   catalog_path=args.catalog, availability_path=args.availability,
+                                   min_usable=args.min_usable)
+            return
+        if args.service and generate_scs_via_service(args.service, args.events_txt, day_of_observation, out_path,
+                                                     args.pre, args.post, telescope, args.merge, args.site):
+            return
+        generate_scs(args.events_txt, day_of_observation, out_path, args.pre, args.post, telescope,
+                     strict=args.strict, diagnostics_path=args.diagnostics, store_path=args.store,
+                     merge_paths=args.merge, site_path=args.site, select=args.select, exclude=args.exclude,
+                     catalog_path=args.catalog, availability_path=args.availability, min_usable=args.min_usable)
+    except EventParseError as e:
+        ap.exit(1, f"Parse error: {e}\n")
+    except ValueError as e:
+        if not args.service:
+            raise
+        ap.exit(1, f"Planning service error: {e}\n")
 
 if __name__ == "__main__":
     main()
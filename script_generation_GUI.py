@@ -1,12 +1,27 @@
+from __future__ import annotations
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import pandas as pd
+from tkinter import ttk, filedialog, messagebox, simpledialog
 from pathlib import Path
-import script_generation_func
+from script_generation_lazy import lazy_import
+
+# Loaded on first use so the window opens before pandas has finished importing.
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+script_generation_func = lazy_import("script_generation_func")
+script_generation_store = lazy_import("script_generation_store")
+script_generation_merge = lazy_import("script_generation_merge")
+script_generation_sky = lazy_import("script_generation_sky")
+script_generation_service = lazy_import("script_generation_service")
+script_generation_session = lazy_import("script_generation_session")
+script_generation_validate = lazy_import("script_generation_validate")
+script_generation_search = lazy_import("script_generation_search")
+script_generation_catalog = lazy_import("script_generation_catalog")
+script_generation_availability = lazy_import("script_generation_availability")
 
 REQUIRED_INPUT_COLS = ["date","ut","durn","star_mag","mag_drop","star_no",
-                       "asteroid","alt","az","probability","ra","dec"]
+                       "asteroid","alt","az","probability","ra_deg","dec_deg"]
 DISPLAY_COLS = ["date","ut_str","asteroid","star_mag","durn","probability","mag_drop","altaz"]
+SOURCE_COLS = ["date","asteroid","star_mag","durn","probability","mag_drop","alt","az"]
 
 HEADER_LABELS = {
     "date": "Date",
@@ -18,26 +33,63 @@ HEADER_LABELS = {
     "mag_drop": "Mag Drop",
     "altaz": "Alt Az",
 }
-def mark_close_events(df_slice: pd.DataFrame, time_col="utc_dt", window_sec=240) -> pd.DataFrame:
-    if df_slice.empty:
-        out = df_slice.copy()
-        out["_close4"] = False
-        return out
+# Quick filters over the table rows: (name, label, column, bound)
+FILTER_FIELDS = [
+    ("mag_min", "Mag from", "star_mag", "min"),
+    ("mag_max", "to", "star_mag", "max"),
+    ("prob_min", "Min prob", "probability", "min"),
+    ("dur_min", "Min dur", "durn", "min"),
+    ("alt_min", "Min alt", "alt", "min"),
+]
+NUMERIC_COLS = ["star_mag", "durn", "probability", "mag_drop", "alt"]
+# Timeline under the tables: every event's sttime -> capture-end window, accepted events in
+# the upper band and rejected ones in the lower. Overlapping bars are stacked in up to
+# TIMELINE_ROWS rows per band and shaded by probability (PROB_STEPS, percent).
+TIMELINE_HEIGHT = 160
+TIMELINE_AXIS = 18                 # pixels for the time labels
+TIMELINE_ROWS = 12
+PROB_STEPS = [15, 50]
+BAR_COLORS = [["#b9dcb5", "#6cb565", "#2e7d32"],      # accepted
+              ["#dadde2", "#a6afba", "#6b7785"]]      # rejected
+TICK_STEPS = [60, 300, 600, 1800, 3600, 7200, 14400]
+MIN_SPAN_S = 600
 
-    out = df_slice.sort_values(time_col, kind="mergesort").copy()
-    dt = out[time_col]
+def close_flags(seconds, window_sec=240):
+    # seconds ascending; True where the previous or next row is within window_sec
+    out = np.zeros(len(seconds), dtype=bool)
+    near = np.diff(seconds) <= window_sec
+    out[1:] |= near
+    out[:-1] |= near
+    return out
 
-    dprev = dt.diff().dt.total_seconds()
-    dnext = dt.shift(-1).diff().dt.total_seconds()
+def stack_rows(starts, width):
+    # Row per bar (starts ascending, all bars width long) such that bars sharing a row do
+    # not overlap: the bars overlapping bar i are the fewer than depth bars just before it,
+    # so i % depth differs from all of theirs. Returns (rows, depth).
+    n = len(starts)
+    if not n:
+        return np.zeros(0, dtype=np.int64), 1
+    before = np.arange(n) - np.searchsorted(starts, starts - width, "right")
+    depth = int(before.max()) + 1
+    return np.arange(n) % depth, depth
 
-    close_prev = (dprev <= window_sec)
-    close_next = (dnext.abs() <= window_sec)
-
-    out["_close4"] = close_prev.fillna(False) | close_next.fillna(False)
-    return out
+def merge_spans(key, x0, x1, gap=1.0):
+    # One span per run of bars with the same key that overlap or are within gap pixels,
+    # so a zoomed-out night draws a few bands instead of a rectangle per event.
+    if not len(key):
+        return key, x0, x1
+    order = np.lexsort((x0, key))
+    key, x0, x1 = key[order], x0[order], x1[order]
+    # keys are moved apart on one axis so a single running maximum serves them all
+    shift = key * (2 * (max(np.abs(x0).max(), np.abs(x1).max()) + gap) + 1)
+    reach = np.maximum.accumulate(x1 + shift)
+    new = np.ones(len(key), dtype=bool)
+    new[1:] = x0[1:] + shift[1:] > reach[:-1] + gap
+    starts = np.flatnonzero(new)
+    return key[starts], x0[starts], np.maximum.reduceat(x1, starts)
 
 class DualTableApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, session_path=None):
         super().__init__()
         screen_width = self.winfo_screenwidth()
         screen_height = self.winfo_screenheight()
@@ -45,17 +97,61 @@ class DualTableApp(tk.Tk):
         self.geometry(f"{screen_width}x{screen_height}")
 
         self.events_fullpath = ""
+        self.older_paths = []
         self.events_path = tk.StringVar()
         self.pre_path = tk.StringVar(value="pre174.txt")
         self.post_path = tk.StringVar(value="post571.txt")
         self.out_path = tk.StringVar()
+        self.site_path = tk.StringVar()
+        self.catalog_path = tk.StringVar()
+        self.availability_path = tk.StringVar()
+        self.service_addr = tk.StringVar()
         self.day_var = tk.IntVar(value=1)
         self.day_text = tk.StringVar(value="Day: —")
+        self.parse_text = tk.StringVar(value="")
 
         self.telescope = tk.StringVar(value="c14")
 
         self.df_all = None
+        self._df_loaded = None
+        # per telescope: filter result as a bool array over df_all rows (row i has _uid i),
+        # and the user's moves as a sparse {uid: accepted} layer on top of it
+        self._accept_cache = {}
+        self._overrides = {}
+        self._shown = None
+        self._shown_close = None
+        # view: (column, descending) or None for time order, argsort/rank cache, and the rows
+        # shown: _visible is the quick filters' mask (_filtered) and the search's (_found)
+        self._sort = None
+        self._orders = {}
+        self._visible = None
+        self._filtered = None
+        self._found = None
+        self._search = None
+        self.filter_vars = {name: tk.StringVar() for name, *_ in FILTER_FIELDS}
+        self.search_var = tk.StringVar()
+        self.view_text = tk.StringVar(value="")
+        # timeline: (first, last) second across the canvas, per band (uids, window starts,
+        # stacking rows, row count), and the pool of bar rectangles with their fills
+        self._tl_view = None
+        self._tl_lanes = []
+        self._tl_items = []
+        self._tl_fills = []
+        self._tl_used = 0
+        self._tl_drag = None
+        self._tl_after = None
+        self.session_path = None
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        if session_path:
+            self.after(0, lambda: self.restore_session(session_path))
+        else:
+            self.after(200, self._preload)
+
+    def _preload(self):
+        # pay the pandas import while the user is still picking a file
+        pd.DataFrame
+        script_generation_func.load_events
 
     def _configure_row_tags(self, tree):
         tree.tag_configure("close4", background="#fff4cc")
@@ -66,8 +162,10 @@ class DualTableApp(tk.Tk):
         top.pack(fill="x", padx=10, pady=8)
 
         ttk.Button(top, text="Upload events.txt", command=self.pick_events).grid(row=0, column=0, padx=6)
+        ttk.Button(top, text="Load from store", command=self.pick_store).grid(row=4, column=0, padx=6)
         ttk.Label(top, textvariable=self.events_path, width=50).grid(row=0, column=1, sticky="w")
         ttk.Label(top, textvariable=self.day_text, width=15).grid(row=0, column=2, sticky="w", padx=6)
+        ttk.Label(top, textvariable=self.parse_text).grid(row=4, column=1, columnspan=2, sticky="w", padx=(8, 2))
 
         ttk.Label(top, text="pre path:").grid(row=1, column=0, sticky="e")
         ttk.Entry(top, textvariable=self.pre_path, width=40).grid(row=1, column=1, sticky="we", padx=(8, 2))
@@ -81,6 +179,21 @@ class DualTableApp(tk.Tk):
         ttk.Entry(top, textvariable=self.out_path, width=40).grid(row=3, column=1, sticky="we", padx=(8, 2))
         ttk.Button(top, text="Browse", command=self.pick_out).grid(row=3, column=2, padx=(2, 0))
 
+        ttk.Label(top, text="site config:").grid(row=5, column=0, sticky="e")
+        ttk.Entry(top, textvariable=self.site_path, width=40).grid(row=5, column=1, sticky="we", padx=(8, 2))
+        ttk.Button(top, text="Browse", command=self.pick_site).grid(row=5, column=2, padx=(2, 0))
+
+        ttk.Label(top, text="planning service:").grid(row=6, column=0, sticky="e")
+        ttk.Entry(top, textvariable=self.service_addr, width=40).grid(row=6, column=1, sticky="we", padx=(8, 2))
+
+        ttk.Label(top, text="star catalog:").grid(row=7, column=0, sticky="e")
+        ttk.Entry(top, textvariable=self.catalog_path, width=40).grid(row=7, column=1, sticky="we", padx=(8, 2))
+        ttk.Button(top, text="Browse", command=self.pick_catalog).grid(row=7, column=2, padx=(2, 0))
+
+        ttk.Label(top, text="availability:").grid(row=8, column=0, sticky="e")
+        ttk.Entry(top, textvariable=self.availability_path, width=40).grid(row=8, column=1, sticky="we", padx=(8, 2))
+        ttk.Button(top, text="Browse", command=self.pick_availability).grid(row=8, column=2, padx=(2, 0))
+
 
         tel_frame = ttk.LabelFrame(top, text="Telescope")
         tel_frame.grid(row=0, column=3, rowspan=4, padx=12, pady=2, sticky="ns")
@@ -91,6 +204,21 @@ class DualTableApp(tk.Tk):
                 command=self.on_telescope_changed
             ).grid(row=i, column=0, sticky="w", padx=8, pady=4)
 
+        filt = ttk.Frame(self)
+        filt.pack(fill="x", padx=10)
+        ttk.Label(filt, text="Search").grid(row=0, column=0, sticky="e", padx=(0, 2))
+        ttk.Entry(filt, textvariable=self.search_var, width=20).grid(row=0, column=1, sticky="w")
+        self.search_var.trace_add("write", lambda *_: self.apply_search())
+        for i, (name, label, _, _) in enumerate(FILTER_FIELDS, 1):
+            ttk.Label(filt, text=label).grid(row=0, column=2 * i, sticky="e", padx=(8, 2))
+            entry = ttk.Entry(filt, textvariable=self.filter_vars[name], width=7)
+            entry.grid(row=0, column=2 * i + 1, sticky="w")
+            entry.bind("<Return>", lambda _e: self.apply_filters())
+        col = 2 * len(FILTER_FIELDS) + 2
+        ttk.Button(filt, text="Filter", command=self.apply_filters).grid(row=0, column=col, padx=(12, 2))
+        ttk.Button(filt, text="Clear", command=self.clear_filters).grid(row=0, column=col + 1, padx=2)
+        ttk.Label(filt, textvariable=self.view_text).grid(row=0, column=col + 2, sticky="w", padx=8)
+
         mid = ttk.Frame(self)
         mid.pack(fill="both", expand=True, padx=10, pady=8)
         mid.columnconfigure(0, weight=1)
@@ -114,10 +242,29 @@ class DualTableApp(tk.Tk):
         ttk.Button(btns, text="← Move to Accepted", command=self.move_to_accepted).pack(pady=(180, 10))
         ttk.Button(btns, text="→ Move to Rejected", command=self.move_to_rejected).pack(pady=10)
 
+        line = ttk.LabelFrame(self, text="Timeline (drag to pan, wheel to zoom, click a bar to select it)")
+        line.pack(fill="x", padx=10, pady=(0, 8))
+        line.columnconfigure(0, weight=1)
+        self.timeline = tk.Canvas(line, height=TIMELINE_HEIGHT, background="white", highlightthickness=0)
+        self.timeline.grid(row=0, column=0, sticky="ew")
+        self.timeline_sb = ttk.Scrollbar(line, orient="horizontal", command=self.scroll_timeline)
+        self.timeline_sb.grid(row=1, column=0, sticky="ew")
+        self.timeline.bind("<Configure>", lambda _e: self.draw_timeline())
+        self.timeline.bind("<ButtonPress-1>", self._tl_press)
+        self.timeline.bind("<B1-Motion>", self._tl_motion)
+        self.timeline.bind("<ButtonRelease-1>", self._tl_release)
+        self.timeline.bind("<MouseWheel>", lambda e: self.zoom_timeline(e.x, 0.8 if e.delta > 0 else 1.25))
+        self.timeline.bind("<Button-4>", lambda e: self.zoom_timeline(e.x, 0.8))
+        self.timeline.bind("<Button-5>", lambda e: self.zoom_timeline(e.x, 1.25))
+        for tree in (self.good_tree, self.bad_tree):
+            tree.bind("<<TreeviewSelect>>", lambda _e: self._draw_selection())
+
         # bottom generate
         bottom = ttk.Frame(self)
         bottom.pack(fill="x", padx=10, pady=(0, 10))
         ttk.Button(bottom, text="Generate SCS from Accepted", command=self.on_generate).pack(side="right")
+        ttk.Button(bottom, text="Open session", command=self.pick_session).pack(side="left")
+        ttk.Button(bottom, text="Save session", command=self.save_session).pack(side="left", padx=6)
 
     def _make_tree(self, parent):
         tree = ttk.Treeview(parent, columns=DISPLAY_COLS, show="headings", selectmode="extended")
@@ -130,17 +277,21 @@ class DualTableApp(tk.Tk):
         hsb.grid(row=1, column=0, sticky="ew")
 
         for col in DISPLAY_COLS:
-            tree.heading(col, text=HEADER_LABELS.get(col, col))
+            tree.heading(col, text=HEADER_LABELS.get(col, col), command=lambda c=col: self.sort_by(c))
             tree.column(col, width=120, stretch=tk.YES, anchor="center")
 
         return tree
 
     def pick_events(self):
-        p = filedialog.askopenfilename(filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
-        if not p:
+        paths = filedialog.askopenfilenames(filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not paths:
             return
+        # several files = successive prediction updates; the newest one wins
+        paths = sorted(paths, key=lambda x: Path(x).stat().st_mtime)
+        p = paths[-1]
+        self.older_paths = list(paths[:-1])
         self.events_fullpath = p
-        self.events_path.set(Path(p).name)
+        self.events_path.set(Path(p).name + (f" (+{len(self.older_paths)} older)" if self.older_paths else ""))
         d = script_generation_func.infer_day_from_filename(p)
         self.day_var.set(d)
         self.day_text.set(f"Day: {d:02d}")
@@ -153,8 +304,51 @@ class DualTableApp(tk.Tk):
         stem = Path(p).name[:8]
         self.out_path.set(str(Path(p).with_name(f"{stem}_174_script.scs")))
 
+        sidecar = script_generation_session.session_sidecar_path(p)
+        if sidecar.exists() and messagebox.askyesno(
+            "Saved session", f"Restore the triage saved in {sidecar.name}?"
+        ):
+            self.restore_session(sidecar)
+            return
+        self.session_path = None
         self.load_events_into_tables()
 
+    def pick_store(self):
+        p = filedialog.askopenfilename(filetypes=[("Event store", "*.sqlite *.db"), ("All files", "*.*")])
+        if not p:
+            return
+        try:
+            with script_generation_store.EventStore(p) as store:
+                nights = [n for n in store.sources()["night"].dropna().tolist()]
+                if not nights:
+                    messagebox.showerror("Empty store", "The store has no ingested nights.")
+                    return
+                night = simpledialog.askstring(
+                    "Night", f"Night to load (YYYYMMDD):\n{', '.join(nights[-10:])}", initialvalue=nights[-1], parent=self
+                )
+                if not night:
+                    return
+                df = store.load_night(night)
+        except Exception as e:
+            messagebox.showerror("Store error", str(e))
+            return
+        if df.empty:
+            messagebox.showerror("No events", f"No events for {night} in the store.")
+            return
+
+        d = script_generation_func.infer_day_from_filename(f"{night}_events.txt")
+        if d is None:
+            messagebox.showerror("Bad night", "Expected a night like YYYYMMDD")
+            return
+        self.events_fullpath = ""
+        self.older_paths = []
+        self.events_path.set(f"{night} ({Path(p).name})")
+        self.day_var.set(d)
+        self.day_text.set(f"Day: {d:02d}")
+        self.out_path.set(str(Path(p).with_name(f"{night[:8]}_174_script.scs")))
+        self.parse_text.set(f"Events: {len(df)} (from store)")
+        self.show_events(df)
+
     def pick_pre(self):
         p = filedialog.askopenfilename(filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
         if p:
@@ -165,89 +359,605 @@ class DualTableApp(tk.Tk):
         if p:
             self.post_path.set(p)
 
+    def pick_site(self):
+        p = filedialog.askopenfilename(filetypes=[("Site config", "*.json"), ("All files", "*.*")])
+        if not p:
+            return
+        self.site_path.set(p)
+        self._reload()
+
+    def pick_catalog(self):
+        p = filedialog.askopenfilename(filetypes=[("Star catalog", "*.starcat"), ("All files", "*.*")])
+        if not p:
+            return
+        self.catalog_path.set(p)
+        self._reload()
+
+    def pick_availability(self):
+        p = filedialog.askopenfilename(filetypes=[("Availability", "*.txt *.csv"), ("All files", "*.*")])
+        if not p:
+            return
+        self.availability_path.set(p)
+        self._reload()
+
+    def _reload(self):
+        # after the site, catalog or availability changed
+        if self._service()[0]:
+            self.load_events_into_tables()
+        elif self._df_loaded is not None:
+            self.show_events(self._df_loaded)
+        elif self.events_fullpath:
+            self.load_events_into_tables()
+
     def pick_out(self):
         p = filedialog.asksaveasfilename(defaultextension=".scs", filetypes=[("SCS files", "*.scs"), ("All files", "*.*")])
         if p:
             self.out_path.set(p)
 
+    def _service(self):
+        # (address, night params) when a planning service is set and the night came from a file
+        addr = self.service_addr.get().strip()
+        if not addr or not self.events_fullpath:
+            return None, None
+        site = self.site_path.get().strip() or None
+        return addr, script_generation_service.night_params(self.events_fullpath, self.older_paths, site,
+                                                            int(self.day_var.get()))
+
     def load_events_into_tables(self):
         path = self.events_fullpath
         if not path:
             return
 
+        addr, params = self._service()
+        if addr:
+            tel = self.telescope.get()
+            try:
+                reply = script_generation_service.call("rows", addr, telescope=tel, **params)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Planning service", str(e))
+                return
+            self.parse_text.set(f"{reply['message']}  (service {addr})")
+            # the service already applied the night window and the site horizon
+            self.show_events(pd.DataFrame(reply["rows"], columns=reply["columns"]), local=False)
+            self._overrides[tel] = {int(k): v for k, v in reply["overrides"].items()}
+            self.update_tables(self.accepted_for(tel))
+            return
+
+        if self.older_paths:
+            try:
+                df, changes = script_generation_merge.load_and_merge(self.older_paths + [path])
+            except Exception as e:
+                messagebox.showerror("Parse error", str(e))
+                return
+            self.parse_text.set(f"Events: {len(df)}  Merged {len(self.older_paths) + 1} files: "
+                                f"{script_generation_merge.summarize_changes(changes)}")
+            self.show_events(df)
+            return
+
         try:
-            df = script_generation_func.events_to_dataframe(path)
+            df, diagnostics = script_generation_func.load_events(path)
         except Exception as e:
             messagebox.showerror("Parse error", str(e))
             return
 
+        summary = script_generation_func.diagnostics_summary(df, diagnostics)
+        self.parse_text.set(
+            f"Lines: {summary['lines']}  Events: {summary['events']}  "
+            f"Skipped: {summary['skipped']}  Blank: {summary['blank']}  Errors: {summary['error']}"
+        )
+        if summary["error"]:
+            errors = diagnostics[diagnostics["status"] == "error"]
+            shown = "\n".join(f"line {r.line_no}: {r.error_class}: {r.message}" for r in errors.head(5).itertuples())
+            sidecar = script_generation_func.diagnostics_sidecar_path(path)
+            if messagebox.askyesno(
+                "Unparsed lines",
+                f"{summary['error']} event rows could not be parsed:\n{shown}\n\nSave them to {sidecar.name}?",
+            ):
+                script_generation_func.write_diagnostics(diagnostics, sidecar)
+
+        self.show_events(df)
 
+    def show_events(self, df, local: bool = True):
+        # local=False: rows from the planning service, which applied the site already
         missing = [c for c in REQUIRED_INPUT_COLS if c not in df.columns]
         if missing:
             messagebox.showerror("DF missing columns", f"Missing columns: {missing}")
             return
 
-        df["altaz"] = df.apply(lambda r: f"{int(r['alt']):>3} {int(r['az']):>3}" if pd.notna(r["alt"]) and pd.notna(r["az"]) else "", axis=1)
+        self._df_loaded = df
+        df = df.copy()
         df["utc_dt"] = pd.to_datetime(df["utc_dt"], errors="coerce")
-        df["ut_str"] = df["utc_dt"].dt.strftime("%H:%M:%S")
         day_filter = int(self.day_var.get())
         df = df[script_generation_func.night_window_filter(df, day_filter)].copy()
+        notes = []
+        site_path = self.site_path.get().strip() if local else ""
+        if site_path:
+            try:
+                site = script_generation_sky.load_site(site_path)
+            except Exception as e:
+                messagebox.showerror("Site config", str(e))
+                return
+            df = script_generation_sky.apply_visibility(df, site)
+            hidden = int((~df["visible"]).sum())
+            df = df[df["visible"]].copy()
+            notes.append(f"Below {site.name} horizon: {hidden}")
+        availability_path = self.availability_path.get().strip()
+        if availability_path and not local:
+            # the service's rows are shared by position, so none may be dropped here (as the CLI)
+            notes.append("Availability not applied with the planning service")
+        elif availability_path:
+            try:
+                availability = script_generation_availability.load_availability(availability_path)
+            except Exception as e:
+                messagebox.showerror("Availability", str(e))
+                return
+            before = len(df)
+            df = script_generation_availability.apply_availability(df, availability)
+            notes.append(f"Not usable ({availability.name}): {before - len(df)}")
+        catalog_path = self.catalog_path.get().strip()
+        if catalog_path:
+            try:
+                catalog = script_generation_catalog.StarCatalog(catalog_path)
+            except Exception as e:
+                messagebox.showerror("Star catalog", str(e))
+                return
+            # exposures of the generated script use these magnitudes (extract_event)
+            df = script_generation_catalog.enrich_events(df, catalog)
+            notes.append(f"Catalog mags: {int(df['cat_mag'].notna().sum())} of {len(df)}")
+        if notes:
+            self.parse_text.set("  |  ".join([self.parse_text.get().split("  |")[0], *notes]))
+        df = df.sort_values("utc_dt", kind="mergesort").reset_index(drop=True)
         df["_uid"] = range(len(df))
-        df["accepted"] = script_generation_func.telescope_accept_mask(df, self.telescope.get())
+        self._install_frame(df)
+        self.render_tables()
 
-        df = df.sort_values("utc_dt", kind="mergesort").reset_index(drop=True)
+    def _install_frame(self, df, overrides=None):
+        # df: display frame in time order with _uid == row position
+        self._clear_trees()
         self.df_all = df
+        self._accept_cache = {}
+        self._overrides = overrides or {}
+        self._shown = None
+        # display strings (ut_str, altaz, numbers) are built per row as it is inserted
+        self._cols = {c: df[c].to_numpy() for c in SOURCE_COLS}
+        self._num = {c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                     for c in NUMERIC_COLS}
+        self._highprob = np.nan_to_num(self._num["probability"]) >= 15
+        self._seconds = df["utc_dt"].to_numpy().astype("datetime64[s]").astype(np.int64)
+        self._orders = {}
+        self._search = script_generation_search.SearchIndex(df["asteroid"].to_numpy(), df["star_no"].to_numpy())
+        try:
+            self._filtered = self._filter_mask()
+        except ValueError:
+            self._filtered = np.ones(len(df), dtype=bool)
+        self._found = self._search.mask(self.search_var.get())
+        self._set_visible()
+        sky = script_generation_sky
+        self._tl_width = sky.WINDOW_END_S - sky.WINDOW_START_S
+        self._tl_starts = self._seconds + sky.WINDOW_START_S
+        self._tl_shade = np.searchsorted(PROB_STEPS, np.nan_to_num(self._num["probability"]), "right")
+        self._tl_view = None
+        self._tl_lanes = []
 
-        self.render_tables()
+    def _row_values(self, uid):
+        c = self._cols
+        values = []
+        for col in DISPLAY_COLS:
+            if col == "ut_str":
+                t = int(self._seconds[uid]) % 86400
+                values.append(f"{t // 3600:02d}:{t // 60 % 60:02d}:{t % 60:02d}")
+            elif col == "altaz":
+                alt, az = c["alt"][uid], c["az"][uid]
+                missing = script_generation_func.is_missing(alt) or script_generation_func.is_missing(az)
+                values.append("" if missing else f"{int(alt):>3} {int(az):>3}")
+            else:
+                v = c[col][uid]
+                values.append(f"{v:g}" if isinstance(v, (float, np.floating)) else v)
+        return values
+
+    def accepted_for(self, telescope: str):
+        mask = self._accept_cache.get(telescope)
+        if mask is None:
+            mask = script_generation_func.telescope_accept_mask(self.df_all, telescope).to_numpy(dtype=bool)
+            self._accept_cache[telescope] = mask
+        overrides = self._overrides.get(telescope)
+        if not overrides:
+            return mask
+        accepted = mask.copy()
+        accepted[list(overrides)] = list(overrides.values())
+        return accepted
 
     def on_telescope_changed(self):
         if self.df_all is None:
             return
+        tel = self.telescope.get()
+        addr, params = self._service()
+        if addr:
+            # pick up moves other operators made for this telescope
+            try:
+                reply = script_generation_service.call("overrides", addr, telescope=tel, **params)
+                self._overrides[tel] = {int(k): v for k, v in reply["overrides"].items()}
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Planning service", str(e))
+        self.update_tables(self.accepted_for(tel))
 
-        self.df_all["accepted"] = script_generation_func.telescope_accept_mask(self.df_all, self.telescope.get())
-        self.df_all = self.df_all.sort_values("utc_dt", kind="mergesort").reset_index(drop=True)
-        self.render_tables()
+    def _close_both(self, accepted):
+        # close4 flags within each table, indexed by uid
+        close = np.zeros(len(accepted), dtype=bool)
+        for side in (accepted, ~accepted):
+            idx = np.flatnonzero(side)
+            close[idx] = close_flags(self._seconds[idx])
+        return close
+
+    def _tags(self, uid, close):
+        if close[uid]:
+            return ("close4",)
+        if self._highprob[uid]:
+            return ("highprob",)
+        return ()
 
     def render_tables(self):
         if self.df_all is None:
             return
+        accepted = self.accepted_for(self.telescope.get())
+        close = self._close_both(accepted)
+        self._clear_trees()
+        for uid in range(len(accepted)):
+            tree = self.good_tree if accepted[uid] else self.bad_tree
+            tree.insert("", "end", iid=str(uid), values=self._row_values(uid), tags=self._tags(uid, close))
+        self.df_all["accepted"] = accepted
+        self._shown, self._shown_close = accepted, close
+        self.apply_view()
 
-        good = self.df_all[self.df_all["accepted"] == True]
-        bad  = self.df_all[self.df_all["accepted"] == False]
+    def update_tables(self, accepted):
+        # Moves only the rows whose side changed and retags the neighbours whose
+        # close4 flag changed; the trees stay in view order (sort and filters).
+        if self._shown is None:
+            self.render_tables()
+            return
+        close = self._close_both(accepted)
+        moved = np.flatnonzero(accepted != self._shown)
+        order, rank = self._view_index()
+        good = (accepted & self._visible)[order]
+        bad = (~accepted & self._visible)[order]
+        before_good = (np.cumsum(good) - good)[rank]
+        before_bad = (np.cumsum(bad) - bad)[rank]
+        for uid in moved:
+            (self.bad_tree if accepted[uid] else self.good_tree).delete(str(uid))
+        for uid in moved[np.argsort(rank[moved], kind="stable")]:  # every row before it in view order is in place
+            tree, pos = (self.good_tree, before_good[uid]) if accepted[uid] else (self.bad_tree, before_bad[uid])
+            if self._visible[uid]:
+                tree.insert("", int(pos), iid=str(uid), values=self._row_values(uid), tags=self._tags(uid, close))
+            else:
+                tree.insert("", "end", iid=str(uid), values=self._row_values(uid), tags=self._tags(uid, close))
+                tree.detach(str(uid))
+        for uid in np.flatnonzero((close != self._shown_close) & (accepted == self._shown)):
+            tree = self.good_tree if accepted[uid] else self.bad_tree
+            tree.item(str(uid), tags=self._tags(uid, close))
+        self.df_all["accepted"] = accepted
+        self._shown, self._shown_close = accepted, close
+        self.refresh_timeline()
+
+    def _clear_trees(self):
+        # rows hidden by the filters are only detached, so they are deleted by id as well
+        for tree in (self.good_tree, self.bad_tree):
+            tree.delete(*tree.get_children())
+        if self._shown is not None:
+            hidden = ~self._visible
+            self.good_tree.delete(*np.flatnonzero(hidden & self._shown).astype(str))
+            self.bad_tree.delete(*np.flatnonzero(hidden & ~self._shown).astype(str))
+
+    def _view_index(self):
+        # (order, rank) for the current sort: order lists uids in display order, rank is
+        # its inverse. Each sort is argsorted once per loaded night.
+        key = self._sort
+        if key not in self._orders:
+            n = len(self.df_all)
+            if key is None:
+                order = np.arange(n)
+            else:
+                col, descending = key
+                if col in ("date", "ut_str"):
+                    values = self._seconds.astype(float)
+                elif col == "asteroid":
+                    values = np.unique(self._cols["asteroid"].astype(str), return_inverse=True)[1].astype(float)
+                elif col == "altaz":
+                    values = self._num["alt"]
+                else:
+                    values = self._num[col]
+                # stable, and missing values stay last either way
+                order = np.argsort(-values if descending else values, kind="stable")
+            rank = np.empty(n, dtype=np.int64)
+            rank[order] = np.arange(n)
+            self._orders[key] = (order, rank)
+        return self._orders[key]
 
-        good = mark_close_events(good, time_col="utc_dt", window_sec=240)
-        bad  = mark_close_events(bad,  time_col="utc_dt", window_sec=240)
+    def apply_view(self):
+        # Reorders and filters both trees in one call each; rows are detached, not rebuilt.
+        if self.df_all is None or self._shown is None:
+            return
+        order, _ = self._view_index()
+        shown = order[self._visible[order]]
+        on_good = self._shown[shown]
+        self.good_tree.set_children("", *shown[on_good].astype(str))
+        self.bad_tree.set_children("", *shown[~on_good].astype(str))
+        hidden = len(self._visible) - len(shown)
+        self.view_text.set(f"Showing {len(shown)} of {len(self._visible)}" if hidden else "")
+        self.refresh_timeline()
 
-        self._fill_tree(self.good_tree, good)
-        self._fill_tree(self.bad_tree, bad)
+    def sort_by(self, col):
+        if self.df_all is None:
+            return
+        if self._sort is not None and self._sort[0] == col:
+            self._sort = (col, not self._sort[1])
+        else:
+            self._sort = (col, False)
+        arrow = " ▼" if self._sort[1] else " ▲"
+        for tree in (self.good_tree, self.bad_tree):
+            for c in DISPLAY_COLS:
+                tree.heading(c, text=HEADER_LABELS.get(c, c) + (arrow if c == col else ""))
+        self.apply_view()
 
-    def _fill_tree(self, tree, df_slice):
-        tree.delete(*tree.get_children())
-        for _, row in df_slice.iterrows():
-            iid = str(int(row["_uid"]))
-            values = [row[c] for c in DISPLAY_COLS]
-            prob = row.get("probability", 0)
+    def _filter_mask(self):
+        mask = np.ones(len(self.df_all), dtype=bool)
+        for name, label, col, bound in FILTER_FIELDS:
+            text = self.filter_vars[name].get().strip()
+            if not text:
+                continue
             try:
-                prob_val = float(prob)
-            except Exception:
-                prob_val = 0.0
-            close4 = bool(row.get("_close4", False))
-
-            if close4:
-                tags = ("close4",)
-            elif prob_val >= 15:
-                tags = ("highprob",)
-            else:
-                tags = ()
-            tree.insert("", "end", iid=iid, values=values, tags=tags)
+                limit = float(text)
+            except ValueError:
+                raise ValueError(f"{label}: {text!r} is not a number")
+            values = self._num[col]
+            mask &= (values >= limit) if bound == "min" else (values <= limit)
+        return mask
+
+    def _set_visible(self):
+        self._visible = self._filtered if self._found is None else self._filtered & self._found
+
+    def apply_filters(self):
+        if self.df_all is None:
+            return
+        try:
+            self._filtered = self._filter_mask()
+        except ValueError as e:
+            messagebox.showerror("Filter", str(e))
+            return
+        self._set_visible()
+        self.apply_view()
+
+    def apply_search(self):
+        # as you type: rows whose asteroid or star contains the text (^ anchors it at the start)
+        if self.df_all is None:
+            return
+        self._found = self._search.mask(self.search_var.get())
+        self._set_visible()
+        self.apply_view()
+
+    def clear_filters(self):
+        for var in self.filter_vars.values():
+            var.set("")
+        self.search_var.set("")
+        self.apply_filters()
+
+    def refresh_timeline(self):
+        # restacks the bars after the accepted or shown rows changed
+        if self.df_all is None or self._shown is None:
+            return
+        lanes = []
+        for side in (self._shown, ~self._shown):
+            uids = np.flatnonzero(side & self._visible)
+            rows, depth = stack_rows(self._tl_starts[uids], self._tl_width)
+            lanes.append((uids, self._tl_starts[uids], rows % TIMELINE_ROWS, min(depth, TIMELINE_ROWS)))
+        self._tl_lanes = lanes
+        if self._tl_view is None:
+            self._tl_view = self._tl_extent()
+        self.draw_timeline()
+
+    def _tl_extent(self):
+        # the whole night, with a small margin
+        if not len(self._tl_starts):
+            return 0.0, float(MIN_SPAN_S)
+        first, last = float(self._tl_starts[0]), float(self._tl_starts[-1] + self._tl_width)
+        pad = max((last - first) * 0.02, MIN_SPAN_S / 2)
+        return first - pad, last + pad
+
+    def _tl_y(self, lane, row):
+        band = (TIMELINE_HEIGHT - TIMELINE_AXIS) / 2
+        row_h = (band - 4) / np.array([depth for *_, depth in self._tl_lanes])[lane]
+        y0 = TIMELINE_AXIS + lane * band + 2 + row * row_h
+        return y0, y0 + np.maximum(row_h - 1, 1)
+
+    def draw_timeline(self):
+        # Draws the bars up to a view width either side of the view, so a pan shows them at
+        # once. Bars of one row and shade that touch are merged, and the rectangles are kept
+        # in a pool and moved rather than deleted and created again.
+        self._tl_after = None
+        c = self.timeline
+        c.delete("axis")
+        w = c.winfo_width()
+        if self._tl_view is None or not self._tl_lanes or w <= 1:
+            self._tl_show([], [])
+            return
+        t0, t1 = self._tl_view
+        scale = w / (t1 - t0)
+        n_shades = len(PROB_STEPS) + 1
+        keys, x0s, x1s = [], [], []
+        for lane, (uids, starts, rows, _) in enumerate(self._tl_lanes):
+            lo = np.searchsorted(starts, t0 - (t1 - t0) - self._tl_width, "left")
+            hi = np.searchsorted(starts, t1 + (t1 - t0), "right")
+            x0 = (starts[lo:hi] - t0) * scale
+            keys.append((lane * TIMELINE_ROWS + rows[lo:hi]) * n_shades + self._tl_shade[uids[lo:hi]])
+            x0s.append(x0)
+            x1s.append(x0 + max(self._tl_width * scale, 1.0))
+        key, x0, x1 = merge_spans(np.concatenate(keys), np.concatenate(x0s), np.concatenate(x1s))
+        lane, rest = np.divmod(key, TIMELINE_ROWS * n_shades)
+        row, shade = np.divmod(rest, n_shades)
+        y0, y1 = self._tl_y(lane, row)
+        self._tl_show(list(zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())),
+                      [BAR_COLORS[l][s] for l, s in zip(lane.tolist(), shade.tolist())])
+
+        band = (TIMELINE_HEIGHT - TIMELINE_AXIS) / 2
+        step = next((s for s in TICK_STEPS if s * scale >= 70), TICK_STEPS[-1])
+        for t in range(int(t0 // step + 1) * step, int(t1) + 1, step):
+            x = (t - t0) * scale
+            c.create_line(x, TIMELINE_AXIS - 4, x, TIMELINE_HEIGHT, fill="#e6e6e6", tags="axis")
+            t %= 86400
+            c.create_text(x + 2, 2, anchor="nw", text=f"{t // 3600:02d}:{t // 60 % 60:02d}", fill="#555555",
+                          tags="axis")
+        c.create_line(0, TIMELINE_AXIS + band, w, TIMELINE_AXIS + band, fill="#bbbbbb", tags="axis")
+        c.tag_lower("axis")
+        f0, f1 = self._tl_extent()
+        self.timeline_sb.set(max((t0 - f0) / (f1 - f0), 0.0), min((t1 - f0) / (f1 - f0), 1.0))
+        self._draw_selection()
+
+    def _tl_show(self, boxes, fills):
+        c = self.timeline
+        for i, (box, fill) in enumerate(zip(boxes, fills)):
+            if i == len(self._tl_items):
+                self._tl_items.append(c.create_rectangle(*box, fill=fill, width=0, tags="bar"))
+                self._tl_fills.append(fill)
+                continue
+            c.coords(self._tl_items[i], *box)
+            if fill != self._tl_fills[i] or i >= self._tl_used:
+                c.itemconfigure(self._tl_items[i], fill=fill, state="normal")
+                self._tl_fills[i] = fill
+        for item in self._tl_items[len(boxes):self._tl_used]:
+            c.itemconfigure(item, state="hidden")
+        self._tl_used = len(boxes)
+
+    def _draw_selection(self):
+        # outlines the bars of the selected rows
+        c = self.timeline
+        c.delete("sel")
+        w = c.winfo_width()
+        if self._tl_view is None or not self._tl_lanes or w <= 1:
+            return
+        t0, t1 = self._tl_view
+        scale = w / (t1 - t0)
+        for lane, tree in enumerate((self.good_tree, self.bad_tree)):
+            uids, starts, rows, _ = self._tl_lanes[lane]
+            sel = np.array(tree.selection(), dtype=np.int64)
+            at = np.searchsorted(uids, sel)
+            at = at[(at < len(uids)) & (uids[np.minimum(at, len(uids) - 1)] == sel)]
+            x0 = (starts[at] - t0) * scale
+            bar = max(self._tl_width * scale, 1.0)
+            in_view = (x0 < w) & (x0 + bar > 0)
+            y0, y1 = self._tl_y(lane, rows[at[in_view]])
+            for x, ya, yb in zip(x0[in_view].tolist(), y0.tolist(), y1.tolist()):
+                c.create_rectangle(x, ya, x + bar, yb, outline="#1f4e9c", width=2, tags="sel")
+
+    def _tl_set_view(self, t0, t1):
+        # Clamps the view to the night and moves the drawn items to it in one call per tag;
+        # the bars are culled and merged again once the pointer rests.
+        f0, f1 = self._tl_extent()
+        span = min(max(t1 - t0, MIN_SPAN_S), f1 - f0)
+        t0 = min(max(t0, f0), f1 - span)
+        old0, old1 = self._tl_view
+        w = self.timeline.winfo_width()
+        k = (old1 - old0) / span
+        for tag in ("bar", "sel", "axis"):
+            self.timeline.scale(tag, 0, 0, k, 1)
+            self.timeline.move(tag, (old0 - t0) * w / span, 0)
+        self._tl_view = (t0, t0 + span)
+        if self._tl_after is not None:
+            self.after_cancel(self._tl_after)
+        self._tl_after = self.after(60, self.draw_timeline)
+
+    def pan_timeline(self, dx):
+        # dx pixels to the right
+        if self._tl_view is None:
+            return
+        t0, t1 = self._tl_view
+        dt = dx * (t1 - t0) / max(self.timeline.winfo_width(), 1)
+        self._tl_set_view(t0 + dt, t1 + dt)
+
+    def zoom_timeline(self, x, factor):
+        # factor < 1 zooms in, keeping the time under x in place
+        if self._tl_view is None:
+            return
+        t0, t1 = self._tl_view
+        t = t0 + x * (t1 - t0) / max(self.timeline.winfo_width(), 1)
+        self._tl_set_view(t - (t - t0) * factor, t + (t1 - t) * factor)
+
+    def scroll_timeline(self, *args):
+        # scrollbar command: ("moveto", fraction) or ("scroll", n, "units" | "pages")
+        if self._tl_view is None:
+            return
+        t0, t1 = self._tl_view
+        f0, f1 = self._tl_extent()
+        if args[0] == "moveto":
+            start = f0 + float(args[1]) * (f1 - f0)
+        else:
+            start = t0 + int(args[1]) * (t1 - t0) * (0.9 if args[2] == "pages" else 0.1)
+        self._tl_set_view(start, start + t1 - t0)
+
+    def _tl_press(self, e):
+        self._tl_drag = (e.x, None)
+
+    def _tl_motion(self, e):
+        # a press that moves more than a few pixels pans instead of selecting
+        if self._tl_drag is None:
+            return
+        start, last = self._tl_drag
+        if last is None and abs(e.x - start) < 4:
+            return
+        self.pan_timeline((start if last is None else last) - e.x)
+        self._tl_drag = (start, e.x)
+
+    def _tl_release(self, e):
+        if self._tl_drag is not None and self._tl_drag[1] is None:
+            self.select_at(e.x, e.y)
+        self._tl_drag = None
+
+    def select_at(self, x, y):
+        # selects the row of the bar under (x, y) and scrolls its table to it
+        if self._tl_view is None or not self._tl_lanes:
+            return
+        band = (TIMELINE_HEIGHT - TIMELINE_AXIS) / 2
+        lane = int((y - TIMELINE_AXIS) // band)
+        if lane not in (0, 1):
+            return
+        uids, starts, rows, depth = self._tl_lanes[lane]
+        t0, t1 = self._tl_view
+        per_px = (t1 - t0) / max(self.timeline.winfo_width(), 1)
+        t = t0 + x * per_px
+        lo = np.searchsorted(starts, t - self._tl_width - 3 * per_px, "left")
+        hi = np.searchsorted(starts, t + 3 * per_px, "right")
+        if lo == hi:
+            return
+        near = np.arange(lo, hi)
+        row = int((y - TIMELINE_AXIS - lane * band - 2) // ((band - 4) / depth))
+        same = near[rows[near] == row]
+        near = same if len(same) else near
+        ut = starts[near] - script_generation_sky.WINDOW_START_S
+        uid = str(uids[near[np.argmin(np.abs(ut - t))]])
+        tree = self.good_tree if lane == 0 else self.bad_tree
+        tree.selection_set(uid)
+        tree.focus(uid)
+        tree.see(uid)
 
     def _set_acceptance(self, uids, accepted: bool):
         if self.df_all is None or not uids:
             return
-        uid_ints = [int(x) for x in uids]
-        self.df_all.loc[self.df_all["_uid"].isin(uid_ints), "accepted"] = accepted
-        self.df_all = self.df_all.sort_values("utc_dt", kind="mergesort").reset_index(drop=True)
-        self.render_tables()
+        tel = self.telescope.get()
+        self.accepted_for(tel)
+        base = self._accept_cache[tel]
+        overrides = self._overrides.setdefault(tel, {})
+        for uid in map(int, uids):
+            if base[uid] == accepted:
+                overrides.pop(uid, None)
+            else:
+                overrides[uid] = accepted
+        self.update_tables(self.accepted_for(tel))
+
+        addr, params = self._service()
+        if addr:
+            try:
+                script_generation_service.call("accept", addr, telescope=tel, uids=[int(u) for u in uids],
+                                               accepted=accepted, **params)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Planning service", f"Move not shared with the service: {e}")
 
     def move_to_accepted(self):
         uids = self.bad_tree.selection()
@@ -273,19 +983,132 @@ class DualTableApp(tk.Tk):
             messagebox.showerror("No accepted events", "Accepted table is empty.")
             return
 
+        addr, params = self._service()
+        if addr:
+            try:
+                reply = script_generation_service.call(
+                    "generate", addr, telescope=self.telescope.get(),
+                    pre=str(Path(self.pre_path.get()).resolve()), post=str(Path(self.post_path.get()).resolve()), **params
+                )
+                out = Path(self.out_path.get())
+                out.parent.mkdir(parents=True, exist_ok=True)
+                out.write_text(reply["scs"], encoding="utf-8", newline="")
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Generate error", str(e))
+                return
+            self._generated(reply["scs"])
+            return
+
         NEEDED = ["date","ut","durn","star_mag","mag_drop","star_no",
-                  "asteroid","alt","az","probability","ra","dec"]
+                  "asteroid","alt","az","probability","ra_deg","dec_deg"]
+        # with a star catalog the exposures come from cat_mag (extract_event)
+        NEEDED += [c for c in ("cat_mag", "cat_color") if c in df_good.columns]
 
-        records = df_good[NEEDED].to_dict("records")
         try:
-            events = [script_generation_func.extract_event(rec) for rec in records]  # <-- adapt event_from_row to accept dict
-            script_generation_func.generate_scs(events, self.out_path.get(), self.pre_path.get(), self.post_path.get())
+            events = script_generation_func.events_from_frame(df_good[NEEDED])
+            text = script_generation_func.generate_scs(events, self.out_path.get(), self.pre_path.get(),
+                                                       self.post_path.get(), telescope=self.telescope.get())
         except Exception as e:
             messagebox.showerror("Generate error", str(e))
             return
 
-        messagebox.showinfo("Done", f"Generated:\n{self.out_path.get()}")
+        self._generated(text)
+
+    def _generated(self, text: str):
+        # the written script replayed by script_generation_validate; warnings only for timing problems
+        summary = script_generation_validate.check_summary(text)
+        if summary:
+            messagebox.showwarning("Done", f"Generated:\n{self.out_path.get()}\n\n" + "\n".join(summary))
+        else:
+            messagebox.showinfo("Done", f"Generated:\n{self.out_path.get()}")
+
+    def _session_state(self) -> dict:
+        return {
+            "events_path": self.events_fullpath,
+            "older_paths": list(self.older_paths),
+            "site_path": self.site_path.get().strip(),
+            "catalog_path": self.catalog_path.get().strip(),
+            "availability_path": self.availability_path.get().strip(),
+            "pre_path": self.pre_path.get(),
+            "post_path": self.post_path.get(),
+            "out_path": self.out_path.get(),
+            "telescope": self.telescope.get(),
+            "day": int(self.day_var.get()),
+            "label": self.events_path.get(),
+        }
+
+    def save_session(self, path=None):
+        if self.df_all is None:
+            messagebox.showerror("No data", "Upload an events.txt file first.")
+            return
+        if path is None:
+            initial = script_generation_session.session_sidecar_path(self.events_fullpath) if self.events_fullpath else None
+            path = filedialog.asksaveasfilename(
+                defaultextension=".json", filetypes=[("Session", "*.session.json"), ("All files", "*.*")],
+                initialfile=initial.name if initial else "", initialdir=str(initial.parent) if initial else None,
+            )
+            if not path:
+                return
+        try:
+            self.session_path = script_generation_session.save_session(path, self.df_all, self._overrides,
+                                                                       self._session_state())
+        except Exception as e:
+            messagebox.showerror("Session error", str(e))
+
+    def pick_session(self):
+        p = filedialog.askopenfilename(filetypes=[("Session", "*.session.json"), ("All files", "*.*")])
+        if p:
+            self.restore_session(p)
+
+    def restore_session(self, path):
+        try:
+            frame, overrides, manifest = script_generation_session.load_session(path)
+        except Exception as e:
+            messagebox.showerror("Session error", str(e))
+            return
+        self.events_fullpath = manifest.get("events_path", "")
+        self.older_paths = list(manifest.get("older_paths", []))
+        self.site_path.set(manifest.get("site_path", ""))
+        self.catalog_path.set(manifest.get("catalog_path", ""))
+        self.availability_path.set(manifest.get("availability_path", ""))
+        self.pre_path.set(manifest.get("pre_path", self.pre_path.get()))
+        self.post_path.set(manifest.get("post_path", self.post_path.get()))
+        self.out_path.set(manifest.get("out_path", ""))
+        self.telescope.set(manifest.get("telescope", "c14"))
+        self.day_var.set(manifest["day"])
+        self.day_text.set(f"Day: {manifest['day']:02d}")
+        self.events_path.set(manifest.get("label", Path(self.events_fullpath).name))
+        self.session_path = Path(path)
+        moves = sum(len(m) for m in overrides.values())
+
+        if script_generation_session.session_is_current(manifest) or not Path(self.events_fullpath).exists():
+            self._df_loaded = None
+            self._install_frame(frame, overrides)
+            self.parse_text.set(f"Events: {len(frame)}  Session {Path(path).name} ({moves} moves)")
+            self.render_tables()
+            return
+
+        # the events file was refreshed: reparse it and move the triage across by event key
+        self.load_events_into_tables()
+        if self.df_all is None:
+            return
+        carried, lost = script_generation_session.carry_overrides(frame, overrides, self.df_all)
+        self._overrides = carried
+        self.update_tables(self.accepted_for(self.telescope.get()))
+        self.parse_text.set(self.parse_text.get() + f"  |  Session: {moves - lost} moves kept, {lost} events gone")
+
+    def on_close(self):
+        # keep the triage: autosave next to the events file (or where the session came from)
+        if self.df_all is not None and self.events_fullpath and any(self._overrides.values()):
+            path = self.session_path or script_generation_session.session_sidecar_path(self.events_fullpath)
+            try:
+                script_generation_session.save_session(path, self.df_all, self._overrides, self._session_state())
+            except Exception as e:
+                if not messagebox.askyesno("Session error", f"Could not save the session:\n{e}\n\nClose anyway?"):
+                    return
+        self.destroy()
 
 if __name__ == "__main__":
-    app = DualTableApp()
+    import sys
+    app = DualTableApp(sys.argv[1] if len(sys.argv) > 1 else None)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,194 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from script_generation_lazy import lazy_import
+
+np = lazy_import("numpy")
+script_generation_func = lazy_import("script_generation_func")
+script_generation_sky = lazy_import("script_generation_sky")
+
+CONFLICT_WINDOW_S = 240.0          # as get_flagged_events: a scope needs more than this plus the slew between events
+EXACT_MAX_STATES = 20_000          # DP states per cluster before it falls back to greedy with repair
+REPAIR_PASSES = 3
+
+
+@dataclass
+class Allocation:
+    telescopes: list
+    scope: list                    # telescope index per event, -1 when no scope observes it
+    value: float                   # summed probability (percent / 100) of the allocated events
+    exact_clusters: int = 0
+    greedy_clusters: int = 0
+    schedules: dict = field(default_factory=dict)   # telescope -> time ordered events
+
+    def counts(self) -> dict:
+        return {tel: len(self.schedules.get(tel, [])) for tel in self.telescopes}
+
+
+def acceptance_matrix(df, telescopes) -> "np.ndarray":
+    # events x telescopes, telescope_accept_mask per column
+    return np.column_stack([script_generation_func.telescope_accept_mask(df, tel).to_numpy(dtype=bool)
+                            for tel in telescopes]).reshape(len(df), len(telescopes))
+
+
+class Timeline:
+    # Per-scope compatibility of two time ordered events: the later one may follow the
+    # earlier on that scope when the gap leaves the conflict window plus the slew.
+    def __init__(self, events, telescopes):
+        t0 = events[0].date_object if events else None
+        self.t = [(ev.date_object - t0).total_seconds() for ev in events]
+        self.models = [script_generation_sky.slew_model(tel) for tel in telescopes]
+        # beyond this gap every pair is compatible (longest slew is 180 degrees)
+        self.horizon = [CONFLICT_WINDOW_S + m.settle_s + 180.0 / m.rate_deg_s for m in self.models]
+        # only pairs between the conflict window and the longest horizon depend on the
+        # separation; all of them are computed up front, the solvers probe them many times
+        first, start, sep = script_generation_sky.windowed_separations(
+            [ev.ra_deg for ev in events], [ev.dec_deg for ev in events], self.t,
+            CONFLICT_WINDOW_S, max(self.horizon, default=0.0))
+        self.first, self.start, self.sep = first.tolist(), start.tolist(), sep.tolist()
+
+    def fits(self, s: int, a: int, b: int) -> bool:
+        gap = self.t[b] - self.t[a]
+        if gap > self.horizon[s]:
+            return True
+        if gap <= CONFLICT_WINDOW_S:
+            return False
+        sep = self.sep[self.start[a] + b - self.first[a]]
+        m = self.models[s]
+        return gap > CONFLICT_WINDOW_S + (m.settle_s + sep / m.rate_deg_s if sep > 0 else 0.0)
+
+
+def clusters(tl: Timeline):
+    # Runs of events no scope can see across: the gap to the next run is beyond every horizon.
+    split = max(tl.horizon, default=0.0)
+    start = 0
+    for i in range(1, len(tl.t)):
+        if tl.t[i] - tl.t[i - 1] > split:
+            yield start, i
+            start = i
+    if tl.t:
+        yield start, len(tl.t)
+
+
+def solve_exact(tl: Timeline, accept, values, lo: int, hi: int):
+    # DP in time order over (last event per scope); a last event beyond the scope's horizon
+    # is forgotten, so only the recent ones make states distinct. Returns the scope per
+    # event in [lo, hi), or None when the cluster needs more than EXACT_MAX_STATES states.
+    k = len(tl.horizon)
+    layers = [{(-1,) * k: (0.0, None, -1)}]        # state -> (value, parent state, scope of event)
+    total = 0
+    for j in range(lo, hi):
+        nxt = {}
+        for parent, (val, _, _) in layers[-1].items():
+            state = tuple(-1 if a >= 0 and tl.t[j] - tl.t[a] > tl.horizon[s] else a for s, a in enumerate(parent))
+            if state not in nxt or val > nxt[state][0]:
+                nxt[state] = (val, parent, -1)
+            for s in range(k):
+                if accept[j][s] and (state[s] < 0 or tl.fits(s, state[s], j)):
+                    taken = state[:s] + (j,) + state[s + 1:]
+                    v = val + values[j]
+                    if taken not in nxt or v > nxt[taken][0]:
+                        nxt[taken] = (v, parent, s)
+        layers.append(nxt)
+        total += len(nxt)
+        if total > EXACT_MAX_STATES:
+            return None
+
+    state = max(layers[-1], key=lambda st: layers[-1][st][0])
+    out = [-1] * (hi - lo)
+    for j in range(hi - 1, lo - 1, -1):
+        _, state, out[j - lo] = layers[j - lo + 1][state]
+    return out
+
+
+def solve_greedy(tl: Timeline, accept, values, lo: int, hi: int):
+    # Highest value first onto the least demanded scope that still has room, then repair:
+    # an unallocated event may displace its neighbours on a scope when they can move to
+    # another scope or are worth less than it.
+    k = len(tl.horizon)
+    demand = [sum(accept[j][s] for j in range(lo, hi)) for s in range(k)]
+    scope_order = sorted(range(k), key=lambda s: demand[s])
+    sched = [[] for _ in range(k)]
+    out = {j: -1 for j in range(lo, hi)}
+
+    def room(s, j):
+        lst = sched[s]
+        p = bisect_left(lst, j)
+        return (p == 0 or tl.fits(s, lst[p - 1], j)) and (p == len(lst) or tl.fits(s, j, lst[p]))
+
+    log = []                       # (scope, event, inserted) for undoing a repair attempt
+
+    def put(s, j):
+        lst = sched[s]
+        lst.insert(bisect_left(lst, j), j)
+        out[j] = s
+        log.append((s, j, True))
+
+    def take(s, j):
+        sched[s].remove(j)
+        out[j] = -1
+        log.append((s, j, False))
+
+    def place(j, skip=-1):
+        for s in scope_order:
+            if s != skip and accept[j][s] and room(s, j):
+                put(s, j)
+                return True
+        return False
+
+    order = sorted(range(lo, hi), key=lambda j: (-values[j], sum(accept[j]), j))
+    for j in order:
+        place(j)
+
+    for _ in range(REPAIR_PASSES):
+        improved = False
+        for j in order:
+            if out[j] >= 0:
+                continue
+            for s in scope_order:
+                if not accept[j][s]:
+                    continue
+                log.clear()
+                displaced = []
+                while not room(s, j):
+                    lst = sched[s]
+                    p = bisect_left(lst, j)
+                    b = lst[p - 1] if p > 0 and not tl.fits(s, lst[p - 1], j) else lst[p]
+                    take(s, b)
+                    displaced.append(b)
+                put(s, j)
+                lost = sum(values[b] for b in displaced if not place(b, skip=s))
+                if values[j] - lost > 1e-9:
+                    improved = True
+                    break
+                for s2, b, inserted in reversed(log):
+                    if inserted:
+                        sched[s2].remove(b)
+                        out[b] = -1
+                    else:
+                        sched[s2].insert(bisect_left(sched[s2], b), b)
+                        out[b] = s2
+        if not improved:
+            break
+    return [out[j] for j in range(lo, hi)]
+
+
+def allocate(events, accept, telescopes) -> Allocation:
+    # events time ordered; accept[i][s] whether telescopes[s] may observe events[i].
+    # Each event goes to at most one scope and no scope gets two events closer than the
+    # conflict window plus its slew, maximizing the summed probability.
+    accept = [list(map(bool, row)) for row in accept]
+    values = [ev.prob / 100.0 for ev in events]
+    tl = Timeline(events, telescopes)
+    result = Allocation(telescopes=list(telescopes), scope=[-1] * len(events), value=0.0)
+    for lo, hi in clusters(tl):
+        part = solve_exact(tl, accept, values, lo, hi)
+        if part is None:
+            part = solve_greedy(tl, accept, values, lo, hi)
+            result.greedy_clusters += 1
+        else:
+            result.exact_clusters += 1
+        result.scope[lo:hi] = part
+    result.value = sum(v for v, s in zip(values, result.scope) if s >= 0)
+    result.schedules = {tel: [ev for ev, s in zip(events, result.scope) if s == k]
+                        for k, tel in enumerate(result.telescopes)}
+    return result
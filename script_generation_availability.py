@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+from pathlib import Path
+from script_generation_lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+script_generation_sky = lazy_import("script_generation_sky")
+
+# Events whose observing window is less usable than this are dropped; the others keep
+# their probability scaled by the usable fraction.
+DEFAULT_MIN_USABLE = 0.5
+
+
+@dataclass
+class Availability:
+    name: str
+    starts: "np.ndarray"           # seconds since J2000 (as event_seconds), sorted and disjoint
+    ends: "np.ndarray"
+    usable: "np.ndarray"           # fraction of each interval that is usable, 0 (closed) to 1
+
+
+def load_availability(path) -> Availability:
+    # One interval per line: UTC start, UTC end and the usable fraction, separated by commas
+    # or whitespace (2024-10-17T02:00 2024-10-17T04:30 0.2), # for comments. A header line
+    # is allowed. Time outside every interval is fully usable.
+    path = Path(path)
+    rows = []
+    for n, line in enumerate(path.read_text(encoding="utf-8", errors="replace").splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = [p.strip() for p in (line.split(",") if "," in line else line.split())]
+        try:
+            if len(parts) != 3:
+                raise ValueError("expected start, end and usable fraction")
+            start, end, usable = pd.Timestamp(parts[0]), pd.Timestamp(parts[1]), float(parts[2])
+            if start.tzinfo is not None:
+                start, end = start.tz_convert("UTC").tz_localize(None), end.tz_convert("UTC").tz_localize(None)
+        except ValueError as e:
+            if not rows and not parts[0][:1].isdigit():
+                continue            # header
+            raise ValueError(f"{path.name}:{n}: {e}: {line!r}")
+        if not end > start:
+            raise ValueError(f"{path.name}:{n}: interval ends before it starts: {line!r}")
+        if not 0.0 <= usable <= 1.0:
+            raise ValueError(f"{path.name}:{n}: usable fraction {usable} is not between 0 and 1")
+        rows.append((start, end, usable))
+    if not rows:
+        raise ValueError(f"{path.name}: no intervals")
+    start, end, usable = zip(*rows)
+    t = pd.DatetimeIndex(start + end).to_numpy().astype("datetime64[s]")
+    t = (t - np.datetime64(script_generation_sky.J2000, "s")).astype(np.float64)
+    return Availability(path.name, *disjoint(t[:len(rows)], t[len(rows):], np.array(usable, dtype=float)))
+
+
+def disjoint(starts, ends, usable):
+    # Overlapping intervals -> sorted disjoint segments holding the lowest fraction of the
+    # intervals covering them; gaps between intervals are left out.
+    bounds = np.unique(np.concatenate((starts, ends)))
+    lo, hi = np.searchsorted(bounds, starts), np.searchsorted(bounds, ends)
+    n = hi - lo
+    segment = np.repeat(lo, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    low = np.full(len(bounds) - 1, np.inf)
+    np.minimum.at(low, segment, np.repeat(usable, n))
+    covered = np.isfinite(low)
+    return bounds[:-1][covered], bounds[1:][covered], low[covered]
+
+
+def usable_fraction(seconds, availability: Availability):
+    # Lowest usable fraction over each event's observing window (script start to the end of
+    # the capture, as script_generation_sky), 1 where no interval touches it. The segments
+    # overlapping a window are a run found with two searchsorted calls, and the minimum of
+    # every run is taken in one reduceat.
+    sky = script_generation_sky
+    seconds = np.asarray(seconds, dtype=np.float64)
+    if not len(seconds):
+        return np.ones(0)
+    lo = np.searchsorted(availability.ends, seconds + sky.WINDOW_START_S, "right")
+    hi = np.searchsorted(availability.starts, seconds + sky.WINDOW_END_S, "left")
+    values = np.append(availability.usable, 1.0)
+    runs = np.empty(2 * len(seconds), dtype=np.intp)
+    runs[0::2], runs[1::2] = lo, np.maximum(hi, lo)
+    return np.where(hi > lo, np.minimum.reduceat(values, runs)[0::2], 1.0)
+
+
+def apply_availability(df: pd.DataFrame, availability: Availability,
+                       min_usable: float | None = None) -> pd.DataFrame:
+    # Adds usable, drops the events below min_usable (DEFAULT_MIN_USABLE when None, and any
+    # with nothing usable) and scales the probability of the rest by it, rounded to whole
+    # percent as Occult gives it.
+    if min_usable is None:
+        min_usable = DEFAULT_MIN_USABLE
+    usable = usable_fraction(script_generation_sky.event_seconds(df), availability)
+    keep = (usable >= min_usable) & (usable > 0)
+    df = df[keep].assign(usable=usable[keep])
+    prob = pd.to_numeric(df["probability"], errors="coerce") * df["usable"]
+    return df.assign(probability=prob.round().astype(df["probability"].dtype))
@@ -0,0 +1,216 @@
+import argparse
+import json
+import mmap
+import re
+from pathlib import Path
+from script_generation_lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+CATALOG_VERSION = 1
+MAGIC = b"STARCAT\0"
+# Star ids as Occult prints them after the catalog prefix (find_star_anchor), and the digits
+# of each number in them. The numbers are zero padded and joined into one uint64 key;
+# the 2MASS declination sign is kept as a digit (+ 1, - 0).
+ID_FORMATS = {
+    "UCAC4": (r"(\d{1,3})-(\d{1,6})", (3, 6)),
+    "UCAC5": (r"(\d{1,3})-(\d{1,6})", (3, 6)),
+    "TYC": (r"(\d{1,4})-(\d{1,5})-(\d)", (4, 5, 1)),
+    "GSC": (r"(\d{1,4})-(\d{1,5})", (4, 5)),
+    "PPMXL": (r"(\d{1,4})-(\d{1,6})", (4, 6)),
+    "HIP": (r"(\d{1,6})", (6,)),
+    "Gaia": (r"(\d{1,19})", (19,)),
+    "2MASS": (r"(\d{8})([+-])(\d{7})", (8, 1, 7)),
+}
+_ID_PATTERNS = {cat: re.compile(pattern) for cat, (pattern, _) in ID_FORMATS.items()}
+FENCE = 512                        # every 512th id (one 4 KB page of ids) is kept in a small in-memory index
+WRITE_CHUNK = FENCE * 8192         # records per write while building
+
+
+def star_key(star_no) -> tuple[str, int] | None:
+    # "UCAC4 638-179406" -> ("UCAC4", 638179406); None for ids the catalogs do not cover (J names)
+    catalog, _, ident = str(star_no).strip().partition(" ")
+    pattern = _ID_PATTERNS.get(catalog)
+    m = pattern.fullmatch(ident.lstrip()) if pattern else None
+    if m is None:
+        return None
+    key = 0
+    for g, w in zip(m.groups(), ID_FORMATS[catalog][1]):
+        key = key * 10 ** w + (1 if g == "+" else 0 if g == "-" else int(g))
+    return (catalog, key) if key < 1 << 64 else None
+
+
+class StarCatalog:
+    # A catalog file written by write_catalog: a JSON header, then the ids (uint64), the
+    # magnitudes and the colours (float32) as columns, and every FENCE-th id of each
+    # catalog's segment. Within a segment the ids are sorted. A lookup binary searches the
+    # fences in memory and then reads the one block of ids that can hold the star from the
+    # memory-mapped file, so a night costs about one page read per star.
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path.name}: not a star catalog")
+            size = int.from_bytes(f.read(8), "little")
+            self.header = json.loads(f.read(size).decode("utf-8"))
+            if self.header.get("version") != CATALOG_VERSION:
+                raise ValueError(f"{self.path.name}: unsupported catalog version {self.header.get('version')}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self._map, "madvise"):
+            self._map.madvise(mmap.MADV_RANDOM)     # lookups are scattered; read-ahead would only add I/O
+        n, n_fences = self.header["rows"], self.header["fences"]
+        offset = len(MAGIC) + 8 + size
+        self.ids = np.frombuffer(self._map, dtype="<u8", count=n, offset=offset)
+        self.mag = np.frombuffer(self._map, dtype="<f4", count=n, offset=offset + 8 * n)
+        self.color = np.frombuffer(self._map, dtype="<f4", count=n, offset=offset + 12 * n)
+        self.fences = np.frombuffer(self._map, dtype="<u8", count=n_fences, offset=offset + 16 * n)
+        self.segments = {cat: tuple(span) for cat, span in self.header["catalogs"].items()}
+
+    def __len__(self) -> int:
+        return self.header["rows"]
+
+    def lookup(self, star_nos):
+        # (magnitude, colour) per star id, NaN where the catalog has no entry
+        codes, uniques = pd.factorize(np.asarray(star_nos, dtype=object))
+        parsed = [star_key(s) for s in uniques]
+        cats = np.array([p[0] if p else "" for p in parsed], dtype=object)
+        keys = np.array([p[1] if p else 0 for p in parsed], dtype=np.uint64)
+        mag = np.full(len(uniques) + 1, np.nan, dtype=np.float32)
+        color = np.full(len(uniques) + 1, np.nan, dtype=np.float32)
+        for cat, (start, count, fence_start) in self.segments.items():
+            which = np.flatnonzero(cats == cat)
+            if not count or not len(which):
+                continue
+            # probing in key order walks the file forwards
+            which = which[np.argsort(keys[which], kind="stable")]
+            want = keys[which]
+            fences = np.array(self.fences[fence_start:fence_start + -(-count // FENCE)])
+            # lower bound within the block, all stars at once
+            pos = np.maximum(np.searchsorted(fences, want, "right") - 1, 0) * FENCE
+            size = np.minimum(FENCE, count - pos)
+            while size.any():
+                half = size // 2
+                right = (size > 0) & (self.ids[start + np.minimum(pos + half, count - 1)] < want)
+                pos = np.where(right, pos + half + 1, pos)
+                size = np.where(right, size - half - 1, half)
+            pos = np.minimum(pos, count - 1)
+            hit = self.ids[start + pos] == want
+            mag[which[hit]] = self.mag[start + pos[hit]]
+            color[which[hit]] = self.color[start + pos[hit]]
+        # -1 (missing star_no) reads the NaN slot at the end
+        return mag[codes], color[codes]
+
+
+def enrich_events(df, catalog: StarCatalog):
+    # adds cat_mag and cat_color (NaN where the star is not in the catalog)
+    mag, color = catalog.lookup(df["star_no"].to_numpy())
+    return df.assign(cat_mag=mag, cat_color=color)
+
+
+def write_catalog(path, segments: dict, meta: dict | None = None) -> Path:
+    # segments: {catalog: (ids, mag, color)}, ids sorted ascending without duplicates.
+    # The arrays may be memory-mapped; they are written in chunks.
+    path = Path(path)
+    names = sorted(segments)
+    spans, start, fence_start = {}, 0, 0
+    for cat in names:
+        count = len(segments[cat][0])
+        spans[cat] = [start, count, fence_start]
+        start += count
+        fence_start += -(-count // FENCE)
+    header = json.dumps({"version": CATALOG_VERSION, "rows": start, "fences": fence_start, "catalogs": spans,
+                         **(meta or {})}).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)     # columns start 8-byte aligned
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for column, dtype in ((0, "<u8"), (1, "<f4"), (2, "<f4")):
+            for cat in names:
+                values = segments[cat][column]
+                for i in range(0, len(values), WRITE_CHUNK):
+                    np.asarray(values[i:i + WRITE_CHUNK], dtype=dtype).tofile(f)
+        for cat in names:
+            ids = segments[cat][0]
+            for i in range(0, len(ids), WRITE_CHUNK):
+                np.asarray(ids[i:i + WRITE_CHUNK], dtype="<u8")[::FENCE].tofile(f)
+    return path
+
+
+def build_catalog(csv_paths, out_path, catalog: str | None = None, id_col: str = "star_id",
+                  mag_col: str = "mag", color_col: str = "color", chunksize: int = 1_000_000) -> dict:
+    # Converts CSV extracts into a catalog file. Without catalog, id_col holds full ids as
+    # Occult prints them ("UCAC4 638-179406"); with it, the id without the prefix (for a
+    # Gaia extract, catalog="Gaia" and id_col="source_id"). Conversion holds about 25 bytes
+    # per star in memory; lookups do not. Returns the stars per catalog.
+    if catalog is not None and catalog not in ID_FORMATS:
+        raise ValueError(f"Unknown catalog {catalog!r}; expected one of {', '.join(ID_FORMATS)}")
+    parts = {}
+    for csv_path in csv_paths:
+        for chunk in pd.read_csv(csv_path, usecols=[id_col, mag_col, color_col], chunksize=chunksize,
+                                 dtype={id_col: str}):
+            ids = chunk[id_col].astype(str)
+            if catalog is not None:
+                ids = catalog + " " + ids.str.strip()
+            parsed = [star_key(s) for s in ids]
+            ok = np.array([p is not None for p in parsed], dtype=bool)
+            cats = np.array([p[0] for p in parsed if p], dtype=object)
+            keys = np.array([p[1] for p in parsed if p], dtype=np.uint64)
+            mag = chunk[mag_col].to_numpy(dtype=np.float32, na_value=np.nan)[ok]
+            color = chunk[color_col].to_numpy(dtype=np.float32, na_value=np.nan)[ok]
+            for cat in np.unique(cats):
+                sel = cats == cat
+                parts.setdefault(cat, []).append((keys[sel], mag[sel], color[sel]))
+
+    segments = {}
+    for cat, chunks in parts.items():
+        keys = np.concatenate([c[0] for c in chunks])
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]          # a star listed twice keeps its first row
+        segments[cat] = (keys[first], np.concatenate([c[1] for c in chunks])[order][first],
+                         np.concatenate([c[2] for c in chunks])[order][first])
+    write_catalog(out_path, segments, {"mag": mag_col, "color": color_col,
+                                       "sources": [Path(p).name for p in csv_paths]})
+    return {cat: len(s[0]) for cat, s in segments.items()}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Offline star catalog for magnitude and colour lookups.")
+    ap.add_argument("catalog_file", help="Catalog file, e.g. stars.starcat")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build", help="Convert CSV extracts (id, magnitude, colour columns) into the catalog file")
+    b.add_argument("csv", nargs="+")
+    b.add_argument("--catalog", choices=sorted(ID_FORMATS), default=None,
+                   help="Catalog of every row when the id column holds bare ids (e.g. Gaia with --id-col source_id)")
+    b.add_argument("--id-col", default="star_id", help="Id column: full ids such as 'UCAC4 638-179406', or bare ids with --catalog")
+    b.add_argument("--mag-col", default="mag", help="Magnitude column (e.g. phot_g_mean_mag)")
+    b.add_argument("--color-col", default="color", help="Colour column (e.g. bp_rp)")
+
+    sub.add_parser("info", help="List the catalogs in the file")
+
+    q = sub.add_parser("lookup", help="Magnitude and colour of star ids")
+    q.add_argument("star", nargs="+", help="Star ids, e.g. 'UCAC4 638-179406'")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        counts = build_catalog(args.csv, args.catalog_file, args.catalog, args.id_col, args.mag_col, args.color_col)
+        print(f"{sum(counts.values())} stars written to {args.catalog_file} "
+              f"({', '.join(f'{c} {n}' for c, n in sorted(counts.items()))})")
+        return
+    cat = StarCatalog(args.catalog_file)
+    if args.cmd == "info":
+        print(f"{args.catalog_file}: {len(cat)} stars, magnitude {cat.header.get('mag')}, colour {cat.header.get('color')}")
+        for name, (_, count, _) in sorted(cat.segments.items()):
+            print(f"  {name}: {count}")
+    else:
+        mag, color = cat.lookup(args.star)
+        for star, m, c in zip(args.star, mag, color):
+            print(f"{star}: " + ("not in catalog" if np.isnan(m) else f"mag {m:.3f}  colour {c:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
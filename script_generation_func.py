@@ -1,8 +1,12 @@
+from __future__ import annotations
 import re
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-import pandas as pd
+from script_generation_lazy import lazy_import
+
+pd = lazy_import("pandas")
+script_generation_sky = lazy_import("script_generation_sky")
 
 MONTH_NUM = {"Jan":1,"Feb":2,"Mar":3,"Apr":4,"May":5,"Jun":6,
              "Jul":7,"Aug":8,"Sep":9,"Oct":10,"Nov":11,"Dec":12}
@@ -11,6 +15,56 @@ EVENT_ROW = re.compile(r"^\s*\d{4}\s+[A-Za-z]{3}\s+\d{1,2}\b")
 PROB_TOK  = re.compile(r"^\d+%$")
 INT_TOK   = re.compile(r"^-?\d+$")
 
+# Single-match fast path for the usual Occult 4 summary row. Anything it rejects
+# (or matches with out-of-range alt/az) goes through the token heuristics below.
+_NUM = r"[-+]?[0-9.]+"
+EVENT_LINE = re.compile(rf"""
+    ^\s*(?P<year>[1-9]\d{{3}})\s+(?P<month>Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)
+    \s+(?P<day>\d{{1,2}})\s+(?P<hour>\d{{1,2}})\s+(?P<minute>\d+(?:\.\d+)?)
+    \s+{_NUM}\s+{_NUM}                                   # path, diameter
+    \s+(?P<durn>[0-9]*\.?[0-9]+)\S*\s+{_NUM}              # duration, uncertainty
+    \s+(?P<star_mag>-?\d+(?:\.\d+)?)\s+(?P<mag_drop>[0-9]*\.?[0-9]+)\S*
+    \s+(?P<star_no>(?:UCAC4|UCAC5|TYC|Gaia|2MASS|HIP|GSC|PPMXL)\s+\S+|J\S*[-+]\S*)
+    (?:\s+[^\W\d_])*                                      # single-letter flags
+    \s+(?![^\W\d_]\s)\S+                                 # column before the asteroid
+    \s+(?P<asteroid>\S+(?:\s+\S+)*?)
+    \s+(?P<alt>-?\d+)\s+(?P<az>-?\d+)\s+\d*\.\d+\s+-?\d+  # alt, az, dist, sun alt
+    \s+(?P<probability>\d+)%
+    \s+(?P<ra_h>\d+)\s+(?P<ra_m>\d+)\s+(?P<ra_s>\d+\.\d*)
+    \s+(?:(?P<dec_sign>[-+])\s+(?=\d))?(?P<dec_d>[-+]?\d+)\s+(?P<dec_m>\d+)\s+(?P<dec_s>\d+\.\d*)
+    # a separate sign token takes unsigned degrees; "+ -5 12 30.0" goes to the heuristics
+    (?:\s+\d+)?\s*$
+""", re.VERBOSE)
+STAR_PREFIX_TOK = re.compile(r"(?<!\S)(?:" + "|".join(sorted(STAR_PREFIXES)) + r")(?!\S)")
+
+PARSE_STATS = {"fast": 0, "fallback": 0}
+
+def reset_parse_stats() -> None:
+    for k in PARSE_STATS:
+        PARSE_STATS[k] = 0
+
+def fast_path_hit_rate() -> float:
+    total = PARSE_STATS["fast"] + PARSE_STATS["fallback"]
+    return PARSE_STATS["fast"] / total if total else float("nan")
+
+# Per telescope, an event is rejected when star_mag >= mag and durn < dur for any of
+# its (mag, dur) pairs. Both the Event filter in the CLI and telescope_accept_mask read
+# this table. ADD MAG CONDITIONS HERE
+TELESCOPE_REJECT = {
+    "c11": [(15.0, 1.0), (14.5, 0.3)],
+    "c14": [(15.5, 1.0)],
+    "hubble24": [(16.0, 1.0)],
+}
+
+def telescope_rules(telescope_key: str) -> list[tuple[float, float]]:
+    try:
+        return TELESCOPE_REJECT[telescope_key.lower().strip()]
+    except KeyError:
+        raise ValueError(f"Unknown telescope: {telescope_key}") from None
+
+def telescope_accepts(mag: float, dur: float, telescope_key: str) -> bool:
+    return not any(mag >= m and dur < d for m, d in telescope_rules(telescope_key))
+
 def telescope_accept_mask(df: pd.DataFrame, telescope_key: str) -> pd.Series:
     mag = df["star_mag"].astype(float)
 
@@ -19,44 +73,19 @@ def telescope_accept_mask(df: pd.DataFrame, telescope_key: str) -> pd.Series:
     else:
         dur = df["durn"].astype(float)
 
-    tel = telescope_key.lower().strip()
-
-    if tel == "c11":
-        rejected = ((mag >= 15.0) & (dur < 1.0)) | ((mag >= 14.5) & (dur < 0.3)) #ADD MAG CONDITIONS HERE
-        return ~rejected
-    elif tel == "c14":
-        rejected = ((mag >= 15.5) & (dur < 1.0)) #ADD MAG CONDITIONS HERE
-        return ~rejected
-    elif tel == "hubble24":
-        rejected = ((mag >= 16.0) & (dur < 1.0)) #ADD MAG CONDITIONS HERE
-        return ~rejected
-    else:
-        raise ValueError(f"Unknown telescope: {telescope_key}")
+    rejected = pd.Series(False, index=df.index)
+    for m, d in telescope_rules(telescope_key):
+        rejected = rejected | ((mag >= m) & (dur < d))
+
+    if "visible" in df.columns:
+        # set by script_generation_sky.apply_visibility
+        rejected = rejected | ~df["visible"].astype(bool)
+    return ~rejected
 
 def float_prefix(s: str) -> float:
     m = re.match(r"\s*([0-9]*\.?[0-9]+)", s)
     return float(m.group(1)) if m else float("nan")
 
-# def filter_events_for_telescope(events, telescope_key: str, day_of_observation: int):
-#     filtered = []
-#     for ev in events:
-#         if not night_window(ev, day_of_observation):
-#             continue
-#         if telescope_key == "c11":
-#             # ADD MAG CONDITIONS HERE
-#             if not ((ev.mag >= 15.0) and (ev.dur < 1.0)):
-#                 if not ((ev.mag >= 14.5) and (ev.dur < 0.3)):
-#                     filtered.append(ev)
-#         elif telescope_key == "c14":
-#             # ADD MAG CONDITIONS HERE
-#             if not ((ev.mag >= 15.5) and (ev.dur < 1.0)):
-#                 filtered.append(ev)
-#         elif telescope_key == "hubble24":
-#             # ADD MAG CONDITIONS HERE
-#             if not ((ev.mag >= 15.5) and (ev.dur < 1.0)):
-#                 filtered.append(ev)
-#     return filtered
-
 def exposure_for_mag(mag: float) -> float:
     inttime = 0.0067
     if mag > 9.0:  inttime = 0.015
@@ -110,6 +139,8 @@ class Event:
     stime: float
     lshour: int
     lsmin: int
+    ra_deg: float = float("nan")
+    dec_deg: float = float("nan")
 
 def parse_radec_from_end(tokens):
     t = tokens[:]
@@ -128,6 +159,36 @@ def parse_radec_from_end(tokens):
     dec = f"{dec_d} {dec_m} {dec_s}"
     return core, ra, dec
 
+def ra_to_degrees(ra_h, ra_m, ra_s) -> float:
+    return 15.0 * (float(ra_h) + float(ra_m) / 60.0 + float(ra_s) / 3600.0)
+
+def dec_to_degrees(dec_d: str, dec_m, dec_s) -> float:
+    # the sign lives on the degrees token, so "-0 12 30" must stay negative
+    v = abs(float(dec_d)) + float(dec_m) / 60.0 + float(dec_s) / 3600.0
+    return -v if dec_d.lstrip().startswith("-") else v
+
+def format_ra(ra_deg: float) -> str:
+    cs = int(round(ra_deg / 15.0 * 360000.0)) % (24 * 360000)
+    return f"{cs // 360000} {cs // 6000 % 60:02d} {cs % 6000 // 100:02d}.{cs % 100:02d}"
+
+def format_dec(dec_deg: float) -> str:
+    ds = int(round(abs(dec_deg) * 36000.0))
+    sign = "-" if dec_deg < 0 and ds > 0 else "+"
+    return f"{sign}{ds // 36000:02d} {ds // 600 % 60:02d} {ds % 600 // 10:02d}.{ds % 10}"
+
+def format_radec_columns(ra_deg, dec_deg):
+    # Vectorized format_ra / format_dec over whole columns: RA to 0.01 s, Dec to 0.1".
+    ra_deg = pd.Series(ra_deg, dtype="float64").reset_index(drop=True)
+    dec_deg = pd.Series(dec_deg, dtype="float64").reset_index(drop=True)
+    cs = (ra_deg / 15.0 * 360000.0).round().astype("int64") % (24 * 360000)
+    ra = ((cs // 360000).astype(str) + " " + (cs // 6000 % 60).astype(str).str.zfill(2) + " "
+          + (cs % 6000 // 100).astype(str).str.zfill(2) + "." + (cs % 100).astype(str).str.zfill(2))
+    ds = (dec_deg.abs() * 36000.0).round().astype("int64")
+    sign = pd.Series("+", index=ds.index).mask((dec_deg < 0) & (ds > 0), "-")
+    dec = (sign + (ds // 36000).astype(str).str.zfill(2) + " " + (ds // 600 % 60).astype(str).str.zfill(2) + " "
+           + (ds % 600 // 10).astype(str).str.zfill(2) + "." + (ds % 10).astype(str))
+    return ra, dec
+
 def find_altaz_index(tokens):
     for i in range(len(tokens) - 3, -1, -1):
         if INT_TOK.match(tokens[i]) and INT_TOK.match(tokens[i+1]):
@@ -174,10 +235,50 @@ def find_asteroid(tokens):
     start = j + 1
     return " ".join(tokens[start:alt_i]).strip()
 
+def parse_event_line_fast(line: str):
+    m = EVENT_LINE.match(line)
+    if m is None:
+        return None
+    (year, month, day, hour, minute, durn, star_mag, mag_drop, star_no, asteroid,
+     alt, az, prob, ra_h, ra_m, ra_s, dec_sign, dec_d, dec_m, dec_s) = m.groups()
+    alt = int(alt); az = int(az)
+    if not (-90 <= alt <= 90 and 0 <= az <= 360):
+        return None
+    if star_no[0] == "J":
+        if STAR_PREFIX_TOK.search(line):
+            # a catalog prefix anywhere on the row wins over a J-style id
+            return None
+    else:
+        star_no = " ".join(star_no.split())
+    dec_neg = dec_sign == "-" or dec_d[0] == "-"
+    dec_abs = abs(float(dec_d)) + float(dec_m) / 60.0 + float(dec_s) / 3600.0
+
+    return {
+        "date": f"{year} {month} {day.zfill(2)}",
+        "ut": f"{hour.lstrip('0') or '0'} {float(minute):g}",
+        "durn": float(durn),
+        "star_mag": float(star_mag),
+        "mag_drop": float(mag_drop),
+        "star_no": star_no,
+        "asteroid": " ".join(asteroid.split()),
+        "alt": alt,
+        "az": az,
+        "probability": float(prob),
+        "ra_deg": 15.0 * (float(ra_h) + float(ra_m) / 60.0 + float(ra_s) / 3600.0),
+        "dec_deg": -dec_abs if dec_neg else dec_abs,
+    }
+
 def parse_event_line(line: str):
+    d = parse_event_line_fast(line)
+    if d is not None:
+        PARSE_STATS["fast"] += 1
+        return d
     if not EVENT_ROW.match(line):
         return None
+    PARSE_STATS["fallback"] += 1
+    return parse_event_tokens(line)
 
+def parse_event_tokens(line: str):
     tokens = line.split()
     core, ra, dec = parse_radec_from_end(tokens)
     year  = int(core[0]); month = core[1]; day = int(core[2])
@@ -211,44 +312,172 @@ def parse_event_line(line: str):
         "alt": alt,
         "az": az,
         "probability": probability,
-        "ra": ra,
-        "dec": dec,
+        "ra_deg": ra_to_degrees(*ra.split()),
+        "dec_deg": dec_to_degrees(*dec.split()),
     }
 
-def events_to_dataframe(path: str) -> pd.DataFrame:
-    rows = []
-    bad = []
+EVENT_COLS = ["utc_dt","date","ut","durn","star_mag","mag_drop","star_no",
+              "asteroid","alt","az","probability","ra_deg","dec_deg"]
+DIAGNOSTIC_COLS = ["line_no","status","error_class","message","raw"]
+# durn, star_mag and mag_drop stay float64: the telescope rules and sweep cut-offs compare
+# them against decimals such as 13.7, and float32(13.7) sorts below 13.7. Probability is
+# a whole percent, exact in float32. RA/Dec stay float64 (float32 near 360 deg is ~0.1").
+EVENT_DTYPES = {"probability": "float32",
+                "alt": "Int16", "az": "Int16", "line_no": "int32"}
+# string columns stored as categoricals when values repeat (fewer uniques than half the rows)
+CATEGORY_COLS = ["date", "ut", "asteroid", "star_no", "source"]
+CATEGORY_MAX_RATIO = 0.5
+
+class EventParseError(ValueError):
+    def __init__(self, path: str, line_no: int, raw: str, cause: Exception):
+        super().__init__(f"{path}:{line_no}: {type(cause).__name__}: {cause}\n    {raw.strip()}")
+        self.path = path
+        self.line_no = line_no
+        self.raw = raw
+        self.cause = cause
+
+def event_datetime(d: dict) -> datetime:
+    year, month, day = parse_date_str(d["date"])
+    hour, minute_float = parse_ut_str(d["ut"])
+    min_int = int(minute_float)
+    sec = int((minute_float - min_int) * 60)
+    return datetime(year, MONTH_NUM[month], day, hour, min_int, sec)
+
+def iter_parsed_lines(path: str, strict: bool = False):
+    # Yields (row, None) for each parsed event row (with its line_no) and (None, diag)
+    # for every other line, diag being (line_no, status, error_class, message, raw) with
+    # status "blank", "skipped" (not an event row) or "error".
     with open(path, "r", encoding="utf-8", errors="replace") as f:
         for ln_no, line in enumerate(f, 1):
             line = line.strip("\n")
             if not line.strip():
+                yield None, (ln_no, "blank", "", "", line)
                 continue
             try:
                 d = parse_event_line(line)
                 if d:
-                    rows.append(d)
+                    d["utc_dt"] = event_datetime(d)
             except Exception as e:
-                if len(bad) < 10:
-                    bad.append((ln_no, str(e), line))
+                if strict:
+                    raise EventParseError(path, ln_no, line, e) from e
+                yield None, (ln_no, "error", type(e).__name__, str(e), line)
+                continue
+            if d:
+                d["line_no"] = ln_no
+                yield d, None
+            else:
+                yield None, (ln_no, "skipped", "", "", line)
+
+def read_event_rows(path: str, strict: bool = False):
+    # Returns (rows, diag) as plain dicts and tuples; every line of the file ends up in
+    # exactly one of them (see iter_parsed_lines).
+    rows = []
+    diag = []
+    for d, bad in iter_parsed_lines(path, strict):
+        if d is not None:
+            rows.append(d)
+        else:
+            diag.append(bad)
+    return rows, diag
+
+def load_events(path: str, strict: bool = False, compact: bool = True):
+    # Returns (events, diagnostics) DataFrames built from read_event_rows.
+    rows, diag = read_event_rows(path, strict=strict)
+    df = rows_to_frame(rows, compact)
+    diagnostics = pd.DataFrame(diag, columns=DIAGNOSTIC_COLS)
+    return df, diagnostics
+
+def rows_to_frame(rows, compact: bool = True) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=EVENT_COLS + ["line_no"])
+    df["utc_dt"] = pd.to_datetime(df["utc_dt"])
+    return compact_events(df) if compact else df
+
+def iter_event_batches(path: str, batch_size: int = 10_000, strict: bool = False, counts=None):
+    # load_events in DataFrames of at most batch_size rows, so memory does not grow with
+    # the file. counts (a Counter) gets the status of every line, "event" for parsed rows.
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    rows = []
+    for d, bad in iter_parsed_lines(path, strict):
+        if counts is not None:
+            counts["event" if d is not None else bad[1]] += 1
+        if d is None:
+            continue
+        rows.append(d)
+        if len(rows) == batch_size:
+            yield rows_to_frame(rows)
+            rows = []
+    if rows:
+        yield rows_to_frame(rows)
+
+def compact_events(df: pd.DataFrame) -> pd.DataFrame:
+    # Narrow dtypes for event frames (EVENT_DTYPES, CATEGORY_COLS); other columns are left alone.
+    out = df.copy()
+    for col, dtype in EVENT_DTYPES.items():
+        if col in out.columns:
+            out[col] = out[col].astype(dtype)
+    for col in CATEGORY_COLS:
+        if col in out.columns and not isinstance(out[col].dtype, pd.CategoricalDtype):
+            if out[col].nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(out):
+                out[col] = out[col].astype("category")
+    return out
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    # Per-column dtype and deep memory use, largest first, with a total row.
+    usage = df.memory_usage(index=False, deep=True)
+    rep = pd.DataFrame({
+        "dtype": [str(df[c].dtype) for c in usage.index],
+        "bytes": usage.to_numpy(),
+        "bytes_per_row": usage.to_numpy() / max(len(df), 1),
+    }, index=usage.index).sort_values("bytes", ascending=False)
+    rep.loc["total"] = ["", int(usage.sum()), usage.sum() / max(len(df), 1)]
+    return rep
+
+def diagnostics_summary(df: pd.DataFrame, diagnostics: pd.DataFrame) -> dict:
+    return count_diagnostics(len(df), diagnostics["status"].value_counts())
+
+def count_diagnostics(n_events: int, counts) -> dict:
+    # counts maps status -> number of lines (value_counts() or a Counter)
+    summary = {
+        "events": n_events,
+        "blank": int(counts.get("blank", 0)),
+        "skipped": int(counts.get("skipped", 0)),
+        "error": int(counts.get("error", 0)),
+    }
+    summary["lines"] = sum(summary.values())
+    return summary
 
-    df = pd.DataFrame(rows)
-    def row_to_dt(r):
-        year, month, day = parse_date_str(r["date"])
-        hour, minute_float = parse_ut_str(r["ut"])
-        min_int = int(minute_float)
-        sec = int((minute_float - min_int) * 60)
-        return datetime(year, MONTH_NUM[month], day, hour, min_int, sec)
+def diagnostics_sidecar_path(events_path: str) -> Path:
+    p = Path(events_path)
+    return p.with_name(p.stem + ".diagnostics.csv")
 
-    df["utc_dt"] = df.apply(row_to_dt, axis=1)
+def write_diagnostics(diagnostics: pd.DataFrame, out_path, only_errors: bool = True) -> Path:
+    out_path = Path(out_path)
+    d = diagnostics[diagnostics["status"] == "error"] if only_errors else diagnostics
+    d.to_csv(out_path, index=False)
+    return out_path
 
-    cols = ["utc_dt","date","ut","durn","star_mag","mag_drop","star_no",
-            "asteroid","alt","az","probability","ra","dec"]
-    return df[cols]
+def events_to_dataframe(path: str, strict: bool = False) -> pd.DataFrame:
+    df, _ = load_events(path, strict=strict)
+    return df[EVENT_COLS]
 
 def parse_date_str(date_str: str):
     y_str, mon, d_str = date_str.split()
     return int(y_str), mon, int(d_str)
 
+def as_decimal(x) -> float:
+    # float32 columns hand back e.g. 0.30000001192; Occult values have at most 7 digits
+    return float(format(float(x), ".7g"))
+
+def is_missing(x) -> bool:
+    # None, NaN, NaT and pd.NA, without importing pandas for plain dict rows
+    if x is None:
+        return True
+    try:
+        return bool(x != x)
+    except TypeError:
+        return True
+
 def parse_ut_str(ut_str: str):
     h_str, m_str = ut_str.split()
     return int(h_str), float(m_str)
@@ -265,20 +494,23 @@ def extract_event(row) -> Event | None:
         dur_token = durn_val
         dur = float_prefix(durn_val)
     else:
-        dur = float(durn_val)
+        dur = as_decimal(durn_val)
         dur_token = f"{dur:g}s"
 
-    mag = float(row["star_mag"])
+    mag = as_decimal(row["star_mag"])
     mag_token = f"{mag:g}"
-    mag_drop = float(row["mag_drop"])
-    radec = f'{row["ra"]} {row["dec"]}'
-    alt = int(row["alt"]) if pd.notna(row["alt"]) else 0
-    az  = int(row["az"])  if pd.notna(row["az"]) else 0
+    mag_drop = as_decimal(row["mag_drop"])
+    if "radec" in row:
+        radec = row["radec"]
+    else:
+        radec = f'{format_ra(row["ra_deg"])} {format_dec(row["dec_deg"])}'
+    alt = int(row["alt"]) if not is_missing(row["alt"]) else 0
+    az  = int(row["az"])  if not is_missing(row["az"]) else 0
     altaz = f"{alt:>3} {az:>3}"
-    target = str(row["asteroid"]) if pd.notna(row["asteroid"]) else ""
+    target = str(row["asteroid"]) if not is_missing(row["asteroid"]) else ""
     asteroid_id = target.split()[0] if target else ""
     occulted_star = str(row["star_no"])
-    prob = float(row["probability"])
+    prob = as_decimal(row["probability"])
     date_object = datetime(year, MONTH_NUM[month], day, hour, min_int, sec)
 
     maxint = dur / 4.0
@@ -315,7 +547,9 @@ def extract_event(row) -> Event | None:
         sthour += 24
     stime = sthour + stmin / 60.0
     sttime = f"{sthour:02d}:{stmin:02d}:{sec:02d}"
-    inttime = exposure_for_mag(mag)
+    # a catalog magnitude (script_generation_catalog) is more precise than Occult's for the exposure
+    cat_mag = row["cat_mag"] if "cat_mag" in row else None
+    inttime = exposure_for_mag(mag if is_missing(cat_mag) else float(cat_mag))
     if inttime > maxint:
         inttime = maxint
 
@@ -329,9 +563,18 @@ def extract_event(row) -> Event | None:
         occulted_star=occulted_star, prob=prob,
         maxint=maxint, inttime=inttime, nsamp=nsamp,
         sttime=sttime, mttime=mttime, lstime=lstime, stime=stime,
-        lshour=lshour, lsmin=lsmin
+        lshour=lshour, lsmin=lsmin,
+        ra_deg=float(row["ra_deg"]), dec_deg=float(row["dec_deg"])
     )
 
+def events_from_frame(df: pd.DataFrame) -> list[Event]:
+    # RA/Dec text is rendered for the whole frame in one pass, then each row becomes an Event.
+    ra, dec = format_radec_columns(df["ra_deg"], df["dec_deg"])
+    records = df.to_dict("records")
+    for rec, r, d in zip(records, ra, dec):
+        rec["radec"] = f"{r} {d}"
+    return [extract_event(rec) for rec in records]
+
 def night_window_filter(df: pd.DataFrame, day_filter: int) -> pd.Series:
     dt = df["utc_dt"]
     return ((dt.dt.day == day_filter) & (dt.dt.hour < 16)) | ((dt.dt.day == day_filter - 1) & (dt.dt.hour > 16))
@@ -347,12 +590,14 @@ def handle_num(x) -> str:
 def handle_print(*args) -> str:
     return " ".join(a if isinstance(a, str) else handle_num(a) for a in args) + "\n"
 
-def get_flagged_events(events_list):
+def get_flagged_events(events_list, slew_s=None):
+    # slew_s[i]: slew time into event i from event i-1 (see script_generation_sky),
+    # added to the 4 minute conflict window when given.
     flagged = []
     current = [events_list[0]]
     for i in range(1, len(events_list)):
         time_difference = (events_list[i].date_object - events_list[i-1].date_object).total_seconds()
-        if time_difference <= 240:
+        if time_difference <= 240 + (slew_s[i] if slew_s is not None else 0.0):
             current.append(events_list[i])
         else:
             if len(current) >= 2:
@@ -362,6 +607,17 @@ def get_flagged_events(events_list):
         flagged.append(current)
     return flagged
 
+def conflict_rows(events_list, slew_s=None):
+    # get_flagged_events groups as plain dicts (for printing or the planning service)
+    if not events_list:
+        return []
+    slews = slew_s if slew_s is not None else [0.0] * len(events_list)
+    slew_into = {id(ev): float(s) for ev, s in zip(events_list, slews)}
+    return [[{"asteroid_id": ev.asteroid_id, "target": ev.target, "time": ev.time, "mag": ev.mag_token,
+              "dur": ev.dur_token, "prob": ev.prob, "altaz": ev.altaz, "slew": slew_into[id(ev)]}
+             for ev in group]
+            for group in get_flagged_events(events_list, slew_s)]
+
 def infer_day_from_filename(path: str) -> int | None:
     m = re.search(r"(\d{4})(\d{2})(\d{2})", Path(path).name)
     return int(m.group(3)) if m else None
@@ -373,70 +629,89 @@ def get_astrometry_string(radec: str) -> str:
     dec_d_abs = dec_d.lstrip("+-")
     return f"#Astrometry coordinates: {ra_h}h{ra_m}m{ra_s}s {sign}{dec_d_abs}d{dec_m}m{dec_s}s\n"
 
-def generate_scs(events, output_path: str, pre_path: str, post_path: str) -> None:
+def read_header_footer(pre_path: str, post_path: str):
     with open(pre_path, "r", encoding="utf-8", errors="replace", newline="") as f:
         header = f.read()
     if not header.endswith("\n"):
         header += "\n"
     with open(post_path, "r", encoding="utf-8", errors="replace", newline="") as f:
         footer = f.read()
+    return header, footer
+
+def scs_event_block(ev: Event, star: int, laststime: float, slew_s: float | None = None) -> str:
+    out = handle_print("#Start hours ", ev.stime, " previous: ", laststime)
+    if slew_s is not None:
+        out += handle_print("#Slew seconds ", round(float(slew_s), 1))
+    out += handle_print("# *************** Occultation", star, "************")
+    out += handle_print("#")
+    out += handle_print(
+        "#UT= ", ev.time,
+        "Dur", ev.dur_token,
+        "Mv=", ev.mag_token,
+        "AltAz=", ev.altaz,
+        "LocalStart=", ev.lstime,
+        "prob=", ev.prob,
+        "Target=", ev.target,
+        "RA/DEC", ev.radec,
+        "star=", ev.occulted_star,
+        "MagDrop=", ev.mag_drop
+    )
+    out += get_astrometry_string(ev.radec)
+    out += handle_print("TARGETNAME \"", ev.target, "\"")
+    out += handle_print("UNLOCK CONTROLS")
+    out += handle_print("MOUNT TRACKING None")
+    if ev.hour > 16:
+        out += handle_print('WAIT UNTIL LATER THAN LOCALTIME "', ev.sttime, '"') #midnight change to be handled here
+    else:
+        out += handle_print('WAIT UNTIL LATER THAN LOCALTIME "', ev.sttime, '"')
+    out += handle_print("IGNORE ERRORS FROM ONERROR RUN \"\"")
+    out += handle_print("MOUNT TRACKING Sidereal")
+    out += handle_print("  MOUNT GOTO \"", ev.radec, "\"")
+    out += handle_print("END IGNORE ERRORS")
+    out += handle_print("DELAY 2")
+    out += handle_print("#")
+    # free minutes before this event once the mount has arrived
+    if (ev.stime - laststime) * 60 - (slew_s or 0.0) / 60 > 20:
+        out += handle_print("GOSUB AFOCUS")
+    out += handle_print("GOSUB PLATESOLV")
+    out += handle_print("WAIT UNTIL LATER THAN LOCALTIME \"", ev.mttime, "\"")
+    out += handle_print("GOSUB PLATESOLV")
+    out += handle_print("SET RESOLUTION TO 800x600")
+    out += handle_print("SET EXPOSURE TO", ev.inttime)
+    out += handle_print("DELAY 3")
+    out += handle_print("DISPLAY STRETCH AUTO")
+    out += handle_print("WAIT UNTIL LATER THAN LOCALTIME \"", ev.lstime, "\"")
+    out += handle_print("  CAPTURE 60 SECONDS LIVE FRAMES")
+    out += handle_print("SET RESOLUTION TO 1920x1200")
+    out += handle_print("SET EXPOSURE TO 0.5")
+    out += handle_print("DELAY 3")
+    out += handle_print("DISPLAY STRETCH AUTO")
+    out += handle_print("END UNLOCK")
+    return out
+
+def next_laststime(ev: Event) -> float:
+    return ev.lshour + (ev.lsmin + 5) / 60.0
+
+def iter_scs_blocks(scheduled):
+    # scheduled: (event, slew seconds or None) in time order -> one SCS block per event
+    laststime = -10.0
+    for k, (ev, slew) in enumerate(scheduled):
+        yield scs_event_block(ev, k + 1, laststime, slew)
+        laststime = next_laststime(ev)
 
-    events.sort(key=lambda e: e.date_object)
+def render_scs(events, header: str, footer: str, slew_s=None) -> str:
+    # events must already be in time order; slew_s as for get_flagged_events
+    slews = slew_s if slew_s is not None else [None] * len(events)
+    return "".join([header, *iter_scs_blocks(zip(events, slews)), footer])
 
-    out = header
-    star = 1
-    laststime = -10.0
-    for ev in events:
-        out += handle_print("#Start hours ", ev.stime, " previous: ", laststime)
-        out += handle_print("# *************** Occultation", star, "************")
-        out += handle_print("#")
-        out += handle_print(
-            "#UT= ", ev.time,
-            "Dur", ev.dur_token,
-            "Mv=", ev.mag_token,
-            "AltAz=", ev.altaz,
-            "LocalStart=", ev.lstime,
-            "prob=", ev.prob,
-            "Target=", ev.target,
-            "RA/DEC", ev.radec,
-            "star=", ev.occulted_star,
-            "MagDrop=", ev.mag_drop
-        )
-        out += get_astrometry_string(ev.radec)
-        out += handle_print("TARGETNAME \"", ev.target, "\"")
-        out += handle_print("UNLOCK CONTROLS")
-        out += handle_print("MOUNT TRACKING None")
-        if ev.hour > 16:
-            out += handle_print('WAIT UNTIL LATER THAN LOCALTIME "', ev.sttime, '"') #midnight change to be handled here
-        else:
-            out += handle_print('WAIT UNTIL LATER THAN LOCALTIME "', ev.sttime, '"')
-        out += handle_print("IGNORE ERRORS FROM ONERROR RUN \"\"")
-        out += handle_print("MOUNT TRACKING Sidereal")
-        out += handle_print("  MOUNT GOTO \"", ev.radec, "\"")
-        out += handle_print("END IGNORE ERRORS")
-        out += handle_print("DELAY 2")
-        out += handle_print("#")
-        if (ev.stime - laststime) * 60 > 20:
-            out += handle_print("GOSUB AFOCUS")
-        out += handle_print("GOSUB PLATESOLV")
-        out += handle_print("WAIT UNTIL LATER THAN LOCALTIME \"", ev.mttime, "\"")
-        out += handle_print("GOSUB PLATESOLV")
-        out += handle_print("SET RESOLUTION TO 800x600")
-        out += handle_print("SET EXPOSURE TO", ev.inttime)
-        out += handle_print("DELAY 3")
-        out += handle_print("DISPLAY STRETCH AUTO")
-        out += handle_print("WAIT UNTIL LATER THAN LOCALTIME \"", ev.lstime, "\"")
-        out += handle_print("  CAPTURE 60 SECONDS LIVE FRAMES")
-        out += handle_print("SET RESOLUTION TO 1920x1200")
-        out += handle_print("SET EXPOSURE TO 0.5")
-        out += handle_print("DELAY 3")
-        out += handle_print("DISPLAY STRETCH AUTO")
-        out += handle_print("END UNLOCK")
-
-        star += 1
-        laststime = ev.lshour + (ev.lsmin + 5) / 60.0
-    out += footer
+def generate_scs(events, output_path: str, pre_path: str, post_path: str, telescope: str | None = None) -> str:
+    header, footer = read_header_footer(pre_path, post_path)
+
+    events.sort(key=lambda e: e.date_object)
+    slew_s = script_generation_sky.consecutive_slew_seconds(events, telescope) if telescope else None
+    out = render_scs(events, header, footer, slew_s)
 
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8", newline="") as f:
         f.write(out)
+    return out
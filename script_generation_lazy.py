@@ -0,0 +1,18 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    # Module object whose real import runs on first attribute access, so pandas,
+    # numpy and the heavier script_generation_* modules cost nothing until used.
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,104 @@
+from pathlib import Path
+import pandas as pd
+import script_generation_func
+
+MERGE_KEY = ["asteroid", "star_no"]
+CHANGE_COLS = ["update", "status", "asteroid", "star_no", "utc_dt_old", "utc_dt_new", "shift_s",
+               "probability_old", "probability_new", "durn_old", "durn_new", "source_old", "source_new"]
+
+
+def match_events(old: pd.DataFrame, new: pd.DataFrame, tolerance_s: float) -> pd.DataFrame:
+    # Hash join on (asteroid, star_no), then keep the closest pair within the time
+    # tolerance, one-to-one in both directions.
+    pairs = new[MERGE_KEY + ["utc_dt"]].reset_index(names="_new").merge(
+        old[MERGE_KEY + ["utc_dt"]].reset_index(names="_old"), on=MERGE_KEY, suffixes=("_new", "_old")
+    )
+    pairs["_gap"] = (pairs["utc_dt_new"] - pairs["utc_dt_old"]).dt.total_seconds().abs()
+    pairs = pairs[pairs["_gap"] <= tolerance_s].sort_values("_gap", kind="mergesort")
+    pairs = pairs.drop_duplicates("_new").drop_duplicates("_old")
+    return pairs[["_new", "_old"]]
+
+
+def merge_two(old: pd.DataFrame, new: pd.DataFrame, tolerance_s: float = 600.0):
+    old = old.reset_index(drop=True)
+    new = new.reset_index(drop=True)
+    pairs = match_events(old, new, tolerance_s)
+
+    matched_old = old.loc[pairs["_old"].to_numpy()].reset_index(drop=True)
+    matched_new = new.loc[pairs["_new"].to_numpy()].reset_index(drop=True)
+    shift = (matched_new["utc_dt"] - matched_old["utc_dt"]).dt.total_seconds()
+    changed = (shift != 0) | (matched_new["probability"] != matched_old["probability"]) \
+        | (matched_new["durn"] != matched_old["durn"])
+
+    unmatched_old = old.drop(index=pairs["_old"].to_numpy())
+    unmatched_new = new.drop(index=pairs["_new"].to_numpy())
+    # Old events inside the time span the update covers were dropped by Occult;
+    # outside it the update simply says nothing about them, so they are kept.
+    if len(new):
+        covered = unmatched_old["utc_dt"].between(new["utc_dt"].min(), new["utc_dt"].max())
+    else:
+        covered = pd.Series(False, index=unmatched_old.index)
+    removed = unmatched_old[covered]
+    kept = unmatched_old[~covered]
+
+    merged = pd.concat([new, kept], ignore_index=True).sort_values("utc_dt", kind="mergesort").reset_index(drop=True)
+
+    def report(status, o, n):
+        o = o.reset_index(drop=True) if o is not None else None
+        n = n.reset_index(drop=True) if n is not None else None
+        base = n if n is not None else o
+        r = pd.DataFrame({"status": status, "asteroid": base["asteroid"], "star_no": base["star_no"]})
+        for col in ("utc_dt", "probability", "durn", "source"):
+            r[f"{col}_old"] = o[col] if o is not None else None
+            r[f"{col}_new"] = n[col] if n is not None else None
+        return r
+
+    parts = [
+        report("updated", matched_old[changed], matched_new[changed]),
+        report("unchanged", matched_old[~changed], matched_new[~changed]),
+        report("added", None, unmatched_new),
+        report("removed", removed, None),
+        report("kept", kept, None),
+    ]
+    changes = pd.concat([p for p in parts if len(p)], ignore_index=True)
+    if changes.empty:
+        changes = pd.DataFrame(columns=CHANGE_COLS)
+    changes["update"] = new["source"].iloc[0] if len(new) and "source" in new.columns else ""
+    changes["shift_s"] = (pd.to_datetime(changes["utc_dt_new"]) - pd.to_datetime(changes["utc_dt_old"])).dt.total_seconds()
+    return merged, changes[CHANGE_COLS]
+
+
+def merge_event_updates(frames, tolerance_s: float = 600.0):
+    # frames are ordered oldest -> newest; the newest prediction of each event wins.
+    frames = list(frames)
+    if not frames:
+        raise ValueError("No event frames to merge")
+    merged = frames[0].copy()
+    if "source" not in merged.columns:
+        merged["source"] = "0"
+    reports = []
+    for i, new in enumerate(frames[1:], 1):
+        new = new.copy()
+        if "source" not in new.columns:
+            new["source"] = str(i)
+        merged, changes = merge_two(merged, new, tolerance_s)
+        reports.append(changes)
+    changes = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame(columns=CHANGE_COLS)
+    return merged, changes
+
+
+def load_and_merge(paths, tolerance_s: float = 600.0):
+    frames = []
+    for p in paths:
+        df = script_generation_func.events_to_dataframe(str(p))
+        df["source"] = Path(p).name
+        frames.append(df)
+    merged, changes = merge_event_updates(frames, tolerance_s)
+    # concat turns categoricals with different categories back into strings
+    return script_generation_func.compact_events(merged), changes
+
+
+def summarize_changes(changes: pd.DataFrame) -> str:
+    counts = changes["status"].value_counts()
+    parts = [f"{status}: {int(counts.get(status, 0))}" for status in ("updated", "unchanged", "added", "removed", "kept")]
+    return ", ".join(parts)
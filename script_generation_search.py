@@ -0,0 +1,117 @@
+import re
+from script_generation_lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+KEY_BYTES = 8                      # suffixes are sorted on their first 8 bytes; longer queries are verified
+
+
+def normalize(text: str) -> str:
+    # case and runs of whitespace do not matter; a trailing space is kept so "16 " only matches 16 itself
+    return re.sub(r"\s+", " ", str(text).lower().lstrip())
+
+
+class SearchIndex:
+    # Prefix and substring search over the asteroid and star names of a frame. The distinct
+    # names are joined into one byte buffer and every suffix of every name is kept in a
+    # sorted array of its first KEY_BYTES bytes (big endian), so a query is two searchsorted
+    # calls plus a byte comparison for the part of the query beyond KEY_BYTES.
+    def __init__(self, asteroids, stars):
+        ast_codes, ast_names = pd.factorize(np.asarray(asteroids, dtype=object))
+        star_codes, star_names = pd.factorize(np.asarray(stars, dtype=object))
+        n_names = len(ast_names) + len(star_names)
+        self.n_rows = len(ast_codes)
+        # name code per row; a missing name points at the slot after the names, which never matches
+        self.ast_code = np.where(ast_codes >= 0, ast_codes, n_names)
+        self.star_code = np.where(star_codes >= 0, star_codes + len(ast_names), n_names)
+        # rows of each name (CSR): rows_of[row_start[k]:row_start[k + 1]]
+        codes = np.concatenate((self.ast_code, self.star_code))
+        order = np.argsort(codes, kind="stable")
+        self.rows_of = order % max(self.n_rows, 1)
+        self.row_start = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=n_names + 1))))[:n_names + 1]
+
+        # names separated (and the buffer padded) by NUL, which a query never contains;
+        # normalized as normalize() does, without the spaces at either end
+        text = "\0".join(str(x).replace("\0", "") for x in (*ast_names, *star_names)).lower()
+        text = re.sub(r" ?\0 ?", "\0", re.sub(r"\s+", " ", text)).strip(" ")
+        data = text.encode("utf-8") + b"\0" * KEY_BYTES
+        self.buf = np.frombuffer(data, dtype=np.uint8)
+        n = len(data) - KEY_BYTES
+        is_char = self.buf[:n] != 0
+        self.starts = np.concatenate(([0], np.flatnonzero(~is_char) + 1))[:n_names]
+        name = np.cumsum(~is_char, dtype=np.int32)       # name of each byte
+        windows = np.ndarray(shape=(n,), dtype=">u8", buffer=data, strides=(1,))
+        pos = np.flatnonzero(is_char)
+        keys = windows[pos].astype(np.uint64)
+        order = np.argsort(keys)
+        self.keys = keys[order]
+        self.pos = pos[order].astype(np.int32)
+        self.name = name[self.pos]
+        self._last = None          # (query bytes, anchored, suffix positions, their names) of the previous lookup
+
+    def _suffixes(self, q: bytes, anchored: bool):
+        # names of the suffixes starting with q; while typing, a query extending the
+        # previous one only re-checks the previous matches when they are fewer
+        head = q[:KEY_BYTES]
+        lo = np.searchsorted(self.keys, np.uint64(int.from_bytes(head.ljust(KEY_BYTES, b"\0"), "big")), "left")
+        hi = np.searchsorted(self.keys, np.uint64(int.from_bytes(head.ljust(KEY_BYTES, b"\xff"), "big")), "right")
+        last = self._last
+        if last is not None and last[1] == anchored and q.startswith(last[0]) and len(last[2]) < hi - lo:
+            pos, name = last[2], last[3]
+            tail, at = q[len(last[0]):], len(last[0])
+        else:
+            pos, name = self.pos[lo:hi], self.name[lo:hi]
+            if anchored:
+                first = self.starts[name] == pos
+                pos, name = pos[first], name[first]
+            tail, at = q[KEY_BYTES:], KEY_BYTES
+        if tail and len(pos):
+            want = np.frombuffer(tail, dtype=np.uint8)
+            idx = np.minimum(pos[:, None] + (at + np.arange(len(want))), len(self.buf) - 1)
+            same = (self.buf[idx] == want).all(axis=1)
+            pos, name = pos[same], name[same]
+        self._last = (q, anchored, pos, name)
+        return name
+
+    def names(self, query: str):
+        # codes of the names containing query, one per matching suffix; None for an empty
+        # query. A leading ^ anchors the query at the start of the name.
+        q = normalize(query)
+        anchored = q.startswith("^")
+        q = q[1:].lstrip() if anchored else q
+        if not q:
+            return None
+        return self._suffixes(q.replace("\0", "").encode("utf-8"), anchored)
+
+    def mask(self, query: str):
+        # bool per row whose asteroid or star contains query; None for an empty query
+        names = self.names(query)
+        if names is None:
+            return None
+        first = self.row_start[names]
+        count = self.row_start[names + 1] - first
+        total = int(count.sum())
+        if total > self.n_rows:
+            # broad query: one pass over the rows is cheaper than gathering every name's rows
+            hit = np.zeros(len(self.row_start), dtype=bool)
+            hit[names] = True
+            return hit[self.ast_code] | hit[self.star_code]
+        # every name's run of rows_of, concatenated
+        skip = np.cumsum(count) - count
+        out = np.zeros(self.n_rows, dtype=bool)
+        out[self.rows_of[np.repeat(first - skip, count) + np.arange(total)]] = True
+        return out
+
+def select_mask(asteroids, stars, select=None, exclude=None):
+    # Rows matching any select pattern (all rows when there is none) and no exclude pattern.
+    index = SearchIndex(asteroids, stars)
+    keep = np.ones(index.n_rows, dtype=bool)
+    masks = [m for m in map(index.mask, select or []) if m is not None]
+    if masks:
+        keep = np.logical_or.reduce(masks)
+    for pattern in exclude or []:
+        m = index.mask(pattern)
+        if m is not None:
+            keep &= ~m
+    return keep
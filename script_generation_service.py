@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import ipaddress
+import json
+import socket
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from script_generation_lazy import lazy_import
+
+np = lazy_import("numpy")
+script_generation_func = lazy_import("script_generation_func")
+script_generation_merge = lazy_import("script_generation_merge")
+script_generation_sky = lazy_import("script_generation_sky")
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+READ_LIMIT = 64 * 1024 * 1024
+MAX_NIGHTS = 8                     # parsed nights kept, least recently used dropped first
+
+
+def parse_address(address: str):
+    host, _, port = address.rpartition(":")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+def is_loopback(host: str) -> bool:
+    # every address the host resolves to must be on this machine
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return bool(infos) and all(ipaddress.ip_address(i[4][0].split("%")[0]).is_loopback for i in infos)
+
+
+def call(op: str, address: str = DEFAULT_ADDRESS, timeout: float = 120.0, **params) -> dict:
+    # One request per connection: a JSON object on one line each way. Raises OSError
+    # when no service is listening and ValueError when the service reports an error.
+    with socket.create_connection(parse_address(address), timeout=timeout) as sock:
+        sock.sendall(json.dumps({"op": op, **params}).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f"No reply from planning service at {address}")
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        raise ValueError(reply.get("error", "planning service error"))
+    return reply
+
+
+def night_params(events_path: str, merge_paths=None, site_path=None, day=None) -> dict:
+    # Paths are resolved here because the service does not share the client's cwd.
+    return {
+        "path": str(Path(events_path).resolve()),
+        "merge": [str(Path(p).resolve()) for p in merge_paths or []],
+        "site": str(Path(site_path).resolve()) if site_path else None,
+        "day": day,
+    }
+
+
+@dataclass
+class Night:
+    stamp: tuple
+    df: object                     # night window (and horizon) filtered, time sorted; row i has uid i
+    events: list                   # Event per df row
+    message: str
+    masks: dict = field(default_factory=dict)       # telescope -> bool array
+    overrides: dict = field(default_factory=dict)   # telescope -> {uid: accepted}
+    revision: int = 0
+    schedules: dict = field(default_factory=dict)   # (telescope, revision, removed) -> (events, slew_s)
+
+
+def _stamp(paths) -> tuple:
+    out = []
+    for p in paths:
+        st = Path(p).stat()
+        out.append((p, st.st_mtime, st.st_size))
+    return tuple(out)
+
+
+class Planner:
+    # Parsed nights shared by every client; a night is reparsed only when one of its
+    # files changes on disk or it was dropped to keep MAX_NIGHTS, which also drops its
+    # overrides.
+    def __init__(self, max_nights: int = MAX_NIGHTS):
+        self.nights = OrderedDict()
+        self.max_nights = max_nights
+
+    def night(self, path: str, merge=(), site: str | None = None, day: int | None = None) -> Night:
+        merge = tuple(merge or ())
+        if day is None:
+            day = script_generation_func.infer_day_from_filename(path)
+            if day is None:
+                raise ValueError(f"Cannot infer the day from {Path(path).name}; expected YYYYMMDD_events.txt")
+        key = (path, merge, site, day)
+        stamp = _stamp([*merge, path] + ([site] if site else []))
+        n = self.nights.get(key)
+        if n is None or n.stamp != stamp:
+            n = self._load(path, list(merge), site, day, stamp)
+            self.nights[key] = n
+        self.nights.move_to_end(key)
+        while len(self.nights) > self.max_nights:
+            self.nights.popitem(last=False)
+        return n
+
+    def _load(self, path, merge, site, day, stamp) -> Night:
+        f = script_generation_func
+        if merge:
+            df, changes = script_generation_merge.load_and_merge(merge + [path])
+            message = (f"Merged {len(merge) + 1} prediction files into {len(df)} events "
+                       f"({script_generation_merge.summarize_changes(changes)})")
+        else:
+            df, diagnostics = f.load_events(path)
+            s = f.diagnostics_summary(df, diagnostics)
+            message = (f"Parsed {s['events']} events from {s['lines']} lines "
+                       f"({s['skipped']} skipped, {s['blank']} blank, {s['error']} errors)")
+        df = df[f.night_window_filter(df, day)]
+        if site:
+            loaded = script_generation_sky.load_site(site)
+            df = script_generation_sky.apply_visibility(df, loaded)
+            message += f"; dropped {int((~df['visible']).sum())} below the {loaded.name} horizon"
+            df = df[df["visible"]]
+        df = df.sort_values("utc_dt", kind="mergesort").reset_index(drop=True)
+        return Night(stamp=stamp, df=df, events=f.events_from_frame(df), message=message)
+
+    def accepted(self, n: Night, telescope: str):
+        mask = n.masks.get(telescope)
+        if mask is None:
+            mask = script_generation_func.telescope_accept_mask(n.df, telescope).to_numpy(dtype=bool)
+            n.masks[telescope] = mask
+        overrides = n.overrides.get(telescope)
+        if not overrides:
+            return mask
+        accepted = mask.copy()
+        accepted[list(overrides)] = list(overrides.values())
+        return accepted
+
+    def schedule(self, n: Night, telescope: str, remove=()):
+        key = (telescope, n.revision, tuple(sorted(remove)))
+        if key not in n.schedules:
+            removed = set(remove)
+            events = [n.events[i] for i in np.flatnonzero(self.accepted(n, telescope))]
+            events = [ev for ev in events if ev.asteroid_id not in removed]
+            n.schedules[key] = (events, script_generation_sky.consecutive_slew_seconds(events, telescope))
+        return n.schedules[key]
+
+    def set_acceptance(self, n: Night, telescope: str, uids, accepted: bool) -> int:
+        self.accepted(n, telescope)
+        base = n.masks[telescope]
+        overrides = n.overrides.setdefault(telescope, {})
+        for uid in map(int, uids):
+            if not 0 <= uid < len(base):
+                raise ValueError(f"No event {uid} in this night")
+            if base[uid] == accepted:
+                overrides.pop(uid, None)
+            else:
+                overrides[uid] = accepted
+        n.revision += 1
+        n.schedules.clear()
+        return len(overrides)
+
+    def handle(self, req: dict) -> dict:
+        op = req.get("op")
+        if op == "ping":
+            return {"nights": len(self.nights)}
+        n = self.night(req["path"], req.get("merge"), req.get("site"), req.get("day"))
+        if op == "load":
+            return {"events": len(n.df), "message": n.message}
+
+        telescope = str(req["telescope"]).strip().lower()
+        overrides = {str(k): v for k, v in n.overrides.get(telescope, {}).items()}
+        if op == "overrides":
+            return {"overrides": overrides}
+        if op == "rows":
+            cols = script_generation_func.EVENT_COLS
+            out = n.df[cols].copy()
+            out["utc_dt"] = out["utc_dt"].dt.strftime("%Y-%m-%d %H:%M:%S")
+            rows = out.astype(object).where(out.notna(), None).to_numpy().tolist()
+            return {"message": n.message, "columns": cols, "rows": rows, "overrides": overrides}
+        if op == "accept":
+            return {"overrides": self.set_acceptance(n, telescope, req["uids"], bool(req["accepted"]))}
+        if op == "conflicts":
+            events, slew_s = self.schedule(n, telescope, req.get("remove") or ())
+            groups = script_generation_func.conflict_rows(events, slew_s)
+            return {"message": n.message, "events": len(events), "groups": groups}
+        if op == "generate":
+            header, footer = script_generation_func.read_header_footer(req["pre"], req["post"])
+            events, slew_s = self.schedule(n, telescope, req.get("remove") or ())
+            return {"events": len(events), "scs": script_generation_func.render_scs(events, header, footer, slew_s)}
+        raise ValueError(f"Unknown op: {op}")
+
+
+async def serve(host: str, port: int) -> None:
+    planner = Planner()
+    lock = asyncio.Lock()
+
+    async def client(reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    req = json.loads(line)
+                    # one request at a time on the shared frames, off the event loop
+                    async with lock:
+                        reply = {"ok": True, **await asyncio.to_thread(planner.handle, req)}
+                except Exception as e:
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(client, host, port, limit=READ_LIMIT)
+    print(f"Planning service listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Local planning service: keeps parsed nights, accept masks and schedules in memory.")
+    ap.add_argument("--address", default=DEFAULT_ADDRESS, help=f"host:port to listen on (default {DEFAULT_ADDRESS})")
+    args = ap.parse_args()
+    host, port = parse_address(args.address)
+    # requests name files (events, headers, site) that the service reads and sends back
+    if not is_loopback(host):
+        ap.error(f"--address must be a loopback address (127.0.0.1, ::1 or localhost), got {host!r}")
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from script_generation_lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+script_generation_merge = lazy_import("script_generation_merge")
+
+SESSION_VERSION = 1
+OVERRIDE_PREFIX = "override_"      # int8 column per telescope: -1 no move, 0 rejected, 1 accepted
+
+
+def session_sidecar_path(events_path) -> Path:
+    p = Path(events_path)
+    return p.with_name(p.stem + ".session.json")
+
+
+def frame_path(manifest_path) -> Path:
+    p = Path(manifest_path)
+    return p.with_name(p.name.removesuffix(".json") + ".feather")
+
+
+def file_stamps(paths) -> dict:
+    out = {}
+    for p in paths:
+        if p and Path(p).exists():
+            st = Path(p).stat()
+            out[str(p)] = [st.st_mtime, st.st_size]
+    return out
+
+
+def save_session(manifest_path, df_all, overrides: dict, state: dict) -> Path:
+    # df_all is the GUI frame (time sorted, row i has _uid i); overrides {telescope: {uid: accepted}}.
+    # state holds the paths and settings to restore: events_path, older_paths, site_path,
+    # catalog_path, availability_path, pre_path, post_path, out_path, telescope, day.
+    manifest_path = Path(manifest_path)
+    frame = df_all.drop(columns=["_close4"], errors="ignore").copy()
+    for tel, moves in overrides.items():
+        col = np.full(len(frame), -1, dtype=np.int8)
+        if moves:
+            col[list(moves)] = [int(v) for v in moves.values()]
+        frame[OVERRIDE_PREFIX + tel] = col
+    frame.to_feather(frame_path(manifest_path))
+
+    watched = [state.get("events_path"), *state.get("older_paths", []), state.get("site_path"),
+               state.get("catalog_path"), state.get("availability_path")]
+    manifest = {
+        "version": SESSION_VERSION,
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+        "frame": frame_path(manifest_path).name,
+        "rows": len(frame),
+        "stamps": file_stamps(watched),
+        **state,
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest_path
+
+
+def load_session(manifest_path):
+    # Returns (frame, overrides, manifest); the frame is read memory-mapped.
+    from pyarrow import feather     # optional: only sessions need pyarrow (as DataFrame.to_feather does)
+
+    manifest_path = Path(manifest_path)
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("version") != SESSION_VERSION:
+        raise ValueError(f"{manifest_path.name}: unsupported session version {manifest.get('version')}")
+    frame = feather.read_table(manifest_path.with_name(manifest["frame"]), memory_map=True).to_pandas()
+
+    overrides = {}
+    for col in [c for c in frame.columns if c.startswith(OVERRIDE_PREFIX)]:
+        values = frame[col].to_numpy()
+        uids = np.flatnonzero(values >= 0)
+        overrides[col[len(OVERRIDE_PREFIX):]] = dict(zip(uids.tolist(), (values[uids] == 1).tolist()))
+    frame = frame.drop(columns=[c for c in frame.columns if c.startswith(OVERRIDE_PREFIX)])
+    return frame, overrides, manifest
+
+
+def session_is_current(manifest: dict) -> bool:
+    # True when none of the input files changed since the snapshot was taken
+    watched = [manifest.get("events_path"), *manifest.get("older_paths", []), manifest.get("site_path"),
+               manifest.get("catalog_path"), manifest.get("availability_path")]
+    return file_stamps(watched) == manifest.get("stamps", {})
+
+
+def carry_overrides(old_frame, overrides: dict, new_frame, tolerance_s: float = 600.0):
+    # Moves made on old_frame re-applied to a reparsed night: events are matched on
+    # (asteroid, star_no) and the nearest UT within tolerance_s, like prediction merges.
+    # Returns (overrides keyed by new uid, number of moves whose event is gone).
+    pairs = script_generation_merge.match_events(old_frame.reset_index(drop=True),
+                                                 new_frame.reset_index(drop=True), tolerance_s)
+    uid_map = dict(zip(old_frame["_uid"].to_numpy()[pairs["_old"].to_numpy()].tolist(),
+                       new_frame["_uid"].to_numpy()[pairs["_new"].to_numpy()].tolist()))
+    carried, lost = {}, 0
+    for tel, moves in overrides.items():
+        carried[tel] = {uid_map[u]: acc for u, acc in moves.items() if u in uid_map}
+        lost += len(moves) - len(carried[tel])
+    return carried, lost
@@ -0,0 +1,200 @@
+from __future__ import annotations
+import json
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from script_generation_lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+J2000 = "2000-01-01T12:00:00"
+# Observing window relative to the event UT, matching extract_event: the script
+# starts at sttime (UT - 8 min) and the 60 s capture starts at lstime (UT - 30 s).
+WINDOW_START_S = -8 * 60
+WINDOW_END_S = 30
+CHUNK_ROWS = 200_000
+
+
+@dataclass
+class Site:
+    name: str
+    lat: float                     # degrees, north positive
+    lon: float                     # degrees, east positive
+    min_alt: float = 0.0           # flat limit applied everywhere
+    horizon_az: np.ndarray = field(default_factory=lambda: np.array([0.0, 360.0]))
+    horizon_alt: np.ndarray = field(default_factory=lambda: np.array([0.0, 0.0]))
+
+    def limit(self, az: np.ndarray) -> np.ndarray:
+        mask = np.interp(az, self.horizon_az, self.horizon_alt, period=360.0)
+        return np.maximum(mask, self.min_alt)
+
+
+def load_horizon(path):
+    # "az alt" pairs, one per line; '#' starts a comment
+    pts = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            az, alt = line.replace(",", " ").split()[:2]
+            pts.append((float(az) % 360.0, float(alt)))
+    if not pts:
+        raise ValueError(f"No horizon points in {path}")
+    pts.sort()
+    az, alt = np.array(pts).T
+    return az, alt
+
+
+def load_site(path) -> Site:
+    path = Path(path)
+    cfg = json.loads(path.read_text(encoding="utf-8"))
+    site = Site(name=cfg.get("name", path.stem), lat=float(cfg["lat"]), lon=float(cfg["lon"]),
+                min_alt=float(cfg.get("min_alt", 0.0)))
+    if cfg.get("horizon"):
+        hz = Path(cfg["horizon"])
+        if not hz.is_absolute():
+            hz = path.parent / hz
+        site.horizon_az, site.horizon_alt = load_horizon(hz)
+    return site
+
+
+def gmst_deg(seconds_since_j2000: np.ndarray) -> np.ndarray:
+    days = seconds_since_j2000 / 86400.0
+    return np.mod(280.46061837 + 360.98564736629 * days, 360.0)
+
+
+def altaz(ra_deg, dec_deg, seconds_since_j2000, lat: float, lon: float):
+    # Arrays broadcast against each other; returns (alt, az) in degrees, az from north through east.
+    lst = gmst_deg(seconds_since_j2000) + lon
+    ha = np.radians(lst - ra_deg)
+    dec = np.radians(dec_deg)
+    phi = np.radians(lat)
+    sin_alt = np.sin(phi) * np.sin(dec) + np.cos(phi) * np.cos(dec) * np.cos(ha)
+    alt = np.degrees(np.arcsin(np.clip(sin_alt, -1.0, 1.0)))
+    az = np.degrees(np.arctan2(-np.cos(dec) * np.sin(ha),
+                               np.sin(dec) * np.cos(phi) - np.cos(dec) * np.sin(phi) * np.cos(ha)))
+    return alt, np.mod(az, 360.0)
+
+
+def event_seconds(df: pd.DataFrame) -> np.ndarray:
+    t = pd.to_datetime(df["utc_dt"]).to_numpy().astype("datetime64[s]")
+    return (t - np.datetime64(J2000, "s")).astype(np.float64)
+
+
+def visibility(df: pd.DataFrame, site: Site, step_s: int = 60) -> pd.DataFrame:
+    # Altitude of every event over its whole sttime -> capture-end window, evaluated
+    # as one (events x samples) array per chunk.
+    offsets = np.arange(WINDOW_START_S, WINDOW_END_S, step_s, dtype=np.float64)
+    offsets = np.append(offsets, WINDOW_END_S)
+    ra_deg = df["ra_deg"].to_numpy(np.float64)
+    dec_deg = df["dec_deg"].to_numpy(np.float64)
+    t0 = event_seconds(df)
+
+    n = len(df)
+    min_alt = np.empty(n)
+    margin = np.empty(n)
+    alt_ut = np.empty(n)
+    az_ut = np.empty(n)
+    for a in range(0, n, CHUNK_ROWS):
+        b = min(a + CHUNK_ROWS, n)
+        t = t0[a:b, None] + offsets[None, :]
+        alt, az = altaz(ra_deg[a:b, None], dec_deg[a:b, None], t, site.lat, site.lon)
+        min_alt[a:b] = alt.min(axis=1)
+        margin[a:b] = (alt - site.limit(az)).min(axis=1)
+        alt_ut[a:b], az_ut[a:b] = altaz(ra_deg[a:b], dec_deg[a:b], t0[a:b], site.lat, site.lon)
+
+    return pd.DataFrame({
+        "vis_min_alt": min_alt,
+        "vis_margin": margin,
+        "visible": margin >= 0.0,
+        "alt_calc": alt_ut,
+        "az_calc": az_ut,
+    }, index=df.index)
+
+
+def apply_visibility(df: pd.DataFrame, site: Site, step_s: int = 60) -> pd.DataFrame:
+    # Adds the visibility columns and fills alt/az that Occult did not print.
+    vis = visibility(df, site, step_s)
+    out = df.copy()
+    for c in vis.columns:
+        out[c] = vis[c]
+    for col, calc in (("alt", "alt_calc"), ("az", "az_calc")):
+        missing = out[col].isna()
+        if missing.any():
+            out[col] = out[col].astype("Int16")
+            out.loc[missing, col] = np.rint(out.loc[missing, calc]).astype(int)
+    return out
+
+
+def visible_mask(df: pd.DataFrame, site: Site | None) -> pd.Series:
+    if site is None or df.empty:
+        return pd.Series(True, index=df.index)
+    return visibility(df, site)["visible"]
+
+
+@dataclass
+class SlewModel:
+    rate_deg_s: float              # sustained slew rate
+    settle_s: float                # acceleration, settling and plate-solve overhead per move
+
+    def seconds(self, sep_deg):
+        sep = np.asarray(sep_deg, dtype=np.float64)
+        return np.where(sep > 0, self.settle_s + sep / self.rate_deg_s, 0.0)
+
+
+TELESCOPE_SLEW = {                 #CHANGE AS TELESCOPES ARE ADDED
+    "c11": SlewModel(rate_deg_s=4.0, settle_s=10.0),
+    "c14": SlewModel(rate_deg_s=3.0, settle_s=15.0),
+    "hubble24": SlewModel(rate_deg_s=1.5, settle_s=30.0),
+}
+
+
+def slew_model(telescope_key: str) -> SlewModel:
+    tel = telescope_key.lower().strip()
+    if tel not in TELESCOPE_SLEW:
+        raise ValueError(f"Unknown telescope: {telescope_key}")
+    return TELESCOPE_SLEW[tel]
+
+
+def angular_separation(ra1, dec1, ra2, dec2):
+    # Great-circle distance in degrees (haversine, stable for small angles).
+    ra1, dec1, ra2, dec2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (ra1, dec1, ra2, dec2))
+    h = np.sin((dec2 - dec1) / 2) ** 2 + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0))))
+
+
+def windowed_separations(ra_deg, dec_deg, seconds, min_gap_s: float, max_gap_s: float):
+    # Sparse separation matrix of a time ordered night: the pairs (i, j) with
+    # min_gap_s < seconds[j] - seconds[i] <= max_gap_s are the run j = first[i] ... and
+    # their separation is sep[start[i] + j - first[i]]. All pairs in one vectorized pass,
+    # angular_separation with the radians and cosines taken once per event.
+    t = np.asarray(seconds, dtype=np.float64)
+    first = np.searchsorted(t, t + min_gap_s, side="right")
+    counts = np.maximum(np.searchsorted(t, t + max_gap_s, side="right") - first, 0)
+    start = np.cumsum(counts) - counts
+    i = np.repeat(np.arange(len(t)), counts)
+    j = np.arange(counts.sum()) - np.repeat(start - first, counts)
+    ra, dec = np.radians(np.asarray(ra_deg, dtype=np.float64)), np.radians(np.asarray(dec_deg, dtype=np.float64))
+    cos_dec = np.cos(dec)
+    h = np.sin((dec[j] - dec[i]) / 2) ** 2 + cos_dec[i] * cos_dec[j] * np.sin((ra[j] - ra[i]) / 2) ** 2
+    return first, start, np.degrees(2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0))))
+
+
+def separation_deg(ra1: float, dec1: float, ra2: float, dec2: float) -> float:
+    # Scalar angular_separation, for short event lists that should not pull in numpy.
+    ra1, dec1, ra2, dec2 = map(math.radians, (ra1, dec1, ra2, dec2))
+    h = math.sin((dec2 - dec1) / 2) ** 2 + math.cos(dec1) * math.cos(dec2) * math.sin((ra2 - ra1) / 2) ** 2
+    return math.degrees(2 * math.asin(math.sqrt(min(max(h, 0.0), 1.0))))
+
+
+def consecutive_slew_seconds(events, telescope_key: str) -> list[float]:
+    # Slew time into each event from the one before it (0 for the first).
+    model = slew_model(telescope_key)
+    out = [0.0] * len(events)
+    for k in range(1, len(events)):
+        a, b = events[k - 1], events[k]
+        sep = separation_deg(a.ra_deg, a.dec_deg, b.ra_deg, b.dec_deg)
+        out[k] = model.settle_s + sep / model.rate_deg_s if sep > 0 else 0.0
+    return out
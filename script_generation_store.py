@@ -0,0 +1,219 @@
+import argparse
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import script_generation_func
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    night TEXT,
+    mtime REAL,
+    size INTEGER,
+    ingested_at TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    line_no INTEGER,
+    utc_dt TEXT NOT NULL,
+    date TEXT,
+    ut TEXT,
+    durn REAL,
+    star_mag REAL,
+    mag_drop REAL,
+    star_no TEXT,
+    asteroid TEXT,
+    alt INTEGER,
+    az INTEGER,
+    probability REAL,
+    ra_deg REAL,
+    dec_deg REAL
+);
+CREATE INDEX IF NOT EXISTS ix_events_utc_dt ON events(utc_dt);
+CREATE INDEX IF NOT EXISTS ix_events_asteroid ON events(asteroid);
+CREATE INDEX IF NOT EXISTS ix_events_star_no ON events(star_no);
+CREATE INDEX IF NOT EXISTS ix_events_star_mag ON events(star_mag);
+CREATE INDEX IF NOT EXISTS ix_events_probability ON events(probability);
+CREATE INDEX IF NOT EXISTS ix_events_source ON events(source_id);
+CREATE INDEX IF NOT EXISTS ix_sources_night ON sources(night);
+"""
+STORE_COLS = ["line_no","utc_dt","date","ut","durn","star_mag","mag_drop","star_no",
+              "asteroid","alt","az","probability","ra_deg","dec_deg"]
+DT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _dt_text(x) -> str:
+    if isinstance(x, str):
+        return x
+    return pd.Timestamp(x).strftime(DT_FORMAT)
+
+
+def _night_key(night) -> str:
+    if isinstance(night, str):
+        return night.strip()[:8]
+    return night.strftime("%Y%m%d")
+
+
+class EventStore:
+    def __init__(self, path):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        cols = [r[1] for r in self.conn.execute("PRAGMA table_info(events)")]
+        if cols and "ra_deg" not in cols:
+            raise ValueError(f"{self.path} was created by an older version (text RA/Dec); delete it and ingest the files again")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _source_row(self, events_path):
+        return self.conn.execute(
+            "SELECT id, mtime, size FROM sources WHERE path = ?", (str(Path(events_path).resolve()),)
+        ).fetchone()
+
+    def is_current(self, events_path) -> bool:
+        row = self._source_row(events_path)
+        if row is None:
+            return False
+        st = Path(events_path).stat()
+        return row[1] == st.st_mtime and row[2] == st.st_size
+
+    def ingest(self, events_path, df: pd.DataFrame | None = None) -> int:
+        # Re-ingesting a file replaces the rows it contributed last time.
+        p = Path(events_path).resolve()
+        if df is None:
+            df, _ = script_generation_func.load_events(str(p))
+        st = p.stat()
+        m = re.search(r"(\d{8})", p.name)
+        night = m.group(1) if m else None
+
+        with self.conn:
+            self.conn.execute("DELETE FROM sources WHERE path = ?", (str(p),))
+            cur = self.conn.execute(
+                "INSERT INTO sources (path, night, mtime, size, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (str(p), night, st.st_mtime, st.st_size, datetime.now().isoformat(timespec="seconds")),
+            )
+            source_id = cur.lastrowid
+            out = df.reindex(columns=STORE_COLS).copy()
+            out["utc_dt"] = pd.to_datetime(out["utc_dt"]).dt.strftime(DT_FORMAT)
+            for col in out.columns[out.dtypes == "float32"]:
+                # store 13.1, not float32's 13.100000381
+                out[col] = out[col].astype("float64").round(6)
+            out = out.astype(object).where(out.notna(), None)
+            self.conn.executemany(
+                f"INSERT INTO events (source_id, {', '.join(STORE_COLS)}) "
+                f"VALUES ({', '.join(['?'] * (len(STORE_COLS) + 1))})",
+                ((source_id, *r) for r in out.itertuples(index=False, name=None)),
+            )
+        return len(df)
+
+    def sources(self) -> pd.DataFrame:
+        return pd.read_sql_query(
+            "SELECT s.id, s.path, s.night, s.ingested_at, COUNT(e.source_id) AS events "
+            "FROM sources s LEFT JOIN events e ON e.source_id = s.id GROUP BY s.id ORDER BY s.night",
+            self.conn,
+        )
+
+    def _frame(self, sql: str, params) -> pd.DataFrame:
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        df["utc_dt"] = pd.to_datetime(df["utc_dt"], format=DT_FORMAT)
+        df["alt"] = df["alt"].astype("Int16")
+        df["az"] = df["az"].astype("Int16")
+        return df
+
+    def query(self, start=None, end=None, telescope: str | None = None, min_prob: float | None = None,
+              max_mag: float | None = None, asteroid: str | None = None, star_no: str | None = None,
+              night=None) -> pd.DataFrame:
+        where, params = [], []
+        if start is not None:
+            where.append("e.utc_dt >= ?"); params.append(_dt_text(start))
+        if end is not None:
+            where.append("e.utc_dt < ?"); params.append(_dt_text(end))
+        if min_prob is not None:
+            where.append("e.probability >= ?"); params.append(float(min_prob))
+        if max_mag is not None:
+            where.append("e.star_mag <= ?"); params.append(float(max_mag))
+        if asteroid is not None:
+            where.append("e.asteroid = ?"); params.append(asteroid)
+        if star_no is not None:
+            where.append("e.star_no = ?"); params.append(star_no)
+        if night is not None:
+            where.append("e.source_id IN (SELECT id FROM sources WHERE night = ?)"); params.append(_night_key(night))
+
+        sql = (f"SELECT {', '.join('e.' + c for c in STORE_COLS)}, s.night AS source_night "
+               "FROM events e JOIN sources s ON s.id = e.source_id")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY e.utc_dt"
+        df = self._frame(sql, params)
+        if telescope is not None and not df.empty:
+            df = df[script_generation_func.telescope_accept_mask(df, telescope)].reset_index(drop=True)
+        return df
+
+    def load_night(self, night) -> pd.DataFrame:
+        # Same rows (and columns) events_to_dataframe gives for YYYYMMDD_events.txt.
+        df = self.query(night=night)
+        return script_generation_func.compact_events(df[script_generation_func.EVENT_COLS])
+
+
+def load_night_from_store(store_path, events_path: str) -> pd.DataFrame:
+    # Store-backed replacement for events_to_dataframe: (re)ingests the file when it
+    # is newer than what the store holds, then reads the night back out.
+    night = Path(events_path).name[:8]
+    with EventStore(store_path) as store:
+        if Path(events_path).exists() and not store.is_current(events_path):
+            store.ingest(events_path)
+        return store.load_night(night)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Multi-night event store (SQLite).")
+    ap.add_argument("store", help="Store file, e.g. events.sqlite")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ing = sub.add_parser("ingest", help="Parse and add YYYYMMDD_events.txt files")
+    ing.add_argument("events_txt", nargs="+")
+
+    sub.add_parser("sources", help="List ingested files")
+
+    q = sub.add_parser("query", help="Query events across nights")
+    q.add_argument("--start", default=None, help="UTC start, e.g. 2024-10-17 or '2024-10-17 03:00'")
+    q.add_argument("--end", default=None, help="UTC end (exclusive)")
+    q.add_argument("--telescope", choices=["c11", "c14", "hubble24"], default=None)
+    q.add_argument("--min-prob", type=float, default=None)
+    q.add_argument("--max-mag", type=float, default=None)
+    q.add_argument("--asteroid", default=None)
+    q.add_argument("--star", default=None)
+    q.add_argument("--csv", default=None, help="Write the result to a CSV file instead of printing it")
+    args = ap.parse_args()
+
+    with EventStore(args.store) as store:
+        if args.cmd == "ingest":
+            for p in args.events_txt:
+                print(f"{p}: {store.ingest(p)} events")
+        elif args.cmd == "sources":
+            print(store.sources().to_string(index=False))
+        else:
+            start = pd.Timestamp(args.start) if args.start else None
+            end = pd.Timestamp(args.end) if args.end else None
+            df = store.query(start=start, end=end, telescope=args.telescope, min_prob=args.min_prob,
+                             max_mag=args.max_mag, asteroid=args.asteroid, star_no=args.star)
+            if args.csv:
+                df.to_csv(args.csv, index=False)
+                print(f"{len(df)} events written to {args.csv}")
+            else:
+                print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
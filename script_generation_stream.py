@@ -0,0 +1,102 @@
+import heapq
+from datetime import timedelta
+from pathlib import Path
+import script_generation_func
+from script_generation_lazy import lazy_import
+
+script_generation_sky = lazy_import("script_generation_sky")
+script_generation_search = lazy_import("script_generation_search")
+script_generation_catalog = lazy_import("script_generation_catalog")
+script_generation_availability = lazy_import("script_generation_availability")
+
+BATCH_SIZE = 10_000
+LOOKAHEAD_S = 3600.0               # how far out of time order an event may arrive
+
+
+def iter_accepted(batches, telescope: str, day: int | None = None, site=None, select=None, exclude=None,
+                  catalog=None, availability=None, min_usable=None):
+    # filter stage: night window (when day is given), --select/--exclude patterns, site
+    # horizon, availability and the telescope's rules per batch, then the catalog magnitudes
+    f = script_generation_func
+    for df in batches:
+        if day is not None:
+            df = df[f.night_window_filter(df, day)]
+        if (select or exclude) and len(df):
+            df = df[script_generation_search.select_mask(df["asteroid"].to_numpy(), df["star_no"].to_numpy(),
+                                                         select, exclude)]
+        if site is not None and len(df):
+            df = script_generation_sky.apply_visibility(df, site)
+        if availability is not None and len(df):
+            df = script_generation_availability.apply_availability(df, availability, min_usable)
+        if len(df):
+            df = df[f.telescope_accept_mask(df, telescope)]
+        if catalog is not None and len(df):
+            df = script_generation_catalog.enrich_events(df, catalog)
+        if len(df):
+            yield df
+
+
+def iter_events(frames):
+    # extract stage
+    for df in frames:
+        yield from script_generation_func.events_from_frame(df)
+
+
+def iter_time_ordered(events, lookahead_s: float = LOOKAHEAD_S):
+    # Re-sorts a nearly time-ordered stream while holding at most lookahead_s of events:
+    # one is released once an event lookahead_s later has been seen. Ties keep their
+    # input order, as list.sort does. Raises ValueError for an event that arrives after
+    # later ones were already released.
+    window = timedelta(seconds=lookahead_s)
+    heap = []
+    released = None
+    for n, ev in enumerate(events):
+        if released is not None and ev.date_object < released:
+            raise ValueError(f"{ev.target} at {ev.date_object} is more than {lookahead_s:g} s out of time order; "
+                             f"increase the look-ahead")
+        heapq.heappush(heap, (ev.date_object, n, ev))
+        while heap[0][0] + window < ev.date_object:
+            released, _, out = heapq.heappop(heap)
+            yield out
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def iter_scheduled(events, telescope: str | None = None):
+    # schedule stage: (event, slew seconds from the previous event), as consecutive_slew_seconds
+    prev = None
+    for ev in events:
+        if not telescope:
+            yield ev, None
+        elif prev is None:
+            yield ev, 0.0
+        else:
+            yield ev, script_generation_sky.consecutive_slew_seconds([prev, ev], telescope)[1]
+        prev = ev
+
+
+def write_scs_stream(scheduled, output_path: str, header: str, footer: str) -> int:
+    # emit stage: blocks are written as they are produced. Returns the number of events.
+    n = 0
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        f.write(header)
+        for n, block in enumerate(script_generation_func.iter_scs_blocks(scheduled), 1):
+            f.write(block)
+        f.write(footer)
+    return n
+
+
+def stream_scs(events_path: str, output_path: str, pre_path: str, post_path: str, telescope: str,
+               day: int | None = None, site=None, batch_size: int = BATCH_SIZE,
+               lookahead_s: float = LOOKAHEAD_S, strict: bool = False, counts=None,
+               select=None, exclude=None, catalog=None, availability=None, min_usable=None) -> int:
+    # The whole pipeline over bounded batches: memory depends on batch_size and the
+    # look-ahead, not on the size of the events file.
+    f = script_generation_func
+    header, footer = f.read_header_footer(pre_path, post_path)
+    telescope = telescope.strip().lower()
+    batches = f.iter_event_batches(events_path, batch_size, strict, counts)
+    accepted = iter_accepted(batches, telescope, day, site, select, exclude, catalog, availability, min_usable)
+    events = iter_time_ordered(iter_events(accepted), lookahead_s)
+    return write_scs_stream(iter_scheduled(events, telescope), output_path, header, footer)
@@ -0,0 +1,230 @@
+import argparse
+import html
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from script_generation_lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+script_generation_func = lazy_import("script_generation_func")
+script_generation_sky = lazy_import("script_generation_sky")
+script_generation_store = lazy_import("script_generation_store")
+script_generation_allocate = lazy_import("script_generation_allocate")
+
+# Rules of the telescope_accept_mask form: reject an event at or fainter than the
+# magnitude cut and shorter than the duration cut.
+DEFAULT_MAGS = "13:17:0.1"
+DEFAULT_DURS = "0:2:0.05"
+METRICS = ["accepted", "expected", "conflicts"]
+PAIR_CHUNK = 4_000_000             # candidate pairs held at once
+SOURCE_DECIMALS = 2                # Occult prints magnitudes and durations to 0.1 or 0.01
+
+
+@dataclass
+class Sweep:
+    mags: "np.ndarray"             # magnitude cuts (rows)
+    durs: "np.ndarray"             # duration cuts, seconds (columns)
+    events: int
+    accepted: "np.ndarray"         # events kept, per (mag, dur) cut
+    expected: "np.ndarray"         # summed probability (percent / 100) of the kept events
+    conflicts: "np.ndarray"        # kept pairs closer than the conflict window plus the slew
+
+    def table(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "mag_cut": np.repeat(self.mags, len(self.durs)),
+            "dur_cut": np.tile(self.durs, len(self.mags)),
+            "accepted": self.accepted.ravel(),
+            "expected": self.expected.ravel().round(3),
+            "conflicts": self.conflicts.ravel(),
+        })
+
+
+def parse_cuts(text: str):
+    # "13:17:0.1" -> 13.0, 13.1, ... 17.0 (end included); "15,15.5,16" -> those values
+    try:
+        if ":" in text:
+            start, stop, step = map(float, text.split(":"))
+            if step <= 0:
+                raise ValueError
+            values = start + step * np.arange(int(np.floor((stop - start) / step + 1e-9)) + 1)
+        else:
+            values = np.array([float(v) for v in text.split(",") if v.strip()])
+    except ValueError:
+        raise ValueError(f"Expected start:stop:step or comma separated values, got {text!r}")
+    if not len(values):
+        raise ValueError(f"No cut-offs in {text!r}")
+    return np.unique(values.round(6))
+
+
+def source_values(values):
+    # back to the printed decimal, also from a float32 column (13.699999809 -> 13.7), so
+    # an event at 13.7 counts as reaching the 13.7 cut
+    return np.round(np.asarray(values, dtype=float), SOURCE_DECIMALS)
+
+
+def durations(df: pd.DataFrame):
+    # as telescope_accept_mask reads durn
+    if df["durn"].dtype == object:
+        dur = pd.to_numeric(df["durn"].astype(str).str.rstrip("s"), errors="coerce").to_numpy(dtype=float)
+    else:
+        dur = df["durn"].to_numpy(dtype=float, na_value=np.nan)
+    return source_values(dur)
+
+
+def iter_conflict_pairs(df: pd.DataFrame, telescope: str | None = None, chunk: int = PAIR_CHUNK):
+    # (i, j) positions of the events closer than the conflict window, plus the slew between
+    # them when a telescope is given (as get_flagged_events), about chunk candidates at a
+    # time. df must be in time order.
+    sky = script_generation_sky
+    window = script_generation_allocate.CONFLICT_WINDOW_S
+    model = sky.slew_model(telescope) if telescope else None
+    t = sky.event_seconds(df)
+    ra, dec = df["ra_deg"].to_numpy(np.float64), df["dec_deg"].to_numpy(np.float64)
+    reach = window + (float(model.seconds(180.0)) if model else 0.0)
+    counts = np.maximum(np.searchsorted(t, t + reach, "right") - np.arange(len(t)) - 1, 0)
+    ends = np.cumsum(counts)
+    cuts = np.searchsorted(ends, np.arange(chunk, int(ends[-1]) if len(ends) else 0, chunk))
+    bounds = np.unique(np.concatenate(([0], cuts, [len(t)])))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        n = counts[lo:hi]
+        i = np.repeat(np.arange(lo, hi), n)
+        j = np.arange(len(i)) - np.repeat(np.cumsum(n) - n, n) + i + 1
+        limit = window
+        if model:
+            limit = window + model.seconds(sky.angular_separation(ra[i], dec[i], ra[j], dec[j]))
+        close = t[j] - t[i] <= limit
+        yield i[close], j[close]
+
+
+def _rejected(rm, rd, n_mags: int, n_durs: int, weights=None):
+    # An event whose magnitude reaches the first rm cuts and whose duration is under the
+    # cuts from rd on is rejected in the cells [:rm, rd:]. Counting the events per corner
+    # (rm, rd) and summing the corners over each cell's quadrant gives every cell at once.
+    corners = np.bincount(rm * (n_durs + 1) + rd, weights, minlength=(n_mags + 1) * (n_durs + 1))
+    corners = corners.reshape(n_mags + 1, n_durs + 1)
+    return corners[::-1].cumsum(axis=0)[::-1].cumsum(axis=1)[1:, :n_durs]
+
+
+def sweep(df: pd.DataFrame, mags, durs, telescope: str | None = None) -> Sweep:
+    # Every (magnitude, duration) cut in one pass over the events and one over the
+    # conflicting pairs, whatever the size of the grid.
+    df = df.sort_values("utc_dt", kind="mergesort").reset_index(drop=True)
+    mags, durs = np.asarray(mags, dtype=float), np.asarray(durs, dtype=float)
+    n_mags, n_durs = len(mags), len(durs)
+    mag = source_values(df["star_mag"].to_numpy(dtype=float, na_value=np.nan))
+    dur = durations(df)
+    prob = np.nan_to_num(pd.to_numeric(df["probability"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)) / 100
+    # cuts the event is at or fainter than, and the first cut it is shorter than;
+    # a missing magnitude or duration never rejects (comparisons with NaN are false)
+    rm = np.where(np.isnan(mag), 0, np.searchsorted(mags, mag, "right"))
+    rd = np.where(np.isnan(dur), n_durs, np.searchsorted(durs, dur, "right"))
+
+    accepted = len(df) - _rejected(rm, rd, n_mags, n_durs).astype(np.int64)
+    expected = prob.sum() - _rejected(rm, rd, n_mags, n_durs, prob)
+    # a pair is kept unless either event is rejected: all - i rejected - j rejected + both
+    conflicts = np.zeros((n_mags, n_durs), dtype=np.int64)
+    for i, j in iter_conflict_pairs(df, telescope):
+        conflicts += (len(i) - _rejected(rm[i], rd[i], n_mags, n_durs) - _rejected(rm[j], rd[j], n_mags, n_durs)
+                      + _rejected(np.minimum(rm[i], rm[j]), np.maximum(rd[i], rd[j]), n_mags, n_durs)).astype(np.int64)
+    return Sweep(mags, durs, len(df), accepted, expected, conflicts)
+
+
+def rule_summary(df: pd.DataFrame, telescope: str) -> dict:
+    # the same measures for the telescope's current telescope_accept_mask
+    df = df.sort_values("utc_dt", kind="mergesort").reset_index(drop=True)
+    keep = script_generation_func.telescope_accept_mask(df, telescope).to_numpy(dtype=bool)
+    prob = np.nan_to_num(pd.to_numeric(df["probability"], errors="coerce").to_numpy(dtype=float, na_value=np.nan))
+    return {"accepted": int(keep.sum()), "expected": float(prob[keep].sum() / 100),
+            "conflicts": sum(int((keep[i] & keep[j]).sum()) for i, j in iter_conflict_pairs(df, telescope))}
+
+
+def load_season(paths=(), store_path=None, start=None, end=None) -> pd.DataFrame:
+    # Event files (each cut to its night, when the file name gives the day) and/or the
+    # store's events between start and end. An event listed twice is counted once.
+    f = script_generation_func
+    frames = []
+    for path in paths:
+        df, _ = f.load_events(path)
+        day = f.infer_day_from_filename(path)
+        frames.append(df[f.night_window_filter(df, day)] if day is not None else df)
+    if store_path:
+        with script_generation_store.EventStore(store_path) as store:
+            frames.append(store.query(start, end))
+    if not frames:
+        raise ValueError("No events: give event files or --store")
+    df = pd.concat(frames, ignore_index=True)
+    df["utc_dt"] = pd.to_datetime(df["utc_dt"])
+    return df.drop_duplicates(["asteroid", "star_no", "utc_dt"]).reset_index(drop=True)
+
+
+def write_heatmap(result: Sweep, path, metric: str = "expected", title: str = "") -> Path:
+    # Self-contained HTML grid: magnitude cuts down, duration cuts across, shaded by metric
+    path = Path(path)
+    values = getattr(result, metric).astype(float)
+    lo, hi = float(values.min()), float(values.max())
+    shade = (values - lo) / (hi - lo) if hi > lo else np.zeros_like(values)
+    fmt = ".2f" if metric == "expected" else ".0f"
+    rows = ["<tr><th>mag \\ dur</th>" + "".join(f"<th>{d:g}</th>" for d in result.durs) + "</tr>"]
+    for r, m in enumerate(result.mags):
+        cells = []
+        for c, d in enumerate(result.durs):
+            tip = (f"mag &ge; {m:g} and dur &lt; {d:g} s rejected: {result.accepted[r, c]} accepted, "
+                   f"{result.expected[r, c]:.2f} expected, {result.conflicts[r, c]} conflicts")
+            light = 96 - 56 * shade[r, c]
+            cells.append(f'<td title="{tip}" style="background:hsl(140,45%,{light:.0f}%)">{values[r, c]:{fmt}}</td>')
+        rows.append(f"<tr><th>{m:g}</th>" + "".join(cells) + "</tr>")
+    path.write_text(
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Threshold sweep</title><style>"
+        "body{font-family:sans-serif}table{border-collapse:collapse;font-size:11px}"
+        "td,th{border:1px solid #ddd;padding:2px 4px;text-align:right}</style></head><body>\n"
+        f"<h3>{html.escape(title)}</h3><p>{metric}: {lo:{fmt}} to {hi:{fmt}}; events at or fainter than the row "
+        f"magnitude and shorter than the column duration are rejected</p>\n<table>\n"
+        + "\n".join(rows) + "\n</table></body></html>\n", encoding="utf-8")
+    return path
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Acceptance, expected yield and conflicts over a grid of "
+                                             "magnitude x duration rejection cut-offs.")
+    ap.add_argument("events", nargs="*", help="YYYYMMDD_events.txt files")
+    ap.add_argument("--store", default=None, help="Event store to read the events from (with --start/--end)")
+    ap.add_argument("--start", default=None, help="First UTC date from the store, e.g. 2024-09-01")
+    ap.add_argument("--end", default=None, help="UTC date after the last one from the store")
+    ap.add_argument("--site", default=None, help="Site config; events below the horizon are left out")
+    ap.add_argument("--mags", default=DEFAULT_MAGS, help=f"Magnitude cuts, start:stop:step or a list (default {DEFAULT_MAGS})")
+    ap.add_argument("--durs", default=DEFAULT_DURS, help=f"Duration cuts in seconds (default {DEFAULT_DURS})")
+    ap.add_argument("--telescope", default=None, help="Slew model for the conflicts; its current rule is printed for comparison")
+    ap.add_argument("--out", "-o", default="sweep.csv", help="Output: .csv table or .html heatmap")
+    ap.add_argument("--metric", choices=METRICS, default="expected", help="Heatmap shading (default expected)")
+    args = ap.parse_args()
+
+    try:
+        mags, durs = parse_cuts(args.mags), parse_cuts(args.durs)
+        df = load_season(args.events, args.store, args.start, args.end)
+        if args.telescope:
+            script_generation_sky.slew_model(args.telescope)
+    except ValueError as e:
+        ap.error(str(e))
+    if args.site:
+        df = script_generation_sky.apply_visibility(df, script_generation_sky.load_site(args.site))
+        df = df[df["visible"]]
+
+    t0 = time.perf_counter()
+    result = sweep(df, mags, durs, args.telescope)
+    elapsed = time.perf_counter() - t0
+    print(f"{result.events} events, {len(mags)} x {len(durs)} cut-offs in {elapsed:.2f} s")
+    if args.telescope:
+        now = rule_summary(df, args.telescope)
+        print(f"Current {args.telescope} rule: {now['accepted']} accepted, {now['expected']:.2f} expected, "
+              f"{now['conflicts']} conflicts")
+    if Path(args.out).suffix.lower() in (".html", ".htm"):
+        title = f"{result.events} events" + (f", {args.telescope} slews" if args.telescope else "")
+        write_heatmap(result, args.out, args.metric, title)
+    else:
+        result.table().to_csv(args.out, index=False)
+    print(f"Written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Seconds charged for commands whose run time the script does not state. MOUNT GOTO
+# is only used when the block has no "#Slew seconds" comment. Subroutines (GOSUB) cost
+# the sum of their body, as defined by DEF SUB in the script header (pre174.txt).
+COMMAND_SECONDS = {
+    "MOUNT GOTO": 30.0,
+    "MOUNT SOLVEANDSYNC": 15.0,
+    "MOUNT CONNECT": 1.0,
+    "MOUNT PARK": 60.0,
+    "AUTOFOCUS": 180.0,
+}
+ERROR_KINDS = {"missed", "overlap", "midnight", "order", "undefined"}
+# Nights run from 16:00 to 16:00 local time, as night_window_filter
+NIGHT_START_S = 16 * 3600
+MIDNIGHT_S = 24 * 3600 - NIGHT_START_S
+
+_CMD = "|".join(re.escape(c) for c in sorted(COMMAND_SECONDS, key=len, reverse=True) if c != "MOUNT GOTO")
+# Matched from the newline before each line (the text gets one in front), so the regex
+# engine can skip to candidate lines instead of trying every position.
+SCS_LINE = re.compile(rf"""
+    \n[ \t]*(?=[WDCGMAE\#])(?:
+        WAIT[ \t]+UNTIL[ \t]+LATER[ \t]+THAN[ \t]+LOCALTIME[ \t]*"[ \t]*(?P<wait>\d{{1,2}}:\d{{2}}:\d{{2}})
+      | DELAY[ \t]+(?P<delay>[0-9.]+)
+      | CAPTURE[ \t]+(?P<capture>[0-9.]+)[ \t]+SECONDS
+      | GOSUB[ \t]+(?P<gosub>\w+)
+      | (?P<goto>MOUNT[ \t]+GOTO)
+      | (?P<cmd>{_CMD})
+      | \#UT=[ \t]+(?P<ut>\d{{1,2}}:\d{{2}}:\d{{2}})
+      | \#Slew[ \t]+seconds[ \t]+(?P<slew>[0-9.]+)
+      | \#[ \t]+\*+[ \t]+Occultation[ \t]+(?P<occ>\d+)
+      | DEF[ \t]+SUB[ \t]+(?P<defsub>\w+)
+      | (?P<endsub>END[ \t]+SUB)
+    )""", re.VERBOSE)
+
+
+@dataclass
+class Issue:
+    kind: str                      # late, missed, overlap, midnight, order, undefined
+    occultation: int               # 0 before the first occultation block
+    line_no: int
+    message: str
+
+    @property
+    def error(self) -> bool:
+        return self.kind in ERROR_KINDS
+
+
+@dataclass
+class Replay:
+    captures: list = field(default_factory=list)    # (occultation, start, end, ut) in night seconds
+    issues: list = field(default_factory=list)
+    subroutines: dict = field(default_factory=dict)  # name -> seconds
+    end: float | None = None
+
+    def errors(self) -> list:
+        return [i for i in self.issues if i.error]
+
+
+def night_seconds(hms: str) -> int:
+    # seconds since the night started, so an evening-to-morning night is one increasing range
+    h, m, s = map(int, hms.split(":"))
+    return (h * 3600 + m * 60 + s - NIGHT_START_S) % 86400
+
+
+def clock_text(night_s: float) -> str:
+    s = int(round(night_s + NIGHT_START_S)) % 86400
+    return f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}"
+
+
+def replay_scs(text: str, seconds: dict | None = None, start: str | None = None) -> Replay:
+    # Replays the generated SCS subset in simulated time. WAIT UNTIL LATER THAN LOCALTIME
+    # holds until its time; DELAY, CAPTURE, GOSUB and the COMMAND_SECONDS commands advance
+    # the clock. The clock starts at start (HH:MM:SS) or at the first WAIT.
+    # The first WAIT of an occultation block (its sttime) is expected to have passed on
+    # busy nights, so only the later ones are reported as late.
+    cost = {**COMMAND_SECONDS, **(seconds or {})}
+    r = Replay()
+    clock = float(night_seconds(start)) if start else None
+    sub, sub_s = None, 0.0
+    occ, ut, slew = 0, None, None
+    block_start, wait_target, last_capture, last_window_end = False, None, None, None
+    text = "\n" + text
+    line_no, pos = 1, 0
+
+    def issue(kind, message):
+        r.issues.append(Issue(kind, occ, line_no, message))
+
+    for m in SCS_LINE.finditer(text):
+        line_no += text.count("\n", pos, m.start())
+        pos = m.start()
+        kind = m.lastgroup
+        value = m.group(kind)
+
+        if kind == "defsub":
+            sub, sub_s = value, 0.0
+            continue
+        if kind == "endsub":
+            if sub is not None:
+                r.subroutines[sub] = cost.get(sub, sub_s)
+            sub = None
+            continue
+
+        if kind == "delay" or kind == "capture":
+            step = float(value)
+        elif kind == "gosub":
+            if value not in r.subroutines:
+                issue("undefined", f"GOSUB {value} has no DEF SUB before it")
+            step = r.subroutines.get(value, 0.0)
+        elif kind == "cmd":
+            step = cost[" ".join(value.split())]
+        elif kind == "goto":
+            step = slew if slew is not None and sub is None else cost["MOUNT GOTO"]
+        else:
+            step = 0.0
+        if sub is not None:
+            sub_s += step
+            continue
+
+        if kind == "occ":
+            occ, ut, slew, block_start = int(value), None, None, True
+        elif kind == "ut":
+            ut = night_seconds(value)
+        elif kind == "slew":
+            slew = float(value)
+        elif kind == "wait":
+            target = wait_target = night_seconds(value)
+            if clock is None or clock <= target:
+                clock = float(target)
+            elif target < MIDNIGHT_S <= clock:
+                issue("midnight", f"{value} is reached at {clock_text(clock)}, after midnight; "
+                                  f"SharpCap would wait until the next evening")
+            elif not block_start:
+                issue("late", f"{value} had passed {clock - target:.0f} s earlier")
+            block_start = False
+        elif kind == "capture":
+            if wait_target is not None:
+                if last_capture is not None and wait_target < last_capture:
+                    issue("order", f"capture at {clock_text(wait_target)} comes after the one at "
+                                   f"{clock_text(last_capture)}")
+                elif last_window_end is not None and wait_target < last_window_end:
+                    issue("overlap", f"capture at {clock_text(wait_target)} starts before the previous one "
+                                     f"ends at {clock_text(last_window_end)}")
+                last_capture, last_window_end = wait_target, wait_target + step
+            if clock is not None:
+                r.captures.append((occ, clock, clock + step, ut))
+                if ut is not None and not clock <= ut <= clock + step:
+                    issue("missed", f"capture runs {clock_text(clock)}-{clock_text(clock + step)}, "
+                                    f"the occultation is at {clock_text(ut)}")
+
+        if clock is not None:
+            clock += step
+    r.end = clock
+    return r
+
+
+def parse_seconds(items) -> dict:
+    # ["AFOCUS=240", "MOUNT SOLVEANDSYNC=20"] -> {name: seconds}
+    out = {}
+    for item in items or []:
+        name, sep, value = item.rpartition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Expected NAME=SECONDS, got {item!r}")
+        out[" ".join(name.split())] = float(value)
+    return out
+
+
+def issue_lines(issues, limit: int | None = None, indent: str = "  ") -> list[str]:
+    out = []
+    for i in issues[:limit]:
+        where = f"occultation {i.occultation}" if i.occultation else "setup"
+        out.append(f"{indent}line {i.line_no} ({where}) {i.kind}: {i.message}")
+    if limit is not None and len(issues) > limit:
+        out.append(f"{indent}... {len(issues) - limit} more")
+    return out
+
+
+def check_summary(text: str, limit: int = 5) -> list[str]:
+    # Short report for the CLI and GUI after a script is written; empty when the replay is clean.
+    r = replay_scs(text)
+    if not r.issues:
+        return []
+    errors = r.errors()
+    return [f"Timing check: {len(errors)} errors, {len(r.issues) - len(errors)} warnings"] + issue_lines(r.issues, limit)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Replay generated .scs scripts and flag timing problems.")
+    ap.add_argument("scripts", nargs="+", help=".scs files")
+    ap.add_argument("--seconds", action="append", default=None, metavar="NAME=SECONDS",
+                    help="Run time of a subroutine or command, e.g. AFOCUS=240 or 'MOUNT SOLVEANDSYNC=20' (repeatable)")
+    ap.add_argument("--start", default=None, help="Local time the script is started (HH:MM:SS); default the first WAIT")
+    ap.add_argument("--quiet", action="store_true", help="Only print scripts with errors")
+    args = ap.parse_args()
+
+    try:
+        seconds = parse_seconds(args.seconds)
+    except ValueError as e:
+        ap.error(str(e))
+    failed = 0
+    for path in args.scripts:
+        r = replay_scs(Path(path).read_text(encoding="utf-8", errors="replace"), seconds, args.start)
+        errors = r.errors()
+        failed += bool(errors)
+        if args.quiet and not errors:
+            continue
+        end = f", ends {clock_text(r.end)}" if r.end is not None else ""
+        print(f"{path}: {len(r.captures)} captures{end}, {len(errors)} errors, {len(r.issues) - len(errors)} warnings")
+        for line in issue_lines(r.issues):
+            print(line)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()